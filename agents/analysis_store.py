@@ -0,0 +1,126 @@
+"""
+Analysis Store
+Durable, cross-session knowledge base of per-paper analyses
+
+Every analysis is keyed by the paper (version-less arXiv ID, DOI or URL),
+its arXiv version, the summary prompt version and the Gemini model. A
+popular paper is therefore summarized once for everyone, and changing the
+prompt template or the model automatically misses the old rows.
+
+Processes with different model routes (or prompt versions during a
+rollout) share one file, so nothing is deleted automatically. Once every
+deployment runs the current prompt, drop the rows of other prompt
+versions with:
+    python -m agents.analysis_store purge
+
+Backed by SQLite (standard library) in WAL mode so concurrent Streamlit
+sessions and CLI runs can share one file.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from agents.dedup import normalize_arxiv_id
+from agents.relevance_cache import paper_id
+
+
+def paper_key(paper_url):
+    """Return (paper key, version) for a paper URL; version is 0 when unknown"""
+    _, version = normalize_arxiv_id(paper_url)
+    return paper_id({'url': paper_url}), version or 0
+
+
+class AnalysisStore:
+    """SQLite table of analyses keyed by (paper, version, prompt version, model)"""
+
+    def __init__(self, db_path='.scholarsync_cache/analyses.db'):
+        self.db_path = db_path
+        self._local = threading.local()
+
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS analyses (
+                    paper_key TEXT NOT NULL,
+                    version INTEGER NOT NULL,
+                    prompt_version TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    title TEXT,
+                    url TEXT,
+                    analysis TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (paper_key, version, prompt_version, model)
+                )
+            ''')
+
+    def _connect(self):
+        """One connection per thread (sqlite3 connections are not thread-safe)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            self._local.conn = conn
+        return conn
+
+    def get(self, paper_url, prompt_version, model):
+        """
+        Look up a stored analysis
+
+        Returns:
+            dict: The analysis as returned by analyze_paper, or None
+        """
+        key, version = paper_key(paper_url)
+        row = self._connect().execute(
+            'SELECT analysis FROM analyses '
+            'WHERE paper_key = ? AND version = ? AND prompt_version = ? AND model = ?',
+            (key, version, prompt_version, model)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, paper_url, prompt_version, model, analysis):
+        """Store (or replace) an analysis"""
+        key, version = paper_key(paper_url)
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO analyses VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, version, prompt_version, model, analysis.get('title'), paper_url,
+                 json.dumps(analysis), time.time())
+            )
+
+    def purge_stale(self, prompt_version):
+        """
+        Delete analyses made with another prompt version; returns rows removed
+
+        Rows of other models are kept: lookups already filter by model, and
+        another deployment may route summaries to a different one.
+        """
+        with self._connect() as conn:
+            cursor = conn.execute('DELETE FROM analyses WHERE prompt_version != ?', (prompt_version,))
+            return cursor.rowcount
+
+    def count(self):
+        return self._connect().execute('SELECT COUNT(*) FROM analyses').fetchone()[0]
+
+
+def main():
+    """Maintenance: python -m agents.analysis_store [purge]"""
+    import sys
+
+    from agents.paper_analyzer import SUMMARY_PROMPT_VERSION
+
+    store = AnalysisStore()
+    if sys.argv[1:] == ['purge']:
+        removed = store.purge_stale(SUMMARY_PROMPT_VERSION)
+        print(f"🧹 Removed {removed} analyses made with older prompt versions ({store.count()} left)")
+    else:
+        print(f"📚 {store.count()} stored analyses (current prompt version {SUMMARY_PROMPT_VERSION})")
+        print("Run with 'purge' to delete analyses made with other prompt versions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Circuit Breakers
+Fail fast while Gemini, arXiv or a PDF host is down
+
+Each outbound dependency gets a breaker with three states:
+
+- closed: calls go through; outcomes are kept in a sliding time window
+- open: once the window holds at least `min_calls` outcomes and the
+  failure rate reaches `failure_rate`, calls are rejected immediately
+  with CircuitOpenError for `open_seconds`
+- half-open: after that, up to `half_open_calls` trial calls go through;
+  a success closes the breaker, a failure opens it again
+
+Breakers are process-wide (shared by every session) and are looked up by
+name from the module-level `breakers` registry, e.g. 'gemini', 'arxiv' or
+'pdf:arxiv.org'.
+"""
+
+import threading
+import time
+from collections import deque
+
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(RuntimeError):
+    """Call rejected because the dependency's breaker is open"""
+
+    def __init__(self, name, retry_after):
+        super().__init__(f"{name} is unavailable (circuit open, retry in {retry_after:.0f}s)")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Failure-rate circuit breaker for one dependency"""
+
+    def __init__(self, name, failure_rate=0.5, min_calls=4, window_seconds=60, open_seconds=30, half_open_calls=1):
+        """
+        Args:
+            name (str): Dependency name shown in metrics and errors
+            failure_rate (float): Failure fraction in the window that opens the breaker
+            min_calls (int): Outcomes needed in the window before it can open
+            window_seconds (float): Length of the sliding outcome window
+            open_seconds (float): Time spent open before trial calls are allowed
+            half_open_calls (int): Trial calls allowed at once while half-open
+        """
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._trials = 0
+        self._outcomes = deque()   # (monotonic time, ok)
+        self._lock = threading.Lock()
+
+        self.metrics = {
+            'calls': 0,
+            'failures': 0,
+            'rejected': 0,
+            'times_opened': 0
+        }
+
+    def allow(self):
+        """Reserve a call, raising CircuitOpenError if the breaker is open"""
+        with self._lock:
+            now = time.monotonic()
+            if self._state == OPEN:
+                retry_after = self._opened_at + self.open_seconds - now
+                if retry_after > 0:
+                    self.metrics['rejected'] += 1
+                    raise CircuitOpenError(self.name, retry_after)
+                self._state = HALF_OPEN
+                self._trials = 0
+
+            if self._state == HALF_OPEN:
+                if self._trials >= self.half_open_calls:
+                    self.metrics['rejected'] += 1
+                    raise CircuitOpenError(self.name, 0)
+                self._trials += 1
+
+            self.metrics['calls'] += 1
+
+    def record(self, ok):
+        """Record the outcome of a call reserved with allow()"""
+        with self._lock:
+            now = time.monotonic()
+            if not ok:
+                self.metrics['failures'] += 1
+
+            if self._state == HALF_OPEN:
+                self._trials -= 1
+                if ok:
+                    self._state = CLOSED
+                    self._outcomes.clear()
+                else:
+                    self._open(now)
+                return
+
+            self._outcomes.append((now, ok))
+            self._prune(now)
+            failures = sum(1 for _, outcome in self._outcomes if not outcome)
+            if (self._state == CLOSED and len(self._outcomes) >= self.min_calls
+                    and failures / len(self._outcomes) >= self.failure_rate):
+                self._open(now)
+
+    def release(self):
+        """Give back a reserved call whose outcome says nothing about the dependency"""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._trials -= 1
+
+    def guard(self, counts_as_failure=None):
+        """
+        Context manager around one call: allow() on entry, record() on exit
+
+        Args:
+            counts_as_failure (callable): Given the raised exception, returns
+                whether it is the dependency's fault (default: any Exception)
+        """
+        return _Guard(self, counts_as_failure)
+
+    def state(self):
+        with self._lock:
+            if self._state == OPEN and time.monotonic() >= self._opened_at + self.open_seconds:
+                return HALF_OPEN
+            return self._state
+
+    def stats(self):
+        """Return state, window failure rate and counters"""
+        state = self.state()
+        with self._lock:
+            self._prune(time.monotonic())
+            window = len(self._outcomes)
+            failures = sum(1 for _, ok in self._outcomes if not ok)
+            stats = dict(self.metrics)
+            stats['state'] = state
+            stats['window_calls'] = window
+            stats['window_failure_rate'] = round(failures / window, 3) if window else 0.0
+            stats['retry_after'] = (
+                round(max(0.0, self._opened_at + self.open_seconds - time.monotonic()), 1)
+                if state == OPEN else 0.0
+            )
+            return stats
+
+    def _open(self, now):
+        self._state = OPEN
+        self._opened_at = now
+        self._outcomes.clear()
+        self.metrics['times_opened'] += 1
+        print(f"⚡ Circuit opened for {self.name}: failing fast for {self.open_seconds:.0f}s")
+
+    def _prune(self, now):
+        while self._outcomes and now - self._outcomes[0][0] > self.window_seconds:
+            self._outcomes.popleft()
+
+
+class _Guard:
+    def __init__(self, breaker, counts_as_failure):
+        self.breaker = breaker
+        self.counts_as_failure = counts_as_failure
+
+    def __enter__(self):
+        self.breaker.allow()
+        return self.breaker
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.breaker.record(True)
+        elif issubclass(exc_type, Exception) and (self.counts_as_failure is None or self.counts_as_failure(exc)):
+            self.breaker.record(False)
+        else:
+            self.breaker.release()
+        return False
+
+
+class BreakerRegistry:
+    """Named breakers, created on first use with shared settings"""
+
+    def __init__(self, **settings):
+        self.settings = settings
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                breaker = self._breakers[name] = CircuitBreaker(name, **self.settings)
+            return breaker
+
+    def stats(self):
+        """Return {name: stats} for every breaker created so far"""
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {breaker.name: breaker.stats() for breaker in breakers}
+
+    def unhealthy(self):
+        """Return stats of breakers that are not closed"""
+        return {name: stats for name, stats in self.stats().items() if stats['state'] != CLOSED}
+
+
+# Process-wide registry used by the agents
+breakers = BreakerRegistry()
@@ -0,0 +1,134 @@
+"""
+Deadline
+A total time budget for one workflow run
+
+The orchestrator starts a Deadline when a run begins and passes it into
+every agent call. Network calls clamp their timeouts to the time that is
+left, and each stage looks at what remains before it starts: as the
+budget shrinks the run degrades in steps (fewer PDF pages, abstract-only
+summaries, no gap analysis) instead of overrunning. Every step taken is
+recorded on the deadline and reported with the results.
+"""
+
+import copy
+import threading
+import time
+
+
+# A network call is not started with less time than this left
+MIN_CALL_SECONDS = 2.0
+
+# Search and ranking hold back at most this fraction of the run for the
+# later stages, so a short deadline still leaves them time to find papers
+MAX_RESERVE_FRACTION = 0.5
+
+
+class DeadlineExceeded(Exception):
+    """Too little time is left for a call or stage"""
+
+
+class Deadline:
+    """Time left in one workflow run, and the degradations taken to stay within it"""
+
+    def __init__(self, seconds=None):
+        """
+        Args:
+            seconds (float): Total time the run may take (None = unlimited)
+        """
+        self.seconds = seconds
+        self.started = time.monotonic()
+        self.expires_at = None if seconds is None else self.started + seconds
+
+        self._degradations = []
+        self._lock = threading.Lock()
+
+    def remaining(self):
+        """Seconds left, or None when unlimited"""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def fits(self, seconds):
+        remaining = self.remaining()
+        return remaining is None or seconds <= remaining
+
+    def share(self, parts):
+        """Seconds each of `parts` remaining tasks may take, or None when unlimited"""
+        remaining = self.remaining()
+        if remaining is None:
+            return None
+        return remaining / max(1, parts)
+
+    def timeout(self, default, stage='call'):
+        """
+        Clamp a network timeout to the time left
+
+        Args:
+            default (float): The call's normal timeout in seconds
+            stage (str): Named in the error if the call cannot start
+
+        Returns:
+            float: The smaller of default and the time left
+
+        Raises:
+            DeadlineExceeded: Less than MIN_CALL_SECONDS is left
+        """
+        remaining = self.remaining()
+        if remaining is None or remaining >= default:
+            return default
+        if remaining < MIN_CALL_SECONDS:
+            raise DeadlineExceeded(f"{stage} needs time, only {remaining:.1f}s left")
+        return remaining
+
+    def reserve(self, seconds, max_fraction=None):
+        """
+        The same deadline ending `seconds` earlier, keeping time for a later stage
+
+        Degradations recorded on the returned deadline are shared with this one.
+
+        Args:
+            seconds (float): Time to keep for later stages
+            max_fraction (float): Keep at most this fraction of the time left
+                (None = no cap), so the earlier stage is never left with nothing
+        """
+        view = copy.copy(self)
+        if self.expires_at is not None:
+            if max_fraction is not None:
+                seconds = min(seconds, max_fraction * self.remaining())
+            view.expires_at = self.expires_at - seconds
+        return view
+
+    def degrade(self, stage, step, reason):
+        """
+        Record that a stage was cut back to finish in time
+
+        Args:
+            stage (str): Workflow stage, e.g. 'analysis'
+            step (str): What it fell back to, e.g. 'abstract_only'
+            reason (str): Shown to the user
+        """
+        print(f"⏱️  {stage}: {reason}")
+        with self._lock:
+            self._degradations.append({
+                'stage': stage,
+                'step': step,
+                'reason': reason,
+                'at_seconds': round(self.elapsed(), 1)
+            })
+
+    def degradations(self):
+        with self._lock:
+            return list(self._degradations)
+
+    def summary(self):
+        """Return the budget, elapsed time and degradations for the results"""
+        remaining = self.remaining()
+        return {
+            'seconds': self.seconds,
+            'elapsed_seconds': round(self.elapsed(), 1),
+            'remaining_seconds': None if remaining is None else round(remaining, 1),
+            'degradations': self.degradations()
+        }
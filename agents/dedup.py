@@ -0,0 +1,180 @@
+"""
+Search Result Deduplication
+Collapses arXiv versions and near-duplicate papers before ranking
+
+Two passes:
+1. Exact: papers whose arXiv IDs match once the version suffix is
+   stripped (2101.00001v1 / 2101.00001v3) are the same paper.
+2. Near-duplicate: MinHash signatures over word shingles of the title and
+   abstract, bucketed with LSH banding, so only papers that share a band
+   are compared. This stays roughly linear in the number of results.
+
+Each group keeps one representative: the latest version, then the most
+recent publication, then the longest abstract.
+"""
+
+import hashlib
+import re
+
+import numpy as np
+
+
+_ARXIV_ID_PATTERN = re.compile(
+    r'(?:arxiv\.org/(?:abs|pdf)/|arxiv:)?'
+    r'(?P<id>\d{4}\.\d{4,5}|[a-z\-]+(?:\.[A-Z]{2})?/\d{7})'
+    r'(?:v(?P<version>\d+))?',
+    re.IGNORECASE
+)
+
+# 32-bit shingle hashes times 31-bit coefficients stay within uint64
+_MERSENNE_PRIME = np.uint64((1 << 31) - 1)
+
+
+def normalize_arxiv_id(value):
+    """
+    Split an arXiv ID or URL into (base_id, version)
+
+    Examples:
+        'http://arxiv.org/pdf/2101.00001v2' -> ('2101.00001', 2)
+        'arXiv:hep-th/9901001'              -> ('hep-th/9901001', None)
+
+    Returns:
+        tuple: (base_id, version) or (None, None) if no ID is found
+    """
+    if not value:
+        return None, None
+
+    match = _ARXIV_ID_PATTERN.search(value)
+    if not match:
+        return None, None
+
+    version = match.group('version')
+    return match.group('id'), int(version) if version else None
+
+
+def _shingles(text, size=3):
+    """Word n-gram shingles of lowercased, punctuation-free text"""
+    words = re.findall(r'[a-z0-9]+', text.lower())
+    if len(words) < size:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class MinHasher:
+    """MinHash signatures using universal hashing (a*x + b) mod p"""
+
+    def __init__(self, num_perm=64, seed=42):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.a = rng.integers(1, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+
+    def signature(self, shingles):
+        """Return a tuple of num_perm minimum hash values"""
+        if not shingles:
+            return tuple([int(_MERSENNE_PRIME)] * self.num_perm)
+
+        hashed = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=4).digest(), 'big')
+             for s in shingles),
+            dtype=np.uint64,
+            count=len(shingles)
+        )
+        # (num_perm, num_shingles) matrix of permuted hashes, min over shingles
+        permuted = (np.outer(self.a, hashed) + self.b[:, None]) % _MERSENNE_PRIME
+        return tuple(permuted.min(axis=1).tolist())
+
+
+def estimate_similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of two MinHash signatures"""
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / len(sig_a)
+
+
+def _paper_arxiv_id(paper):
+    return paper.get('arxiv_id') or paper.get('url', '')
+
+
+def _representative_key(paper):
+    """Sort key: latest version, then newest, then longest abstract"""
+    _, version = normalize_arxiv_id(_paper_arxiv_id(paper))
+    return (version or 0, paper.get('published', ''), len(paper.get('summary', '')))
+
+
+def dedup_papers(papers, threshold=0.7, num_perm=64, bands=16):
+    """
+    Remove version duplicates and near-duplicate papers
+
+    Args:
+        papers (list): Paper dictionaries from search_papers
+        threshold (float): Estimated Jaccard similarity above which two
+            papers are considered the same work
+        num_perm (int): MinHash signature length
+        bands (int): LSH bands; num_perm must be divisible by bands
+
+    Returns:
+        list: One representative per group, in order of each group's first
+        appearance (so search relevance order is preserved)
+    """
+    if len(papers) < 2:
+        return list(papers)
+
+    # Union-find over paper indices
+    parent = list(range(len(papers)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(i, j):
+        root_i, root_j = find(i), find(j)
+        if root_i != root_j:
+            parent[max(root_i, root_j)] = min(root_i, root_j)
+
+    # Pass 1: identical arXiv IDs across versions
+    seen_ids = {}
+    for i, paper in enumerate(papers):
+        base_id, _ = normalize_arxiv_id(_paper_arxiv_id(paper))
+        if base_id is None:
+            continue
+        if base_id in seen_ids:
+            union(seen_ids[base_id], i)
+        else:
+            seen_ids[base_id] = i
+
+    # Pass 2: MinHash + LSH over title and abstract
+    hasher = MinHasher(num_perm=num_perm)
+    rows = num_perm // bands
+    signatures = [
+        hasher.signature(_shingles(f"{paper.get('title', '')} {paper.get('summary', '')}"))
+        for paper in papers
+    ]
+
+    buckets = {}
+    for i, sig in enumerate(signatures):
+        for band in range(bands):
+            bucket_key = (band, sig[band * rows:(band + 1) * rows])
+            buckets.setdefault(bucket_key, []).append(i)
+
+    checked = set()
+    for members in buckets.values():
+        for pos, i in enumerate(members):
+            for j in members[pos + 1:]:
+                if (i, j) in checked:
+                    continue
+                checked.add((i, j))
+                if estimate_similarity(signatures[i], signatures[j]) >= threshold:
+                    union(i, j)
+
+    # Pick the best representative of each group, placed at the group's first position
+    groups = {}
+    for i in range(len(papers)):
+        groups.setdefault(find(i), []).append(i)
+
+    deduped = []
+    for root in sorted(groups):
+        best = max(groups[root], key=lambda i: _representative_key(papers[i]))
+        deduped.append(papers[best])
+
+    return deduped
@@ -0,0 +1,278 @@
+"""
+Extractive Summarizer
+Offline, CPU-only summaries in the Paper Analyzer's five fields
+
+Sentences of the extracted paper text are embedded with the vector
+store's HashingEmbedder and ranked with TextRank (PageRank over the
+cosine-similarity graph, power iteration in NumPy). Each summary field
+then takes the best sentences that match its cue phrases ("we propose",
+"results show", "limitation", ...) or sit under a matching section
+heading, weighted by their TextRank centrality. No model or network is
+involved, so a paper is summarized in tens of milliseconds; it backs
+the "instant" mode and stands in when Gemini is unavailable.
+
+compress() uses the same scores to shrink paper text before it is sent
+to Gemini: it keeps the best sentences for each field, in turn, until a
+token budget is used up, instead of cutting the text off after N tokens.
+"""
+
+import re
+
+import numpy as np
+
+from agents.token_budget import estimate_tokens
+from agents.vector_store import HashingEmbedder
+
+
+FIELDS = ['research_question', 'methodology', 'key_findings', 'limitations', 'future_work']
+
+# Phrases that mark a sentence as material for a field
+FIELD_CUES = {
+    'research_question': ['we propose', 'this paper', 'in this work', 'we address', 'we investigate', 'we study',
+                          'we present', 'we introduce', 'problem of', 'question', 'our goal', 'aims to'],
+    'methodology': ['we use', 'method', 'approach', 'architecture', 'we train', 'dataset', 'algorithm',
+                    'framework', 'we apply', 'based on', 'consists of', 'we design'],
+    'key_findings': ['results show', 'we find', 'we show', 'outperform', 'achieve', 'improve', 'state-of-the-art',
+                     'state of the art', 'demonstrate', 'accuracy', 'significantly', 'experiments show'],
+    'limitations': ['limitation', 'however', 'fail', 'does not', 'do not', 'restricted', 'drawback', 'cannot',
+                    'only', 'assume', 'expensive', 'costly'],
+    'future_work': ['future work', 'in the future', 'future research', 'we plan', 'further', 'extend',
+                    'open question', 'remains to', 'left for', 'next step'],
+}
+
+# Section headings whose sentences count towards a field
+SECTION_FIELDS = {
+    'abstract': 'research_question',
+    'introduction': 'research_question',
+    'method': 'methodology',
+    'methods': 'methodology',
+    'methodology': 'methodology',
+    'approach': 'methodology',
+    'model': 'methodology',
+    'experiments': 'key_findings',
+    'results': 'key_findings',
+    'evaluation': 'key_findings',
+    'limitations': 'limitations',
+    'discussion': 'limitations',
+    'conclusion': 'future_work',
+    'conclusions': 'future_work',
+    'future work': 'future_work',
+}
+
+_HEADING = re.compile(r'^\s*(?:\d+(?:\.\d+)*\.?|[IVX]+\.)?\s*([A-Za-z][A-Za-z ]{2,30}?)\s*$')
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+(?=[A-Z(\[])')
+
+_embedder = HashingEmbedder(dim=256)
+
+
+def split_sentences(text, min_chars=40, max_chars=600, max_sentences=600):
+    """
+    Split paper text into sentences, each tagged with its section's field
+
+    Returns:
+        list: (sentence, section field or None) pairs in document order
+    """
+    # Re-join words hyphenated across PDF lines
+    text = re.sub(r'-\n(?=[a-z])', '', text)
+
+    sentences = []
+    section = None
+    paragraph = []
+
+    def flush():
+        joined = ' '.join(paragraph)
+        for sentence in _SENTENCE_END.split(joined):
+            sentence = sentence.strip()
+            if min_chars <= len(sentence) <= max_chars and sum(c.isalpha() for c in sentence) > len(sentence) // 2:
+                sentences.append((sentence, section))
+        paragraph.clear()
+
+    for line in text.splitlines():
+        heading = _HEADING.match(line)
+        name = heading.group(1).strip().lower() if heading else None
+        if name in SECTION_FIELDS:
+            flush()
+            section = SECTION_FIELDS[name]
+        elif line.strip():
+            paragraph.append(line.strip())
+        if len(sentences) >= max_sentences:
+            break
+    flush()
+
+    return sentences[:max_sentences]
+
+
+def textrank(sentences, damping=0.85, iterations=30):
+    """
+    TextRank centrality of each sentence
+
+    Args:
+        sentences (list): Sentence strings
+        damping (float): PageRank damping factor
+        iterations (int): Power-iteration steps
+
+    Returns:
+        np.ndarray: Scores summing to 1
+    """
+    n = len(sentences)
+    if n == 0:
+        return np.zeros(0, dtype=np.float32)
+
+    vectors = np.stack([_embedder.embed(sentence) for sentence in sentences])
+    similarity = np.clip(vectors @ vectors.T, 0.0, None)
+    np.fill_diagonal(similarity, 0.0)
+
+    # Row-normalize into transition probabilities; isolated sentences link everywhere
+    totals = similarity.sum(axis=1, keepdims=True)
+    transition = np.where(totals > 0, similarity / np.where(totals > 0, totals, 1.0), 1.0 / n)
+
+    scores = np.full(n, 1.0 / n, dtype=np.float32)
+    for _ in range(iterations):
+        scores = (1 - damping) / n + damping * (transition.T @ scores)
+    return scores / scores.sum()
+
+
+def cue_score(sentence, field):
+    """Number of the field's cue phrases found in a sentence"""
+    lowered = sentence.lower()
+    return sum(1 for cue in FIELD_CUES[field] if cue in lowered)
+
+
+def score_sentences(sentences, rank=None):
+    """
+    Score every sentence for every field
+
+    Args:
+        sentences (list): (sentence, section field) pairs from split_sentences
+        rank (np.ndarray): TextRank scores (computed if not given)
+
+    Returns:
+        dict: {field: np.ndarray of scores}, 0 where a sentence has nothing for the field
+    """
+    if rank is None:
+        rank = textrank([sentence for sentence, _ in sentences])
+    centrality = rank / rank.max() if len(rank) and rank.max() > 0 else rank
+
+    scores = {}
+    for field in FIELDS:
+        cues = np.array([cue_score(sentence, field) for sentence, _ in sentences], dtype=np.float32)
+        in_section = np.array([section == field for _, section in sentences], dtype=np.float32)
+        relevance = cues + 0.75 * in_section
+        scores[field] = np.where(relevance > 0, relevance * (0.5 + centrality), 0.0)
+    return scores
+
+
+def summarize(text, sentences_per_field=2):
+    """
+    Extractive summary with the same five fields as the Gemini summary
+
+    Args:
+        text (str): Extracted paper text (or an abstract)
+        sentences_per_field (int): Sentences kept per field
+
+    Returns:
+        dict: research_question, methodology, key_findings, limitations and
+            future_work; a field with no matching sentence stays ''
+    """
+    sentences = split_sentences(text)
+    summary = {field: '' for field in FIELDS}
+    if not sentences:
+        return summary
+
+    rank = textrank([sentence for sentence, _ in sentences])
+    scores = score_sentences(sentences, rank)
+    used = set()
+
+    for field in FIELDS:
+        best = [i for i in np.argsort(-scores[field]) if scores[field][i] > 0 and i not in used]
+        chosen = sorted(best[:sentences_per_field])
+        used.update(chosen)
+        summary[field] = ' '.join(sentences[i][0] for i in chosen)
+
+    # Without any cue, the most central sentence still says what the paper is about
+    if not summary['research_question']:
+        central = [i for i in np.argsort(-rank) if i not in used]
+        if central:
+            summary['research_question'] = sentences[central[0]][0]
+
+    return summary
+
+
+def compress(text, max_tokens):
+    """
+    Keep the sentences the five summary fields need, within a token budget
+
+    Fields take turns picking their next best sentence, so every field is
+    covered before any one field gets more; once no field has a cue left,
+    the most central remaining sentences fill what is left of the budget.
+
+    Args:
+        text (str): Extracted paper text
+        max_tokens (int): Token budget for the result
+
+    Returns:
+        str: Chosen sentences in document order, one per line ('' if the
+            text has no usable sentences)
+    """
+    sentences = split_sentences(text, max_sentences=1000)
+    if not sentences:
+        return ''
+
+    rank = textrank([sentence for sentence, _ in sentences])
+    scores = score_sentences(sentences, rank)
+    queues = {field: [i for i in np.argsort(-scores[field]) if scores[field][i] > 0] for field in FIELDS}
+    queues['central'] = list(np.argsort(-rank))
+
+    chosen = set()
+    used = 0
+    while any(queues.values()):
+        for field in FIELDS if any(queues[field] for field in FIELDS) else ['central']:
+            while queues[field]:
+                i = queues[field].pop(0)
+                if i in chosen:
+                    continue
+                cost = estimate_tokens(sentences[i][0])
+                if used + cost <= max_tokens:
+                    chosen.add(i)
+                    used += cost
+                    break
+        if used >= max_tokens:
+            break
+
+    return '\n'.join(sentences[i][0] for i in sorted(chosen))
+
+
+def main():
+    """Summarize a short sample text and time it"""
+    import time
+
+    sample = """Abstract
+In this work we study whether sequence transduction can be done without recurrence.
+We propose the Transformer, a model architecture based solely on attention mechanisms.
+1 Introduction
+Recurrent models process tokens one at a time, which prevents parallelization within training examples.
+3 Method
+The encoder consists of a stack of six identical layers with multi-head self-attention.
+We train on the WMT 2014 English-German dataset with 4.5 million sentence pairs.
+5 Results
+Experiments show the model achieves 28.4 BLEU and outperforms all previously reported ensembles.
+Training takes only 3.5 days on eight GPUs, a fraction of the cost of previous models.
+6 Conclusion
+However, attention over very long sequences remains expensive in memory.
+In future work we plan to extend the Transformer to images, audio and video.
+"""
+    start = time.perf_counter()
+    summary = summarize(sample)
+    elapsed = (time.perf_counter() - start) * 1000
+
+    for field, value in summary.items():
+        print(f"{field}: {value}")
+    print(f"\n⚡ Extractive summary in {elapsed:.1f} ms")
+
+    compressed = compress(sample, 80)
+    print(f"\n🗜️  Compressed to ~80 tokens:\n{compressed}")
+    print(f"(~{estimate_tokens(sample)} -> ~{estimate_tokens(compressed)} tokens)")
+
+
+if __name__ == "__main__":
+    main()
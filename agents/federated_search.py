@@ -0,0 +1,377 @@
+"""
+Federated Paper Search
+Fans a query out to several paper sources concurrently and merges the results
+
+Each source runs on a shared thread pool with its own timeout, counted
+from when the source starts running (a source still waiting for a pool
+thread gets the same timeout to start). Whatever has arrived when a
+source's timeout expires is used; a late source is abandoned (its
+thread finishes in the background) and never delays the response.
+Results are merged round-robin in source order (newest first for date
+sorts) and deduplicated by DOI or version-less arXiv ID.
+
+Sources besides arXiv are chosen with SCHOLARSYNC_SOURCES, e.g.
+    openalex,local=papers.jsonl
+"""
+
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import requests
+
+from agents.dedup import normalize_arxiv_id
+
+
+class PaperSource:
+    """Base class for a searchable paper source"""
+
+    name = 'source'
+
+    def __init__(self, timeout=10):
+        """
+        Args:
+            timeout (float): Seconds to wait for this source before dropping it
+        """
+        self.timeout = timeout
+
+    def search(self, query, max_results, sort_by='relevance'):
+        """
+        Return a list of paper dictionaries in the search_papers format
+
+        sort_by is 'relevance', 'submitted' or 'updated' (newest first);
+        sources that cannot sort by date return their best matches.
+        """
+        raise NotImplementedError
+
+
+class ArxivSource(PaperSource):
+    """arXiv, through the Literature Scout's own arXiv client"""
+
+    name = 'arxiv'
+
+    def __init__(self, scout, timeout=20):
+        super().__init__(timeout)
+        self.scout = scout
+
+    def search(self, query, max_results, sort_by='relevance'):
+        return self.scout.search_arxiv(query, max_results, sort_by=sort_by)
+
+
+class LocalIndexSource(PaperSource):
+    """
+    Local metadata index: a JSON-lines file (or list) of paper dictionaries
+
+    Papers are scored by how many query terms appear in their title and
+    summary. Handy offline and as a stub source in tests.
+    """
+
+    name = 'local'
+
+    def __init__(self, papers=None, path=None, timeout=2, name=None):
+        super().__init__(timeout)
+        self.path = path
+        self._papers = papers
+        if name:
+            self.name = name
+
+    def _load(self):
+        if self._papers is None:
+            self._papers = []
+            if self.path and os.path.exists(self.path):
+                with open(self.path, encoding='utf-8') as f:
+                    self._papers = [json.loads(line) for line in f if line.strip()]
+        return self._papers
+
+    def search(self, query, max_results, sort_by='relevance'):
+        terms = set(re.findall(r'[a-z0-9]+', query.lower()))
+        scored = []
+        for paper in self._load():
+            words = set(re.findall(r'[a-z0-9]+', f"{paper.get('title', '')} {paper.get('summary', '')}".lower()))
+            score = len(terms & words)
+            if score:
+                scored.append((score, paper))
+        if sort_by == 'relevance':
+            scored.sort(key=lambda item: item[0], reverse=True)
+        else:
+            scored.sort(key=lambda item: item[1].get('published') or '', reverse=True)
+        return [paper for _, paper in scored[:max_results]]
+
+
+class OpenAlexSource(PaperSource):
+    """OpenAlex works search; only open-access works with a PDF link are returned"""
+
+    name = 'openalex'
+
+    def __init__(self, timeout=10, mailto=None):
+        super().__init__(timeout)
+        self.mailto = mailto
+
+    def search(self, query, max_results, sort_by='relevance'):
+        params = {'search': query, 'per-page': max_results, 'filter': 'is_oa:true'}
+        if sort_by != 'relevance':
+            # OpenAlex has no separate "updated" order; newest publications first for both
+            params['sort'] = 'publication_date:desc'
+        if self.mailto:
+            params['mailto'] = self.mailto
+
+        response = requests.get('https://api.openalex.org/works', params=params, timeout=self.timeout)
+        response.raise_for_status()
+
+        papers = []
+        for work in response.json().get('results', []):
+            location = work.get('best_oa_location') or {}
+            pdf_url = location.get('pdf_url')
+            if not pdf_url:
+                continue
+
+            abstract = self._rebuild_abstract(work.get('abstract_inverted_index'))
+            doi = work.get('doi') or ''
+            papers.append({
+                'title': work.get('title') or '',
+                'authors': [a['author']['display_name'] for a in work.get('authorships', [])][:3],
+                'summary': abstract[:300] + "...",
+                'published': work.get('publication_date') or '',
+                'url': pdf_url,
+                'arxiv_id': None,
+                'doi': doi.replace('https://doi.org/', '') or None
+            })
+        return papers
+
+    @staticmethod
+    def _rebuild_abstract(inverted_index):
+        """OpenAlex ships abstracts as {word: [positions]}; put the words back in order"""
+        if not inverted_index:
+            return ''
+        positions = [(pos, word) for word, where in inverted_index.items() for pos in where]
+        return ' '.join(word for _, word in sorted(positions))
+
+
+def sources_from_env(name='SCHOLARSYNC_SOURCES'):
+    """
+    Build the extra sources named in an environment variable
+
+    Entries are comma-separated: 'openalex', or 'local=<path>' for a
+    JSON-lines index. arXiv is always searched and needs no entry.
+
+    Returns:
+        list: PaperSource instances (empty if unset)
+    """
+    sources = []
+    for entry in os.getenv(name, '').split(','):
+        kind, _, value = (part.strip() for part in entry.partition('='))
+        if not kind or kind == 'arxiv':
+            continue
+        if kind == 'openalex':
+            sources.append(OpenAlexSource(mailto=value or None))
+        elif kind == 'local' and value:
+            sources.append(LocalIndexSource(path=value, name=f"local:{os.path.basename(value)}"))
+        else:
+            print(f"⚠️  Ignoring unknown paper source in {name}: {entry.strip()}")
+    return sources
+
+
+def paper_identities(paper):
+    """
+    Return every merge key for a paper: its DOI and its version-less arXiv ID
+
+    arXiv's own DOIs (10.48550/arXiv.NNNN.NNNNN) also yield the arXiv key,
+    so a DOI-only copy from one source matches an ID-only copy from
+    another. Papers with neither fall back to their URL.
+    """
+    keys = []
+
+    doi = (paper.get('doi') or '').lower().strip()
+    if doi:
+        keys.append('doi:' + doi)
+
+    arxiv_ref = paper.get('arxiv_id') or paper.get('url', '')
+    if not normalize_arxiv_id(arxiv_ref)[0] and doi.startswith('10.48550/'):
+        arxiv_ref = doi
+    base_id, _ = normalize_arxiv_id(arxiv_ref)
+    if base_id:
+        keys.append('arxiv:' + base_id)
+
+    return keys or ['url:' + paper.get('url', '')]
+
+
+class FederatedSearch:
+    """Concurrent search across multiple PaperSource instances"""
+
+    def __init__(self, sources, max_workers=8):
+        """
+        Args:
+            sources (list): PaperSource instances, highest priority first
+            max_workers (int): Thread pool size shared by all searches
+        """
+        self.sources = sources
+        # Long-lived pool: abandoning a late source must not wait for its thread
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='federated')
+
+    def search(self, query, max_results=5, sort_by='relevance'):
+        """Search all sources and return merged, deduplicated papers"""
+        papers, _ = self.search_with_report(query, max_results, sort_by)
+        return papers
+
+    def search_with_report(self, query, max_results=5, sort_by='relevance'):
+        """
+        Search all sources concurrently
+
+        Args:
+            query (str): Search query
+            max_results (int): Papers to return after merging
+            sort_by (str): 'relevance', 'submitted' or 'updated', passed to every source
+
+        Returns:
+            tuple: (papers, report) where report maps each source name to
+            {'status': 'ok' | 'timeout' | 'error', 'count', 'seconds'}
+        """
+        start = time.monotonic()
+        started = {}   # source name -> when a pool thread picked it up
+
+        def run(source):
+            started[source.name] = time.monotonic()
+            return source.search(query, max_results, sort_by)
+
+        futures = {self._executor.submit(run, source): source for source in self.sources}
+
+        results = {}
+        report = {}
+        pending = set(futures)
+
+        while pending:
+            now = time.monotonic()
+            # A source's clock starts when it runs; until then it has its timeout to get a thread
+            deadlines = {
+                future: started.get(futures[future].name, start) + futures[future].timeout for future in pending
+            }
+
+            # Drop sources whose own timeout has passed
+            for future in [f for f in pending if deadlines[f] <= now]:
+                pending.discard(future)
+                future.cancel()
+                report[futures[future].name] = {'status': 'timeout', 'count': 0, 'seconds': round(now - start, 3)}
+
+            if not pending:
+                break
+
+            next_deadline = min(deadlines[f] for f in pending)
+            done, _ = wait(pending, timeout=max(0.0, next_deadline - now), return_when=FIRST_COMPLETED)
+
+            for future in done:
+                pending.discard(future)
+                source = futures[future]
+                elapsed = round(time.monotonic() - start, 3)
+                try:
+                    results[source.name] = future.result() or []
+                    report[source.name] = {'status': 'ok', 'count': len(results[source.name]), 'seconds': elapsed}
+                except Exception as e:
+                    print(f"⚠️  Source '{source.name}' failed: {e}")
+                    report[source.name] = {'status': 'error', 'count': 0, 'seconds': elapsed}
+
+        ordered = [results[source.name] for source in self.sources if source.name in results]
+        papers = self._merge(ordered, max_results, sort_by)
+
+        summary = ", ".join(f"{name}: {info['status']} ({info['count']})" for name, info in report.items())
+        print(f"🌐 Federated search: {summary}")
+
+        return papers, report
+
+    @staticmethod
+    def _merge(result_lists, max_results, sort_by='relevance'):
+        """Interleave results round-robin, skipping papers already seen from another source"""
+        merged = []
+        by_key = {}
+        longest = max((len(results) for results in result_lists), default=0)
+
+        for rank in range(longest):
+            for results in result_lists:
+                if rank >= len(results):
+                    continue
+                paper = results[rank]
+                keys = paper_identities(paper)
+                existing = next((by_key[key] for key in keys if key in by_key), None)
+
+                if existing is None:
+                    existing = dict(paper)
+                    merged.append(existing)
+                else:
+                    # Same paper from another source: fill in fields the first copy lacked
+                    for field, value in paper.items():
+                        if value and not existing.get(field):
+                            existing[field] = value
+
+                for key in keys:
+                    by_key.setdefault(key, existing)
+
+        if sort_by != 'relevance':
+            merged.sort(key=lambda paper: paper.get('published') or '', reverse=True)
+        return merged[:max_results]
+
+
+def main():
+    """Offline check of the federated search with stub sources"""
+
+    class SlowSource(PaperSource):
+        name = 'slow'
+
+        def search(self, query, max_results, sort_by='relevance'):
+            time.sleep(5)
+            return [{'title': 'Too late', 'url': 'http://example.org/late.pdf'}]
+
+    class BrokenSource(PaperSource):
+        name = 'broken'
+
+        def search(self, query, max_results, sort_by='relevance'):
+            raise ConnectionError("provider is down")
+
+    local_a = LocalIndexSource(name='local_a', papers=[
+        {'title': 'Attention Is All You Need', 'summary': 'transformer attention', 'arxiv_id': '1706.03762v5',
+         'url': 'http://arxiv.org/pdf/1706.03762v5', 'doi': None},
+        {'title': 'BERT', 'summary': 'transformer pre-training', 'arxiv_id': '1810.04805v2',
+         'url': 'http://arxiv.org/pdf/1810.04805v2', 'doi': None},
+    ])
+    local_b = LocalIndexSource(name='local_b', papers=[
+        {'title': 'Attention Is All You Need', 'summary': 'transformer attention', 'arxiv_id': '1706.03762v1',
+         'url': 'http://arxiv.org/pdf/1706.03762v1', 'doi': '10.48550/arXiv.1706.03762'},
+        {'title': 'Vision Transformer', 'summary': 'transformer for images', 'arxiv_id': None,
+         'url': 'http://example.org/vit.pdf', 'doi': '10.1000/vit'},
+    ])
+
+    federated = FederatedSearch([local_a, local_b, SlowSource(timeout=0.5), BrokenSource()])
+
+    print("🚀 Testing federated search with stub sources...\n")
+    start = time.monotonic()
+    papers, report = federated.search_with_report("transformer attention", max_results=10)
+    elapsed = time.monotonic() - start
+
+    for paper in papers:
+        print(f"  • {paper['title']} ({', '.join(paper_identities(paper))})")
+
+    assert elapsed < 2, f"Late source blocked the response ({elapsed:.1f}s)"
+    assert report['slow']['status'] == 'timeout'
+    assert report['broken']['status'] == 'error'
+    assert len(papers) == 3, "Duplicate across sources was not merged"
+
+    # A source queued behind another on a one-thread pool still gets its full timeout
+    class SteadySource(PaperSource):
+        def __init__(self, name):
+            super().__init__(timeout=0.5)
+            self.name = name
+
+        def search(self, query, max_results, sort_by='relevance'):
+            time.sleep(0.3)
+            return [{'title': self.name, 'url': f'http://example.org/{self.name}.pdf', 'published': self.name}]
+
+    queued = FederatedSearch([SteadySource('2023'), SteadySource('2024')], max_workers=1)
+    papers, report = queued.search_with_report("anything", max_results=5, sort_by='submitted')
+    assert all(info['status'] == 'ok' for info in report.values()), report
+    assert [paper['title'] for paper in papers] == ['2024', '2023'], papers
+
+    print(f"\n✅ Federated search test complete in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+Gap Prompt Builder
+Compact prompts for the Research Gap Analyzer
+
+The original comparison wrapped every paper in '=' rulers, repeated the
+five section headers per paper, kept 'N/A' placeholders and sent a long
+fixed instruction block. The compact builder writes one dense record per
+paper with two-letter field codes, drops empty fields, replaces sentences
+already given for an earlier paper with a back-reference, and keeps only
+a one-line description per reply field. The reply itself is JSON matching
+the analyzer's GAP_SCHEMA.
+"""
+
+import re
+
+from agents.token_budget import estimate_tokens, truncate_to_tokens
+
+
+FIELDS = [
+    ('research_question', 'RQ', 'Research Question'),
+    ('methodology', 'ME', 'Methodology'),
+    ('key_findings', 'KF', 'Key Findings'),
+    ('limitations', 'LI', 'Limitations'),
+    ('future_work', 'FW', 'Future Work'),
+]
+
+EMPTY_VALUES = {'', 'n/a', 'na', 'none', 'not mentioned', 'not specified'}
+
+COMPACT_GAP_PROMPT = """Research expert: find research gaps across these papers for the query "{research_query}".
+Papers (RQ=research question, ME=methodology, KF=key findings, LI=limitations, FW=future work; [=Pn] repeats paper n):
+{papers}
+
+Reply as a JSON object, specific and concise:
+common_themes: what the papers share
+divergent_approaches: where methods or focus differ
+research_gaps: unexplored methods, untested domains, missing comparisons, unaddressed limitations
+proposed_directions: 3-5 specific research questions
+novel_contribution: a novel contribution to this field
+"""
+
+
+def _clean(value):
+    """Collapse whitespace and strip markdown emphasis"""
+    return re.sub(r'\s+', ' ', str(value).replace('**', '')).strip()
+
+
+def _sentence_key(sentence):
+    return ' '.join(re.findall(r'[a-z0-9]+', sentence.lower()))
+
+
+def compact_comparison(analyzed_papers, max_field_tokens=None):
+    """
+    Build the dense per-paper block of the gap prompt
+
+    Args:
+        analyzed_papers (list): Analyses from the Paper Analyzer
+        max_field_tokens (int): Optional cap on each field
+
+    Returns:
+        str: One 'P<n> <title>' line per paper followed by its non-empty fields
+    """
+    seen = {}   # sentence key -> paper number that first stated it
+    lines = []
+
+    for i, paper in enumerate(analyzed_papers, 1):
+        lines.append(f"P{i} {_clean(paper['title'])}")
+        summary = paper.get('summary') or {}
+
+        for key, code, _ in FIELDS:
+            value = _clean(summary.get(key, ''))
+            if value.lower().rstrip('.') in EMPTY_VALUES:
+                continue
+            if max_field_tokens:
+                value = truncate_to_tokens(value, max_field_tokens)
+
+            # Say each sentence once; later papers point back to the first
+            kept = []
+            for sentence in re.split(r'(?<=[.!?])\s+', value):
+                sentence_key = _sentence_key(sentence)
+                if not sentence_key:
+                    continue
+                if sentence_key in seen and seen[sentence_key] != i:
+                    reference = f"[=P{seen[sentence_key]}]"
+                    if reference not in kept:
+                        kept.append(reference)
+                else:
+                    seen.setdefault(sentence_key, i)
+                    kept.append(sentence)
+
+            if kept:
+                lines.append(f"{code}: {' '.join(kept)}")
+
+    return '\n'.join(lines)
+
+
+def build_gap_prompt(analyzed_papers, research_query, max_field_tokens=None):
+    """Return the compact gap-analysis prompt"""
+    return COMPACT_GAP_PROMPT.format(
+        research_query=_clean(research_query),
+        papers=compact_comparison(analyzed_papers, max_field_tokens)
+    )
+
+
+def verbose_gap_prompt(analyzed_papers, research_query):
+    """The original gap-analysis prompt, kept as the baseline for prompt_reduction"""
+    comparison_text = ""
+
+    for i, paper in enumerate(analyzed_papers, 1):
+        summary = paper.get('summary', {})
+        comparison_text += f"\n{'=' * 60}\n"
+        comparison_text += f"PAPER {i}: {paper['title']}\n"
+        comparison_text += f"{'=' * 60}\n"
+        for key, _, label in FIELDS:
+            comparison_text += f"\n{label}:\n{summary.get(key, 'N/A')}\n"
+
+    return f"""You are a research expert analyzing academic papers to identify research gaps.
+
+Original Research Query: {research_query}
+
+Papers Being Compared:
+{comparison_text}
+
+Your Task: Perform a comprehensive gap analysis across these papers.
+
+Provide a structured analysis with these sections:
+
+1. COMMON THEMES: What do all these papers agree on or explore together?
+
+2. DIVERGENT APPROACHES: Where do the papers differ in methodology or focus?
+
+3. RESEARCH GAPS: What has NOT been explored yet? What's missing?
+   - Unexplored methodologies
+   - Untested domains/applications
+   - Missing comparisons
+   - Unaddressed limitations
+
+4. PROPOSED RESEARCH DIRECTIONS: Based on the gaps, what are 3-5 specific research questions that could be pursued?
+
+5. NOVEL CONTRIBUTION OPPORTUNITIES: What would be a novel contribution to this field?
+
+Format your response as:
+COMMON THEMES: [answer]
+
+DIVERGENT APPROACHES: [answer]
+
+RESEARCH GAPS: [answer]
+
+PROPOSED RESEARCH DIRECTIONS:
+1. [question 1]
+2. [question 2]
+3. [question 3]
+
+NOVEL CONTRIBUTION: [answer]
+
+Keep each section clear and specific.
+"""
+
+
+def prompt_reduction(analyzed_papers, research_query, compact_prompt=None):
+    """
+    Compare the compact prompt against the original one
+
+    Returns:
+        dict: 'verbose_tokens', 'compact_tokens' and 'saved_pct'
+    """
+    if compact_prompt is None:
+        compact_prompt = build_gap_prompt(analyzed_papers, research_query)
+    verbose = estimate_tokens(verbose_gap_prompt(analyzed_papers, research_query))
+    compact = estimate_tokens(compact_prompt)
+    return {
+        'verbose_tokens': verbose,
+        'compact_tokens': compact,
+        'saved_pct': round(100 * (verbose - compact) / verbose, 1)
+    }
+
+
+def main():
+    """Show the compact prompt and its size reduction on sample analyses"""
+    papers = [
+        {
+            'title': 'Attention Is All You Need',
+            'summary': {
+                'research_question': 'Can we build sequence models without recurrence or convolution?',
+                'methodology': 'Transformer architecture using self-attention mechanisms.',
+                'key_findings': 'Achieved state-of-the-art on translation tasks, faster training.',
+                'limitations': 'Requires large amounts of training data.',
+                'future_work': ''
+            }
+        },
+        {
+            'title': 'BERT: Pre-training of Deep Bidirectional Transformers',
+            'summary': {
+                'research_question': 'Can we pre-train transformers bidirectionally for better understanding?',
+                'methodology': 'Masked language modeling and next sentence prediction.',
+                'key_findings': 'BERT outperforms previous models on 11 NLP tasks.',
+                'limitations': 'Requires large amounts of training data. Computational cost is very high.',
+                'future_work': 'N/A'
+            }
+        }
+    ]
+    query = "transformer architectures for NLP"
+
+    prompt = build_gap_prompt(papers, query)
+    print(prompt)
+
+    stats = prompt_reduction(papers, query, prompt)
+    print(f"📉 Gap prompt: ~{stats['verbose_tokens']} -> ~{stats['compact_tokens']} tokens "
+          f"({stats['saved_pct']}% smaller)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""
+Gemini Client
+The one place the agents call the Gemini generateContent API
+
+Every call estimates its prompt size locally, is checked against the
+run's TokenLedger (if any) before it is sent, and records the actual
+token counts from the response's usageMetadata under its stage.
+
+generate_json asks for schema-constrained JSON (responseSchema) and
+validates the reply. Fields that come back missing or empty are re-asked
+with a short follow-up prompt that carries only a little context and a
+schema restricted to those fields, instead of repeating the full call.
+
+Without an explicit model, the stage's route from the ModelRouter is
+used: models are tried in order, and an outage (timeout, 429, 5xx or an
+open breaker) fails over to the next one. Each model has its own
+circuit breaker ('gemini:<model>'), so a failing model fails fast
+instead of every call waiting out its timeout. A run's Deadline caps
+each call's timeout at the time the run has left, and every request
+first takes a slot from the shared gemini_limiter.
+
+Requests go through `transport` (requests.post by default);
+set_transport(StubGemini()) or SCHOLARSYNC_GEMINI_STUB=1 runs offline.
+"""
+
+import json
+import os
+import re
+import time
+
+import requests
+
+from agents.circuit_breaker import CircuitOpenError, breakers
+from agents.deadline import DeadlineExceeded
+from agents.model_router import breaker_name, model_router
+from agents.rate_limiter import gemini_limiter
+from agents.token_budget import TokenBudgetExceeded, estimate_tokens
+
+
+GEMINI_URL = 'https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent?key={api_key}'
+
+
+class GeminiError(RuntimeError):
+    """Gemini returned a non-200 response, or a 200 response without a candidate"""
+
+    def __init__(self, status_code, detail=None):
+        super().__init__(f"Gemini API error: {status_code}" + (f" ({detail})" if detail else ""))
+        self.status_code = status_code
+
+    @property
+    def outage(self):
+        """True for rate limiting and server errors (not our own bad requests)"""
+        return self.status_code == 429 or self.status_code >= 500
+
+
+def _is_outage(error):
+    return not isinstance(error, GeminiError) or error.outage
+
+
+# Callable with the requests.post signature; None means requests.post
+# (or the offline stub when SCHOLARSYNC_GEMINI_STUB is set)
+transport = None
+
+
+def set_transport(post):
+    """Send Gemini requests through `post` (e.g. a StubGemini); None restores requests.post"""
+    global transport
+    transport = post
+
+
+def _transport():
+    global transport
+    if transport is None and os.getenv('SCHOLARSYNC_GEMINI_STUB'):
+        from agents.gemini_stub import StubGemini
+        transport = StubGemini()
+    return transport or requests.post
+
+
+FOLLOWUP_PROMPT = """{context}
+
+Fields already answered:
+{known}
+
+Fill in ONLY these missing fields as a JSON object: {fields}
+"""
+
+
+def generate_content(api_key, model, prompt, timeout=60, stage='gemini', ledger=None, reserve_tokens=0,
+                     response_schema=None, deadline=None, router=None, with_model=False):
+    """
+    Send one prompt to Gemini and return the response text
+
+    Args:
+        api_key (str): Gemini API key
+        model (str): Model name, e.g. 'gemini-2.0-flash', or None to use
+            the stage's route with failover
+        prompt (str): Full prompt text
+        timeout (float): Request timeout in seconds
+        stage (str): Workflow stage the usage is recorded under
+        ledger (TokenLedger): Budget and usage accounting for the run
+        reserve_tokens (int): Expected output tokens, counted in the budget check
+        response_schema (dict): OpenAPI-style schema; when given, Gemini is
+            asked for JSON that matches it
+        deadline (Deadline): Run deadline; the timeout is cut to the time left
+        router (ModelRouter): Routes and model health (default: model_router)
+        with_model (bool): Also return the model that answered (after failover)
+
+    Returns:
+        str: Text of the first candidate, or (text, model) with with_model
+
+    Raises:
+        TokenBudgetExceeded: The call does not fit in the remaining budget
+        DeadlineExceeded: Too little time is left to start the call
+        CircuitOpenError: Every model's breaker is open
+        GeminiError: Gemini answered with a non-200 status or no candidate
+            (e.g. the prompt was blocked)
+    """
+    router = router or model_router
+    estimated = estimate_tokens(prompt)
+    reserved = estimated + reserve_tokens
+    if ledger:
+        ledger.check(stage, reserved)
+
+    data = {
+        'contents': [{
+            'parts': [{'text': prompt}]
+        }]
+    }
+    if response_schema:
+        data['generationConfig'] = {
+            'responseMimeType': 'application/json',
+            'responseSchema': response_schema
+        }
+
+    models = [model] if model else router.candidates(stage)
+    try:
+        for attempt, name in enumerate(models, 1):
+            try:
+                result = _post(api_key, name, data, timeout, stage, deadline, router)
+                break
+            except (CircuitOpenError, GeminiError, requests.RequestException) as e:
+                if attempt == len(models) or not _is_outage(e):
+                    raise
+                print(f"🔀 {name} unavailable for {stage} ({e}), failing over to {models[attempt]}")
+    except BaseException:
+        if ledger:
+            ledger.release(reserved)
+        raise
+
+    if ledger:
+        ledger.record(stage, result.get('usageMetadata', {}), estimated, model=name, reserved=reserved)
+
+    try:
+        text = result['candidates'][0]['content']['parts'][0]['text']
+    except (KeyError, IndexError, TypeError):
+        reason = result.get('promptFeedback', {}).get('blockReason') if isinstance(result, dict) else None
+        raise GeminiError(200, f"no candidates{f', blocked: {reason}' if reason else ''}")
+    return (text, name) if with_model else text
+
+
+def _post(api_key, model, data, timeout, stage, deadline, router):
+    """One request to one model, through the rate limiter and its breaker, recording latency and outcome"""
+    if not gemini_limiter.acquire(deadline.remaining() if deadline else None):
+        raise DeadlineExceeded(f"{stage} found no free Gemini slot before the deadline")
+    try:
+        return _post_in_slot(api_key, model, data, timeout, stage, deadline, router)
+    finally:
+        gemini_limiter.release()
+
+
+def _post_in_slot(api_key, model, data, timeout, stage, deadline, router):
+    # A timeout we shortened for the deadline is not the model's fault
+    clamped = deadline.timeout(timeout, stage) if deadline else timeout
+    if clamped < timeout:
+        counts_as_failure = lambda e: _is_outage(e) and not isinstance(e, requests.Timeout)
+    else:
+        counts_as_failure = _is_outage
+
+    started = time.monotonic()
+    try:
+        with breakers.get(breaker_name(model)).guard(counts_as_failure=counts_as_failure):
+            response = _transport()(
+                GEMINI_URL.format(model=model, api_key=api_key),
+                headers={'Content-Type': 'application/json'},
+                json=data,
+                timeout=clamped
+            )
+
+            if response.status_code != 200:
+                raise GeminiError(response.status_code)
+
+            result = response.json()
+    except CircuitOpenError:
+        raise
+    except Exception as e:
+        # Our own bad requests and deadline cuts say nothing about the model
+        if counts_as_failure(e):
+            router.observe(model, time.monotonic() - started, ok=False)
+        raise
+
+    router.observe(model, time.monotonic() - started, ok=True)
+    return result
+
+
+def parse_json_reply(text):
+    """Parse a JSON object from a reply, tolerating code fences; {} if there is none"""
+    text = re.sub(r'^```(?:json)?\s*|\s*```$', '', text.strip())
+    try:
+        data = json.loads(text)
+    except ValueError:
+        match = re.search(r'\{.*\}', text, re.DOTALL)
+        if not match:
+            return {}
+        try:
+            data = json.loads(match.group(0))
+        except ValueError:
+            return {}
+    return data if isinstance(data, dict) else {}
+
+
+def field_text(value):
+    """Text of a reply field; a list (a model answering with bullets) is joined with spaces"""
+    if isinstance(value, (list, tuple)):
+        return ' '.join(str(item).strip() for item in value if str(item).strip())
+    return str(value or '').strip()
+
+
+def missing_fields(data, schema):
+    """Required schema fields that are absent, empty or of the wrong type"""
+    missing = []
+    for name in schema.get('required', []):
+        value = data.get(name)
+        expected = schema['properties'][name]['type']
+        if expected == 'ARRAY':
+            ok = isinstance(value, list) and any(str(item).strip() for item in value)
+        else:
+            ok = isinstance(value, str) and value.strip() != ''
+        if not ok:
+            missing.append(name)
+    return missing
+
+
+def generate_json(api_key, model, prompt, schema, timeout=60, stage='gemini', ledger=None, reserve_tokens=0,
+                  followup_context='', fallback_parser=None, max_reasks=1, deadline=None, router=None,
+                  with_model=False):
+    """
+    Ask Gemini for a JSON object matching schema, re-asking only for missing fields
+
+    Args:
+        schema (dict): OpenAPI-style OBJECT schema with 'properties' and 'required'
+        followup_context (str): Short context for re-ask prompts (e.g. title
+            and an excerpt), sent instead of the full original prompt
+        fallback_parser (callable): Parses a non-JSON reply into a dict
+        max_reasks (int): Follow-up calls allowed for missing fields
+        (other arguments as for generate_content)
+
+    Returns:
+        tuple: (data, missing) where missing lists required fields still empty;
+            with with_model, (data, missing, model) where model answered every
+            call, or is None if failover mixed in another model's answers
+
+    Raises:
+        TokenBudgetExceeded, DeadlineExceeded, GeminiError: Only from the
+        first call; a failed re-ask keeps the partial result
+    """
+    text, answered_by = generate_content(api_key, model, prompt, timeout, stage, ledger, reserve_tokens,
+                                         response_schema=schema, deadline=deadline, router=router, with_model=True)
+    data = parse_json_reply(text)
+    if not data and fallback_parser:
+        data = fallback_parser(text)
+
+    missing = missing_fields(data, schema)
+    for _ in range(max_reasks):
+        if not missing:
+            break
+
+        print(f"🔁 Re-asking Gemini for missing field(s): {', '.join(missing)}")
+        known = {name: value for name, value in data.items() if name in schema['properties'] and name not in missing}
+        followup = FOLLOWUP_PROMPT.format(
+            context=followup_context, known=json.dumps(known, indent=1), fields=', '.join(missing)
+        )
+        sub_schema = {
+            'type': 'OBJECT',
+            'properties': {name: schema['properties'][name] for name in missing},
+            'required': missing
+        }
+
+        try:
+            reply, reask_model = generate_content(
+                api_key, model, followup, timeout, f"{stage}_reask", ledger, reserve_tokens // 2,
+                response_schema=sub_schema, deadline=deadline, router=router, with_model=True
+            )
+            extra = parse_json_reply(reply)
+        except (TokenBudgetExceeded, DeadlineExceeded, CircuitOpenError, GeminiError,
+                requests.RequestException) as e:
+            print(f"⚠️  Re-ask failed, keeping partial result: {e}")
+            break
+
+        if any(name in extra for name in missing) and reask_model != answered_by:
+            answered_by = None
+        data.update({name: extra[name] for name in missing if name in extra})
+        missing = missing_fields(data, schema)
+
+    return (data, missing, answered_by) if with_model else (data, missing)
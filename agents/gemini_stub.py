@@ -0,0 +1,99 @@
+"""
+Gemini Stub
+An offline stand-in for the Gemini generateContent endpoint
+
+StubGemini is called like requests.post and answers like Gemini: replies
+match the requested responseSchema, ranking prompts get a ranking of all
+papers, and each answer carries usageMetadata. Latency and failures can
+be set per model to exercise routing, failover and circuit breakers
+without network access or an API key.
+
+Enable it with gemini.set_transport(StubGemini()) or by setting
+SCHOLARSYNC_GEMINI_STUB=1.
+"""
+
+import json as _json
+import re
+import threading
+import time
+
+import requests
+
+from agents.token_budget import estimate_tokens
+
+
+class StubResponse:
+    """The parts of requests.Response the Gemini client reads"""
+
+    def __init__(self, status_code, payload=None):
+        self.status_code = status_code
+        self._payload = payload or {}
+
+    def json(self):
+        return self._payload
+
+
+class StubGemini:
+    """Fake generateContent endpoint with per-model latency and failures"""
+
+    def __init__(self, latency=None, failures=None):
+        """
+        Args:
+            latency (dict): {model: seconds} added before answering
+            failures (dict): {model: status code} returned instead of an answer
+                (e.g. 503); use 'timeout' to raise requests.Timeout
+        """
+        self.latency = dict(latency or {})
+        self.failures = dict(failures or {})
+        self.calls = []   # models called, in order
+        self._lock = threading.Lock()
+
+    def __call__(self, url, headers=None, json=None, timeout=None):
+        # `json` is the request body, as in requests.post
+        model = re.search(r'/models/([^:]+):generateContent', url).group(1)
+        with self._lock:
+            self.calls.append(model)
+
+        delay = self.latency.get(model, 0.0)
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise requests.Timeout(f"stub {model} timed out after {timeout}s")
+        time.sleep(delay)
+
+        failure = self.failures.get(model)
+        if failure == 'timeout':
+            raise requests.Timeout(f"stub {model} timed out")
+        if failure:
+            return StubResponse(failure)
+
+        body = json
+        prompt = body['contents'][0]['parts'][0]['text']
+        schema = (body.get('generationConfig') or {}).get('responseSchema')
+        text = self.reply(model, prompt, schema)
+        prompt_tokens = estimate_tokens(prompt)
+        output_tokens = estimate_tokens(text)
+        return StubResponse(200, {
+            'candidates': [{'content': {'parts': [{'text': text}]}}],
+            'usageMetadata': {
+                'promptTokenCount': prompt_tokens,
+                'candidatesTokenCount': output_tokens,
+                'totalTokenCount': prompt_tokens + output_tokens
+            }
+        })
+
+    @staticmethod
+    def reply(model, prompt, schema=None):
+        """Deterministic reply text for a prompt"""
+        if schema:
+            data = {}
+            for name, field in schema.get('properties', {}).items():
+                if field.get('type') == 'ARRAY':
+                    data[name] = [f"Stub {name} {i} ({model})" for i in (1, 2, 3)]
+                else:
+                    data[name] = f"Stub {name} ({model})"
+            return _json.dumps(data)
+
+        papers = re.findall(r'^Paper (\d+):', prompt, re.MULTILINE)
+        if papers:
+            return ','.join(papers)
+        return f"Stub reply ({model})"
@@ -10,70 +10,324 @@ Concepts from 5-Day AI Agents Course:
 
 import requests
 import json
+import math
 import os
+import re
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 from dotenv import load_dotenv
 
+from agents.circuit_breaker import breakers
+from agents.deadline import DeadlineExceeded
+from agents.dedup import dedup_papers, normalize_arxiv_id
+from agents.federated_search import ArxivSource, FederatedSearch
+from agents.gemini import generate_content
+from agents.model_router import model_router
+from agents.relevance_cache import RelevanceScoreCache, interpolate_scores, paper_id, pick_anchors
+from agents.search_cache import SearchResultCache
+from agents.singleflight import SingleFlight
+from agents.token_budget import TokenBudgetExceeded, estimate_tokens
+
+
+ARXIV_API_URL = 'http://export.arxiv.org/api/query'
+
+# Output tokens reserved for a ranking reply ("3,1,4,2,...") in budget checks
+RANK_OUTPUT_TOKENS = 100
+
+_ATOM = '{http://www.w3.org/2005/Atom}'
+_ARXIV = '{http://arxiv.org/schemas/atom}'
+
+
+def iter_atom_entries(stream):
+    """
+    Incrementally parse an arxiv Atom feed, yielding paper dictionaries
+
+    Each <entry> is turned into a paper as soon as its closing tag is read
+    and then removed from the tree, so memory does not grow with the feed.
+
+    Args:
+        stream: Binary file-like object with the Atom XML
+
+    Yields:
+        dict: Paper dictionary in the search_papers format
+    """
+    root = None
+    for event, elem in ET.iterparse(stream, events=('start', 'end')):
+        if root is None and event == 'start':
+            root = elem
+            continue
+        if event != 'end' or elem.tag != _ATOM + 'entry':
+            continue
+
+        entry_id = elem.findtext(_ATOM + 'id', '')
+        pdf_url = next(
+            (link.get('href') for link in elem.findall(_ATOM + 'link') if link.get('title') == 'pdf'),
+            entry_id.replace('/abs/', '/pdf/')
+        )
+        summary = ' '.join(elem.findtext(_ATOM + 'summary', '').split())
+
+        yield {
+            'title': ' '.join(elem.findtext(_ATOM + 'title', '').split()),
+            'authors': [a.findtext(_ATOM + 'name', '') for a in elem.findall(_ATOM + 'author')][:3],
+            'summary': summary[:300] + "...",
+            'published': elem.findtext(_ATOM + 'published', '')[:10],
+            'url': pdf_url,
+            'arxiv_id': entry_id.rsplit('/abs/', 1)[-1],
+            'doi': elem.findtext(_ARXIV + 'doi')
+        }
+
+        # Drop the finished entry so the tree never holds more than one
+        elem.clear()
+        root.remove(elem)
+
 
 class LiteratureScoutAgent:
     """Agent that searches and ranks research papers"""
 
-    def __init__(self, api_key):
-        """Initialize the agent with Gemini API key"""
+    def __init__(self, api_key, extra_sources=None, search_cache=True, relevance_cache=True, router=None):
+        """
+        Initialize the agent with Gemini API key
+
+        Args:
+            api_key (str): Gemini API key
+            extra_sources (list): Additional PaperSource instances (local index,
+                OpenAlex, ...) searched concurrently alongside arxiv
+            search_cache (SearchResultCache | bool): Cache for search results;
+                True uses a default in-memory cache, False disables caching
+            relevance_cache (RelevanceScoreCache | bool): Per-(query, paper)
+                relevance scores for incremental re-ranking
+            router (ModelRouter): Model choice for ranking (default: model_router)
+        """
         self.api_key = api_key
-        self.model = 'gemini-2.0-flash'
 
-    def search_papers(self, query, max_results=5):
+        # Ranking uses the 'ranking' route (a lighter model by default)
+        self.router = router or model_router
+        self.model = self.router.primary('ranking')
+
+        # Federated search is only used when there is more than arxiv to ask
+        self.federated = None
+        if extra_sources:
+            self.federated = FederatedSearch([ArxivSource(self)] + list(extra_sources))
+
+        # Results for repeated queries, keyed on the normalized query text
+        if search_cache is True:
+            search_cache = SearchResultCache()
+        self.search_cache = search_cache or None
+
+        # Relevance scores per (normalized query, paper) so re-ranks only score new papers
+        if relevance_cache is True:
+            relevance_cache = RelevanceScoreCache()
+        self.relevance_cache = relevance_cache or None
+
+        # Identical concurrent searches share one round-trip to the sources
+        self._inflight = SingleFlight()
+
+        # Searches with a deadline run here so the caller can stop waiting
+        self._search_pool = ThreadPoolExecutor(max_workers=4)
+
+    def search_papers(self, query, max_results=5, dedup=True, sort_by='relevance', deadline=None):
         """
-        Search arxiv for papers
+        Search arxiv (and any extra sources) for papers
 
         This is a CUSTOM TOOL (Day 2: Tools & MCP)
 
         Args:
             query (str): Search query for papers
             max_results (int): Maximum number of papers to retrieve
+            dedup (bool): Collapse arXiv versions and near-duplicate papers
+            sort_by (str): 'relevance', 'submitted' or 'updated'
+            deadline (Deadline): Run deadline; if the search has not finished
+                by then, no papers are returned
 
         Returns:
             list: List of paper dictionaries
         """
-        print(f"\n🔍 Searching arxiv for: '{query}'")
+        key = SearchResultCache.make_key(query, max_results, sort_by, dedup=dedup)
+
+        def fetch():
+            papers, shared = self._inflight.do(key, self._search_uncached, query, max_results, dedup, sort_by)
+            if shared:
+                print(f"🔗 Joined an in-flight search for: '{query}'")
+                papers = [dict(paper) for paper in papers]
+            return papers
+
+        def lookup():
+            if self.search_cache:
+                return self.search_cache.get_or_fetch(key, fetch)
+            return fetch()
 
         try:
-            import arxiv
-
-            # Create arxiv client and search
-            client = arxiv.Client()
-            search = arxiv.Search(
-                query=query,
-                max_results=max_results,
-                sort_by=arxiv.SortCriterion.Relevance
-            )
+            remaining = deadline.remaining() if deadline else None
+            if remaining is None:
+                papers = lookup()
+            else:
+                # A late search keeps running and fills the cache for the next try
+                try:
+                    papers = self._search_pool.submit(lookup).result(timeout=remaining)
+                except FutureTimeout:
+                    deadline.degrade('search', 'skipped', f"no results for '{query}' before the deadline")
+                    return []
+
+            print(f"✅ Found {len(papers)} papers\n")
+            return papers
+
+        except Exception as e:
+            print(f"❌ Error searching papers: {e}")
+            return []
 
-            papers = []
+    def _search_uncached(self, query, max_results, dedup, sort_by):
+        """Run the search against the live sources, raising on failure"""
+        if self.federated:
+            print(f"\n🔍 Searching {len(self.federated.sources)} sources for: '{query}'")
+            papers = self.federated.search(query, max_results=max_results, sort_by=sort_by)
+        else:
+            papers = self.search_arxiv(query, max_results, sort_by=sort_by)
+
+        if dedup:
+            found = len(papers)
+            papers = dedup_papers(papers)
+            if len(papers) < found:
+                print(f"🧹 Removed {found - len(papers)} duplicate paper(s)")
+
+        return papers
+
+    def search_arxiv(self, query, max_results=5, sort_by='relevance'):
+        """
+        Search arxiv only, raising on failure
+
+        Args:
+            query (str): Search query for papers
+            max_results (int): Maximum number of papers to retrieve
+            sort_by (str): 'relevance', 'submitted' or 'updated'
+
+        Returns:
+            list: List of paper dictionaries
+        """
+        print(f"\n🔍 Searching arxiv for: '{query}'")
+
+        import arxiv
+
+        sort_criteria = {
+            'relevance': arxiv.SortCriterion.Relevance,
+            'submitted': arxiv.SortCriterion.SubmittedDate,
+            'updated': arxiv.SortCriterion.LastUpdatedDate
+        }
+
+        # Create arxiv client and search
+        client = arxiv.Client()
+        search = arxiv.Search(
+            query=query,
+            max_results=max_results,
+            sort_by=sort_criteria[sort_by]
+        )
+
+        papers = []
+        with breakers.get('arxiv').guard():
             for result in client.results(search):
                 papers.append({
                     'title': result.title,
                     'authors': [author.name for author in result.authors][:3],
                     'summary': result.summary[:300] + "...",
                     'published': str(result.published.date()),
-                    'url': result.pdf_url
+                    'url': result.pdf_url,
+                    'arxiv_id': result.get_short_id(),
+                    'doi': result.doi
                 })
 
-            print(f"✅ Found {len(papers)} papers\n")
-            return papers
+        return papers
 
-        except Exception as e:
-            print(f"❌ Error searching papers: {e}")
-            return []
+    def stream_arxiv(self, query, max_results=1000, page_size=100, page_delay=3.0):
+        """
+        Stream arxiv results page by page
+
+        A generator for scanning thousands of candidates: each page is
+        requested only when the previous one has been consumed, and its
+        Atom response is parsed incrementally off the socket. Callers can
+        start working on the first papers while later pages are pending.
+        Version duplicates (same arxiv ID) are skipped as they stream past.
 
-    def rank_papers_with_gemini(self, papers, user_query):
+        Args:
+            query (str): Search query for papers
+            max_results (int): Total number of papers to yield at most
+            page_size (int): Papers requested per API call
+            page_delay (float): Seconds between page requests (arxiv asks for 3)
+
+        Yields:
+            dict: Paper dictionary in the search_papers format
+        """
+        print(f"\n🔍 Streaming arxiv results for: '{query}' (up to {max_results})")
+
+        seen_ids = set()
+        yielded = 0
+        start = 0
+
+        while yielded < max_results:
+            if start > 0:
+                time.sleep(page_delay)
+
+            params = {
+                'search_query': query,
+                'start': start,
+                'max_results': min(page_size, max_results - yielded),
+                'sortBy': 'relevance'
+            }
+
+            with breakers.get('arxiv').guard():
+                response = requests.get(ARXIV_API_URL, params=params, stream=True, timeout=30)
+                if response.status_code == 429 or response.status_code >= 500:
+                    response.close()
+                    response.raise_for_status()
+
+            with response:
+                response.raise_for_status()
+                response.raw.decode_content = True
+
+                page_count = 0
+                for paper in iter_atom_entries(response.raw):
+                    page_count += 1
+                    base_id, _ = normalize_arxiv_id(paper['arxiv_id'])
+                    if base_id in seen_ids:
+                        continue
+                    seen_ids.add(base_id)
+
+                    yield paper
+                    yielded += 1
+                    if yielded >= max_results:
+                        break
+
+            # A short page means the result set is exhausted
+            if page_count < params['max_results']:
+                break
+            start += page_count
+
+        print(f"✅ Streamed {yielded} papers")
+
+    def rank_papers_with_gemini(self, papers, user_query, chunk_token_budget=3000, max_workers=4, ledger=None,
+                                deadline=None):
         """
         Use Gemini LLM to rank papers by relevance
 
         Combines: Custom Tool + LLM Reasoning (Day 2 concept)
 
+        Small candidate sets are ranked in a single call. Sets that do not
+        fit in one token-budgeted prompt go through a chunked tournament
+        (see rank_papers_chunked). Either way every paper is returned,
+        with a 'relevance_score' field (higher is more relevant).
+
+        With a relevance cache, papers already scored for this query reuse
+        their scores; only unseen papers (plus a few cached anchor papers
+        to calibrate against) are sent to Gemini.
+
         Args:
             papers (list): List of paper dictionaries
             user_query (str): Original search query
+            chunk_token_budget (int): Approximate prompt tokens of paper text per call
+            max_workers (int): Concurrent Gemini calls in chunked mode
+            ledger (TokenLedger): Run budget; chunks that no longer fit keep
+                their search order
+            deadline (Deadline): Run deadline; chunks that cannot be ranked in
+                time keep their search order
 
         Returns:
             list: Ranked list of papers
@@ -81,8 +335,192 @@ class LiteratureScoutAgent:
         if not papers:
             return []
 
+        if not self.relevance_cache:
+            return self._rank_uncached(papers, user_query, chunk_token_budget, max_workers, ledger, deadline)[0]
+
+        ids = [paper_id(paper) for paper in papers]
+        cached = self.relevance_cache.get_scores(user_query, papers)
+        new_papers = [paper for paper, pid in zip(papers, ids) if pid not in cached]
+
+        if not cached:
+            ranked_papers, complete = self._rank_uncached(
+                papers, user_query, chunk_token_budget, max_workers, ledger, deadline
+            )
+            if complete:
+                self.relevance_cache.put_scores(
+                    user_query, {paper_id(paper): paper['relevance_score'] for paper in ranked_papers}
+                )
+            return ranked_papers
+
+        scores = dict(cached)
+        if new_papers:
+            print(f"♻️  Reusing {len(cached)} cached relevance scores, ranking {len(new_papers)} new paper(s)")
+            by_id = dict(zip(ids, papers))
+            anchors = pick_anchors(cached)
+            ranked, complete = self._rank_uncached(
+                new_papers + [by_id[pid] for pid in anchors], user_query, chunk_token_budget, max_workers, ledger,
+                deadline
+            )
+            new_scores = interpolate_scores(
+                [paper_id(paper) for paper in ranked], {pid: cached[pid] for pid in anchors}
+            )
+            if complete:
+                self.relevance_cache.put_scores(user_query, new_scores)
+            scores.update(new_scores)
+        else:
+            print(f"♻️  All {len(papers)} papers already scored for this query")
+
+        ranked_papers = []
+        for pid, paper in sorted(zip(ids, papers), key=lambda item: scores[item[0]], reverse=True):
+            paper = dict(paper)
+            paper['relevance_score'] = round(scores[pid], 4)
+            ranked_papers.append(paper)
+        return ranked_papers
+
+    def _rank_uncached(self, papers, user_query, chunk_token_budget, max_workers, ledger=None, deadline=None):
+        """
+        Rank papers with Gemini from scratch (single call or tournament)
+
+        Returns:
+            tuple: (ranked papers, complete) where complete is False if any
+            Gemini call failed and search order was used instead
+        """
+        chunks = self._chunk_papers(papers, chunk_token_budget)
+        if len(chunks) > 1:
+            return self._rank_tournament(
+                papers, user_query, chunk_token_budget, max_workers, ledger=ledger, deadline=deadline
+            )
+
         print("🤖 Asking Gemini to rank papers by relevance...\n")
 
+        order, complete = self._safe_rank_order(papers, user_query, ledger, deadline)
+
+        ranked_papers = []
+        for position, i in enumerate(order):
+            paper = dict(papers[i])
+            paper['relevance_score'] = round(_borda_score(position, len(order)), 4)
+            ranked_papers.append(paper)
+
+        print(f"✅ Gemini ranked {len(ranked_papers)} papers\n")
+        return ranked_papers, complete
+
+    def rank_papers_chunked(self, papers, user_query, chunk_token_budget=3000, max_workers=4, advance_ratio=0.25,
+                            ledger=None, deadline=None):
+        """
+        Rank a large candidate set with a chunked tournament
+
+        Round 1 splits the papers into token-budgeted chunks and ranks the
+        chunks concurrently. Each paper's score is its round number plus a
+        normalized Borda score for its position in its chunk. The top
+        `advance_ratio` of every chunk advances to the next round, until
+        the survivors fit in a single chunk. A paper that advanced always
+        outscores one that did not, so the final order is a sort by score.
+        Total calls are about n/chunk * 1/(1 - advance_ratio), i.e. O(n/chunk).
+
+        Args:
+            papers (list): List of paper dictionaries
+            user_query (str): Original search query
+            chunk_token_budget (int): Approximate prompt tokens of paper text per call
+            max_workers (int): Concurrent Gemini calls
+            advance_ratio (float): Fraction of each chunk promoted to the next round
+            ledger (TokenLedger): Token budget and usage accounting for the run
+            deadline (Deadline): Run deadline for the Gemini calls
+
+        Returns:
+            list: All papers, most relevant first, each with 'relevance_score'
+        """
+        if not papers:
+            return []
+        return self._rank_tournament(
+            papers, user_query, chunk_token_budget, max_workers, advance_ratio, ledger, deadline
+        )[0]
+
+    def _rank_tournament(self, papers, user_query, chunk_token_budget, max_workers, advance_ratio=0.25, ledger=None,
+                         deadline=None):
+        """Run the tournament for rank_papers_chunked, returning (ranked papers, complete)"""
+        print(f"🤖 Ranking {len(papers)} papers with a chunked Gemini tournament...\n")
+
+        scores = {i: 0.0 for i in range(len(papers))}
+        contenders = list(range(len(papers)))
+        round_number = 0
+        calls = 0
+        complete = True
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            while contenders:
+                chunks = self._chunk_papers([papers[i] for i in contenders], chunk_token_budget)
+                chunks = [[contenders[j] for j in chunk] for chunk in chunks]
+
+                orders = pool.map(
+                    lambda chunk: self._safe_rank_order([papers[i] for i in chunk], user_query, ledger, deadline),
+                    chunks
+                )
+                calls += len(chunks)
+
+                survivors = []
+                for chunk, (order, chunk_complete) in zip(chunks, orders):
+                    complete = complete and chunk_complete
+                    for position, local_index in enumerate(order):
+                        scores[chunk[local_index]] = round_number + _borda_score(position, len(order))
+                    if len(chunks) > 1:
+                        advance = max(1, math.ceil(len(chunk) * advance_ratio))
+                        survivors.extend(chunk[local_index] for local_index in order[:advance])
+
+                print(f"   Round {round_number + 1}: {len(contenders)} papers in {len(chunks)} chunk(s)")
+
+                # Stop once a round fits in one chunk (or can no longer shrink)
+                if len(chunks) == 1 or len(survivors) >= len(contenders):
+                    break
+                contenders = survivors
+                round_number += 1
+
+        ranking = sorted(scores, key=lambda i: scores[i], reverse=True)
+        ranked_papers = []
+        for i in ranking:
+            paper = dict(papers[i])
+            paper['relevance_score'] = round(scores[i], 4)
+            ranked_papers.append(paper)
+
+        print(f"✅ Gemini ranked {len(ranked_papers)} papers in {calls} calls\n")
+        return ranked_papers, complete
+
+    @staticmethod
+    def _chunk_papers(papers, token_budget, max_per_chunk=25):
+        """Greedily pack paper indices into chunks of at most token_budget tokens"""
+        chunks = [[]]
+        used = 0
+        for i, paper in enumerate(papers):
+            cost = estimate_tokens(paper.get('title', '')) + estimate_tokens(paper.get('summary', '')) + 10
+            if chunks[-1] and (used + cost > token_budget or len(chunks[-1]) >= max_per_chunk):
+                chunks.append([])
+                used = 0
+            chunks[-1].append(i)
+            used += cost
+        return chunks
+
+    def _safe_rank_order(self, papers, user_query, ledger=None, deadline=None):
+        """Rank one chunk, returning (order, ok); keeps input order if the call fails"""
+        try:
+            return self._gemini_rank_order(papers, user_query, ledger, deadline), True
+        except TokenBudgetExceeded as e:
+            ledger.note_skip('ranking', f"kept search order for {len(papers)} papers ({e})")
+            return list(range(len(papers))), False
+        except DeadlineExceeded as e:
+            deadline.degrade('ranking', 'search_order', f"kept search order for {len(papers)} papers ({e})")
+            return list(range(len(papers))), False
+        except Exception as e:
+            print(f"⚠️ Ranking failed, keeping search order: {e}")
+            return list(range(len(papers))), False
+
+    def _gemini_rank_order(self, papers, user_query, ledger=None, deadline=None):
+        """
+        Ask Gemini for a ranking of papers
+
+        Returns:
+            list: A permutation of range(len(papers)), most relevant first.
+            Papers Gemini leaves out are appended in their original order,
+            so a sloppy reply can never drop entries.
+        """
         # Format papers for Gemini
         papers_text = ""
         for i, paper in enumerate(papers, 1):
@@ -105,41 +543,33 @@ Example format: 3,1,4,2,5
 
 Your ranking:"""
 
-        # Call Gemini API
-        url = f'https://generativelanguage.googleapis.com/v1beta/models/{self.model}:generateContent?key={self.api_key}'
-
-        data = {
-            'contents': [{
-                'parts': [{'text': prompt}]
-            }]
-        }
-
-        try:
-            response = requests.post(
-                url,
-                headers={'Content-Type': 'application/json'},
-                json=data,
-                timeout=30
-            )
-
-            if response.status_code == 200:
-                result = response.json()
-                ranking_text = result['candidates'][0]['content']['parts'][0]['text'].strip()
-
-                # Parse ranking from Gemini's response
-                ranking = [int(x.strip()) - 1 for x in ranking_text.split(',')]
-                ranked_papers = [papers[i] for i in ranking if 0 <= i < len(papers)]
-
-                print(f"✅ Gemini ranked {len(ranked_papers)} papers\n")
-                return ranked_papers
-
-            else:
-                print(f"⚠️ Gemini API error: {response.status_code}")
-                return papers
-
-        except Exception as e:
-            print(f"⚠️ Ranking failed: {e}")
-            return papers
+        # Call Gemini API (raises on errors and when over budget)
+        ranking_text = generate_content(
+            self.api_key, None, prompt, timeout=30,
+            stage='ranking', ledger=ledger, reserve_tokens=RANK_OUTPUT_TOKENS, deadline=deadline, router=self.router
+        ).strip()
+        return _parse_ranking(ranking_text, len(papers))
+
+
+def _borda_score(position, count):
+    """Normalized Borda score: 1.0 for first place down to 1/count for last"""
+    return (count - position) / count
+
+
+def _parse_ranking(ranking_text, count):
+    """
+    Turn Gemini's "3,1,4,2" reply into zero-based indices
+
+    Tolerates extra words, brackets and numbering; ignores out-of-range
+    and repeated numbers; appends any missing papers in original order.
+    """
+    order = []
+    for number in re.findall(r'\d+', ranking_text):
+        i = int(number) - 1
+        if 0 <= i < count and i not in order:
+            order.append(i)
+    order.extend(i for i in range(count) if i not in order)
+    return order
 
 
 def main():
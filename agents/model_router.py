@@ -0,0 +1,176 @@
+"""
+Model Router
+Per-stage Gemini model choice with latency- and error-aware failover
+
+Each workflow stage (ranking, summary, gap_analysis) has an ordered list
+of models: the preferred one first, then alternates. Every call's
+latency and outcome is recorded per model. A model is degraded while its
+circuit breaker ('gemini:<model>') is not closed or its average latency
+is above `slow_seconds`; degraded models move behind the healthy ones,
+so calls fail over to an alternate until the preferred model recovers.
+A demoted model gets no traffic to prove it has recovered, so once every
+`probe_seconds` one call tries it first again (a probe): a fast success
+restarts its latency average, and a half-open breaker gets its trial call.
+
+Routes can be set with SCHOLARSYNC_MODEL_ROUTES, e.g.
+    ranking=gemini-2.0-flash-lite,gemini-2.0-flash;summary=gemini-2.5-flash,gemini-2.0-flash
+"""
+
+import os
+import re
+import threading
+import time
+
+from agents.circuit_breaker import CLOSED, OPEN, breakers
+
+
+DEFAULT_MODEL = 'gemini-2.0-flash'
+
+# Preferred model first; ranking only orders short abstracts, so it
+# starts on the lighter model
+DEFAULT_ROUTES = {
+    'ranking': ['gemini-2.0-flash-lite', 'gemini-2.0-flash'],
+    'summary': ['gemini-2.0-flash', 'gemini-2.0-flash-lite'],
+    'gap_analysis': ['gemini-2.0-flash', 'gemini-2.0-flash-lite'],
+}
+
+
+def breaker_name(model):
+    return f"gemini:{model}"
+
+
+def routes_from_env(name='SCHOLARSYNC_MODEL_ROUTES'):
+    """
+    Parse 'stage=model,model;stage=model' from an environment variable
+
+    Returns:
+        dict: {stage: [models]} for the stages that are set (empty if unset)
+    """
+    routes = {}
+    for entry in os.getenv(name, '').split(';'):
+        stage, _, models = entry.partition('=')
+        models = [model.strip() for model in models.split(',') if model.strip()]
+        if stage.strip() and models:
+            routes[stage.strip()] = models
+    return routes
+
+
+class ModelRouter:
+    """Ordered model choices per stage, reordered by observed health"""
+
+    def __init__(self, routes=None, slow_seconds=20.0, smoothing=0.3, probe_seconds=60.0):
+        """
+        Args:
+            routes (dict): {stage: [models]} merged over DEFAULT_ROUTES
+            slow_seconds (float): Average latency above which a model counts as degraded
+            smoothing (float): Weight of the newest call in the latency average
+            probe_seconds (float): Time since a degraded model was last called
+                after which one call tries it first again
+        """
+        self.routes = {**DEFAULT_ROUTES, **(routes or {})}
+        self.slow_seconds = slow_seconds
+        self.smoothing = smoothing
+        self.probe_seconds = probe_seconds
+
+        self._models = {}   # model -> counters and average latency
+        self._lock = threading.Lock()
+
+    def route(self, stage):
+        """Configured models for a stage ('summary_map', 'summary_reask' use the 'summary' route)"""
+        base = re.sub(r'(?:_map|_reduce|_reask)+$', '', stage)
+        return list(self.routes.get(base, [DEFAULT_MODEL]))
+
+    def primary(self, stage):
+        """The model a stage prefers when everything is healthy"""
+        return self.route(stage)[0]
+
+    def candidates(self, stage):
+        """
+        Models to try for a stage, healthy ones first, each group in route order
+
+        A degraded model preferred over the first healthy one is moved to the
+        front when it is due a probe.
+        """
+        models = self.route(stage)
+        healthy = [model for model in models if not self.degraded(model)]
+        ordered = healthy + [model for model in models if model not in healthy]
+
+        for model in models:
+            if model in healthy:
+                break
+            if self._claim_probe(model):
+                print(f"🩺 Probing degraded model {model} for {stage}")
+                return [model] + [other for other in ordered if other != model]
+        return ordered
+
+    def degraded(self, model):
+        if breakers.get(breaker_name(model)).state() != CLOSED:
+            return True
+        with self._lock:
+            entry = self._models.get(model)
+            return bool(entry and entry['latency'] is not None and entry['latency'] > self.slow_seconds)
+
+    def observe(self, model, seconds, ok):
+        """
+        Record one call
+
+        Args:
+            model (str): Model that was called
+            seconds (float): Time the call took
+            ok (bool): False if the model failed (outage, timeout)
+        """
+        with self._lock:
+            entry = self._entry(model)
+            entry['calls'] += 1
+            entry['last_called'] = time.monotonic()
+            probe = entry.pop('probing', False)
+            if not ok:
+                entry['errors'] += 1
+            elif entry['latency'] is None or probe:
+                # The average from before a probe is stale: no calls updated it since
+                entry['latency'] = seconds
+            else:
+                entry['latency'] += self.smoothing * (seconds - entry['latency'])
+
+    def _claim_probe(self, model):
+        """True (once per probe_seconds) if a degraded model should be tried first"""
+        if breakers.get(breaker_name(model)).state() == OPEN:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entry(model)
+            if entry['last_called'] is not None and now - entry['last_called'] < self.probe_seconds:
+                return False
+            entry['last_called'] = now
+            entry['probing'] = True
+            entry['probes'] += 1
+            return True
+
+    def _entry(self, model):
+        return self._models.setdefault(
+            model, {'calls': 0, 'errors': 0, 'probes': 0, 'latency': None, 'last_called': None}
+        )
+
+    def stats(self):
+        """Return {model: calls, errors, probes, error_rate, avg_latency_s, state} for every model used"""
+        with self._lock:
+            models = {model: dict(entry) for model, entry in self._models.items()}
+
+        stats = {}
+        for model, entry in models.items():
+            breaker = breakers.get(breaker_name(model)).stats()
+            stats[model] = {
+                'calls': entry['calls'],
+                'errors': entry['errors'],
+                'probes': entry['probes'],
+                'error_rate': round(entry['errors'] / entry['calls'], 3) if entry['calls'] else 0.0,
+                'window_error_rate': breaker['window_failure_rate'],
+                'avg_latency_s': None if entry['latency'] is None else round(entry['latency'], 3),
+                'state': breaker['state'],
+                'degraded': self.degraded(model)
+            }
+        return stats
+
+
+# Process-wide router used by the agents unless they are given their own
+model_router = ModelRouter(routes_from_env())
@@ -9,54 +9,298 @@ Concepts from 5-Day AI Agents Course:
 """
 
 import requests
+import copy
 import os
 from dotenv import load_dotenv
-import PyPDF2
+import hashlib
 import io
+import mmap
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from agents.gemini import GeminiError, field_text, generate_json
+from agents.pdf_backends import available_backends, extract_with_fallback
+from agents.analysis_store import AnalysisStore
+from agents.circuit_breaker import breakers
+from agents.deadline import DeadlineExceeded
+from agents.extractive_summary import compress as compress_text, summarize as extractive_summarize
+from agents.model_router import model_router
+from agents.rate_limiter import gemini_limiter
+from agents.relevance_cache import paper_id
+from agents.singleflight import SingleFlight
+from agents.text_cache import ExtractedTextCache, hash_pdf
+from agents.token_budget import TokenBudgetExceeded, estimate_tokens, run_metered, truncate_to_tokens
+from agents.vector_store import VectorStore
+
+
+SUMMARY_PROMPT = """You are analyzing an academic research paper.
+
+Paper Title: {paper_title}
+
+Paper Content:
+{paper_text}
+
+Generate a structured summary with these sections:
+
+1. **Main Research Question**: What problem does this paper address?
+2. **Methodology**: What approach/methods did they use?
+3. **Key Findings**: What are the main results/discoveries?
+4. **Limitations**: What are the limitations mentioned?
+5. **Future Work**: What future research directions are suggested?
+
+Respond with a JSON object with the fields research_question, methodology,
+key_findings, limitations and future_work.
+
+Keep each section concise (2-3 sentences max).
+"""
+
+# Gemini is asked for JSON matching this schema; fields that come back
+# empty are re-asked on their own (see gemini.generate_json)
+SUMMARY_SCHEMA = {
+    'type': 'OBJECT',
+    'properties': {
+        'research_question': {'type': 'STRING', 'description': 'Main research question'},
+        'methodology': {'type': 'STRING', 'description': 'Approach and methods used'},
+        'key_findings': {'type': 'STRING', 'description': 'Main results and discoveries'},
+        'limitations': {'type': 'STRING', 'description': 'Limitations mentioned'},
+        'future_work': {'type': 'STRING', 'description': 'Suggested future research directions'}
+    },
+    'required': ['research_question', 'methodology', 'key_findings', 'limitations', 'future_work']
+}
+
+# Stored analyses are keyed on this, so editing the prompt invalidates them
+SUMMARY_PROMPT_VERSION = hashlib.sha256(SUMMARY_PROMPT.encode('utf-8')).hexdigest()[:12]
+
+# Expected summary length, reserved in budget checks, and the smallest
+# slice of paper text still worth summarizing
+SUMMARY_OUTPUT_TOKENS = 500
+
+# Most paper-text tokens one summary call is sent
+SUMMARY_INPUT_TOKENS = 3750
+MIN_SUMMARY_INPUT_TOKENS = 300
+
+# Paper text kept from each end of the paper for a missing-field re-ask
+FOLLOWUP_EXCERPT_TOKENS = 400
+
+# Paper text is pre-compressed to about 1/COMPRESSION_RATIO of its size
+# (never below MIN_COMPRESSED_TOKENS) by keeping its most summary-relevant
+# sentences, before any hard truncation
+COMPRESSION_RATIO = 4
+MIN_COMPRESSED_TOKENS = 400
+
+# Full-paper mode: every page is read, split into chunks of about
+# CHUNK_TOKENS, noted on concurrently (map) and merged in one call (reduce)
+FULL_PAPER_PAGES = 200
+CHUNK_TOKENS = 3000
+
+# Fewest tokens each chunk keeps when a whole paper is compressed into one call
+MIN_CHUNK_COMPRESSED_TOKENS = 40
+MAP_OUTPUT_TOKENS = 300
+
+MAP_PROMPT = """You are reading part {part} of {parts} of an academic paper.
+
+Paper Title: {paper_title}
+
+Text:
+{chunk}
+
+Note what this part says about the paper's research question, methodology,
+key findings, limitations and future work. Respond with a JSON object with
+those five fields; leave a field empty if this part does not cover it.
+Keep each field to 1-2 sentences.
+"""
+
+REDUCE_PROMPT = """You are combining notes taken on consecutive parts of an academic paper.
+
+Paper Title: {paper_title}
+
+Notes per part:
+{notes}
+
+Merge them into one structured summary. Respond with a JSON object with the
+fields research_question, methodology, key_findings, limitations and
+future_work. Keep each section concise (2-3 sentences max).
+"""
+
+# Map replies may leave fields empty, so nothing is re-asked
+MAP_SCHEMA = dict(SUMMARY_SCHEMA, required=[])
+
+# Analysis steps under a deadline, best first: (step, seconds a paper
+# needs, PDF pages read). 0 pages summarizes the search-result abstract
+# without downloading the PDF.
+ANALYSIS_STEPS = [
+    ('full', 30, 5),
+    ('fewer_pages', 15, 2),
+    ('abstract_only', 5, 0),
+]
 
 
 class PaperAnalyzerAgent:
     """Agent that downloads and analyzes research papers"""
 
-    def __init__(self, api_key):
-        """Initialize the agent with Gemini API key"""
+    def __init__(self, api_key, spool_threshold=2 * 1024 * 1024, pdf_backends=None, text_cache=True,
+                 vector_store=True, analysis_store=True, router=None):
+        """
+        Initialize the agent with Gemini API key
+
+        Args:
+            api_key (str): Gemini API key
+            spool_threshold (int): PDFs larger than this (bytes) are spooled to disk
+            pdf_backends (list): Extraction backend names in preference order,
+                e.g. from pdf_backends.select_backend_order (default: the saved
+                benchmark order, else all available)
+            text_cache (ExtractedTextCache | bool): Cache for extracted text;
+                True uses the default on-disk cache, False disables caching
+            vector_store (VectorStore | bool): Similarity index of analyzed papers;
+                True uses the default on-disk store, False disables it
+            analysis_store (AnalysisStore | bool): Shared knowledge base of finished
+                analyses; True uses the default SQLite file, False disables it
+            router (ModelRouter): Model choice for summaries (default: model_router)
+        """
         self.api_key = api_key
-        self.model = 'gemini-2.0-flash'
 
-    def download_pdf(self, pdf_url):
+        # Summaries use the 'summary' route; its preferred model prices calls recorded without one
+        self.router = router or model_router
+        self.model = self.router.primary('summary')
+
+        # PDFs larger than this (bytes) are spooled to a temp file on disk
+        self.spool_threshold = spool_threshold
+
+        # Extraction backends, tried in order until one produces text
+        self.pdf_backends = available_backends(pdf_backends)
+
+        # Extracted text keyed by PDF hash, backend and page range
+        if text_cache is True:
+            text_cache = ExtractedTextCache()
+        self.text_cache = text_cache or None
+
+        # Embeddings of every summary produced, for "analyzed anything similar?" lookups
+        if vector_store is True:
+            vector_store = VectorStore()
+        self.vector_store = vector_store or None
+
+        # Finished analyses shared across sessions, keyed by paper, prompt and model
+        if analysis_store is True:
+            analysis_store = AnalysisStore()
+        self.analysis_store = analysis_store or None
+
+        # Identical concurrent analyses, downloads and summaries share one call
+        self._inflight = SingleFlight()
+
+    def download_pdf(self, pdf_url, deadline=None):
         """
         Download PDF from URL
 
         Custom Tool (Day 2 concept)
 
+        The body is streamed in chunks: small PDFs stay in memory, larger
+        ones are spooled to a temporary file so only one chunk is held at
+        a time. The caller owns the returned file and must close it.
+
         Args:
             pdf_url (str): URL to PDF file
+            deadline (Deadline): Run deadline; the timeout is cut to the time left
 
         Returns:
-            bytes: PDF content or None if failed
+            file: Binary file object positioned at 0, or None if failed
         """
         print(f"\n📥 Downloading PDF from: {pdf_url}")
 
+        # One breaker per host, so a dead mirror does not block the others
+        breaker = breakers.get(f"pdf:{urlparse(pdf_url).hostname}")
+
         try:
-            response = requests.get(pdf_url, timeout=30)
-            if response.status_code == 200:
-                print("✅ PDF downloaded successfully")
-                return response.content
-            else:
-                print(f"❌ Download failed: {response.status_code}")
-                return None
+            timeout = deadline.timeout(30, 'pdf download') if deadline else 30
+            breaker.allow()
+            try:
+                response = requests.get(pdf_url, timeout=timeout, stream=True)
+            except requests.Timeout:
+                # A timeout we shortened for the deadline is not the host's fault
+                if timeout < 30:
+                    breaker.release()
+                else:
+                    breaker.record(False)
+                raise
+            except Exception:
+                breaker.record(False)
+                raise
+            breaker.record(response.status_code != 429 and response.status_code < 500)
+
+            with response:
+                if response.status_code == 200:
+                    pdf_file = self._spool_response(response)
+                    print("✅ PDF downloaded successfully")
+                    return pdf_file
+                else:
+                    print(f"❌ Download failed: {response.status_code}")
+                    return None
         except Exception as e:
             print(f"❌ Download error: {e}")
             return None
 
+    def fetch_text(self, pdf_url, max_pages=5, deadline=None):
+        """
+        Download a PDF and extract its text, sharing concurrent fetches of one URL
+
+        The PDF buffer is released as soon as the text is extracted; only
+        the text is handed to callers that joined the in-flight download.
+
+        Returns:
+            str: Extracted text, or "" if the download or extraction failed
+        """
+        def fetch():
+            pdf_file = self.download_pdf(pdf_url, deadline)
+            if not pdf_file:
+                return ""
+            try:
+                return self.extract_text_from_pdf(pdf_file, max_pages)
+            finally:
+                pdf_file.close()
+
+        text, shared = self._inflight.do(('text', pdf_url, max_pages), fetch)
+        if shared:
+            print("🔗 Shared an in-flight PDF download")
+        return text
+
+    def _spool_response(self, response, chunk_size=64 * 1024):
+        """Copy a streamed response into memory or, past the threshold, a temp file"""
+        pdf_file = io.BytesIO()
+        on_disk = False
+
+        try:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                if not chunk:
+                    continue
+                if not on_disk and pdf_file.tell() + len(chunk) > self.spool_threshold:
+                    # Roll over: move what we have so far to disk and drop the buffer
+                    # Named, so path-based backends (pdftotext) can read it in place
+                    disk_file = tempfile.NamedTemporaryFile(prefix='scholarsync_', suffix='.pdf')
+                    disk_file.write(pdf_file.getbuffer())
+                    pdf_file.close()
+                    pdf_file = disk_file
+                    on_disk = True
+                pdf_file.write(chunk)
+        except Exception:
+            pdf_file.close()
+            raise
+
+        pdf_file.seek(0)
+        return pdf_file
+
     def extract_text_from_pdf(self, pdf_content, max_pages=5):
         """
-        Extract text from PDF bytes
+        Extract text from PDF bytes or a PDF file object
 
         Custom Tool (Day 2 concept)
 
+        Disk-backed files are parsed through a read-only memory map so the
+        PDF is never copied into the Python heap. The reader and the map
+        are released as soon as extraction finishes.
+
         Args:
-            pdf_content (bytes): PDF file content
+            pdf_content (bytes | file): PDF content, or a file from download_pdf
             max_pages (int): Maximum pages to extract (to avoid token limits)
 
         Returns:
@@ -64,26 +308,61 @@ class PaperAnalyzerAgent:
         """
         print(f"📄 Extracting text from PDF (first {max_pages} pages)...")
 
+        text, _ = self._extract_text(pdf_content, max_pages)
+        return text
+
+    def _extract_text(self, pdf_content, max_pages):
+        """Run the backend fallback chain, returning (text, backend_name)"""
+        pdf_map = None
+        pdf_path = None
+
         try:
-            pdf_file = io.BytesIO(pdf_content)
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
+            if isinstance(pdf_content, (bytes, bytearray)):
+                pdf_stream = io.BytesIO(pdf_content)
+            elif isinstance(pdf_content, io.BytesIO):
+                pdf_stream = pdf_content
+            else:
+                pdf_content.flush()
+                pdf_map = mmap.mmap(pdf_content.fileno(), 0, access=mmap.ACCESS_READ)
+                pdf_stream = pdf_map
+                name = getattr(pdf_content, 'name', None)
+                pdf_path = name if isinstance(name, str) and os.path.isfile(name) else None
+
+            page_range = (1, max_pages)
+            pdf_hash = None
+
+            if self.text_cache:
+                pdf_hash = hash_pdf(pdf_stream)
+                for backend in self.pdf_backends:
+                    text = self.text_cache.get(pdf_hash, backend.name, page_range)
+                    if text is not None:
+                        print(f"✅ Loaded {len(text)} cached characters ({backend.name})")
+                        return text, backend.name
+
+            text, pages_read, backend_name = extract_with_fallback(
+                pdf_stream, max_pages, self.pdf_backends, pdf_path
+            )
 
-            total_pages = len(pdf_reader.pages)
-            pages_to_read = min(max_pages, total_pages)
+            if not text:
+                print("❌ Text extraction error: no backend could extract text")
+                return "", None
 
-            text = ""
-            for page_num in range(pages_to_read):
-                page = pdf_reader.pages[page_num]
-                text += page.extract_text()
+            if self.text_cache:
+                self.text_cache.put(pdf_hash, backend_name, page_range, text)
 
-            print(f"✅ Extracted {len(text)} characters from {pages_to_read} pages")
-            return text
+            print(f"✅ Extracted {len(text)} characters from {pages_read} pages ({backend_name})")
+            return text, backend_name
 
         except Exception as e:
             print(f"❌ Text extraction error: {e}")
-            return ""
+            return "", None
 
-    def generate_summary(self, paper_text, paper_title):
+        finally:
+            if pdf_map is not None:
+                pdf_map.close()
+
+    def generate_summary(self, paper_text, paper_title, ledger=None, max_input_tokens=SUMMARY_INPUT_TOKENS,
+                         budget_share=1, deadline=None, compress=True, notes=None):
         """
         Use Gemini to generate structured summary
 
@@ -92,80 +371,109 @@ class PaperAnalyzerAgent:
         Args:
             paper_text (str): Full text from paper
             paper_title (str): Paper title for context
+            ledger (TokenLedger): Run budget; the paper text is shrunk to fit
+                what is left, and the summary is skipped if too little is left
+            max_input_tokens (int): Most paper-text tokens ever sent
+            budget_share (int): Summaries still to run on the remaining budget,
+                this one included; each gets an equal slice
+            deadline (Deadline): Run deadline for the Gemini call
+            compress (bool): Send only the sentences the five fields need
+                (see extractive_summary.compress) instead of the leading text
+            notes (dict): If given, 'shrunk' is set to True when the budget
+                cut the paper text below max_input_tokens, and 'model' to the
+                model that wrote the summary (None if failover mixed models)
 
         Returns:
             dict: Structured summary
         """
-        print("\n🤖 Generating structured summary with Gemini...")
+        # Truncate text if too long (Gemini has token limits, and so do our budgets)
+        limit = max_input_tokens
+        remaining = ledger.remaining() if ledger else None
+        if remaining is not None:
+            remaining //= max(1, budget_share)
+            overhead = estimate_tokens(SUMMARY_PROMPT) + estimate_tokens(paper_title) + SUMMARY_OUTPUT_TOKENS
+            limit = min(limit, remaining - overhead)
+            if limit < MIN_SUMMARY_INPUT_TOKENS:
+                ledger.note_skip('summary', f"skipped '{paper_title}', only {remaining} tokens left")
+                return {}
+            if limit < max_input_tokens and notes is not None:
+                notes['shrunk'] = True
+            if limit < max_input_tokens and estimate_tokens(paper_text) > limit:
+                ledger.note_skip('summary', f"paper text shrunk to ~{limit} tokens to fit the budget")
+
+        # Keep the research question, method, results, limitations and future
+        # work sentences from the whole text rather than only its beginning
+        original_tokens = estimate_tokens(paper_text)
+        target = min(limit, max(MIN_COMPRESSED_TOKENS, original_tokens // COMPRESSION_RATIO))
+        if compress and original_tokens > target:
+            compressed = compress_text(paper_text, target)
+            if compressed:
+                paper_text = compressed
+                print(f"🗜️  Pre-compressed paper text: ~{original_tokens} -> ~{estimate_tokens(paper_text)} tokens")
+
+        if estimate_tokens(paper_text) > limit:
+            paper_text = truncate_to_tokens(paper_text, limit)
+            print(f"⚠️  Text truncated to ~{limit} tokens")
+
+        digest = hashlib.sha256(f"{paper_title}\0{paper_text}".encode('utf-8')).hexdigest()
+        ((summary, info), spent), shared = self._inflight.do(
+            ('summary', digest), run_metered, ledger, self._generate_summary, paper_text, paper_title, ledger, deadline
+        )
+        if shared:
+            print("🔗 Shared an in-flight summary for the same text")
+            summary = self._join_shared(summary, ledger, 'summary', spent)
+        if notes is not None:
+            notes.update(info)
+        return summary
 
-        # Truncate text if too long (Gemini has token limits)
-        max_chars = 15000
-        if len(paper_text) > max_chars:
-            paper_text = paper_text[:max_chars] + "..."
-            print(f"⚠️  Text truncated to {max_chars} characters")
+    def _generate_summary(self, paper_text, paper_title, ledger, deadline):
+        """Call Gemini for one summary (see generate_summary); returns (summary, notes)"""
+        print("\n🤖 Generating structured summary with Gemini...")
 
         # Create analysis prompt
-        prompt = f"""You are analyzing an academic research paper.
-
-Paper Title: {paper_title}
+        prompt = SUMMARY_PROMPT.format(paper_title=paper_title, paper_text=paper_text)
 
-Paper Content:
-{paper_text}
-
-Generate a structured summary with these sections:
-
-1. **Main Research Question**: What problem does this paper address?
-2. **Methodology**: What approach/methods did they use?
-3. **Key Findings**: What are the main results/discoveries?
-4. **Limitations**: What are the limitations mentioned?
-5. **Future Work**: What future research directions are suggested?
-
-Format your response as:
-RESEARCH QUESTION: [answer]
-METHODOLOGY: [answer]
-KEY FINDINGS: [answer]
-LIMITATIONS: [answer]
-FUTURE WORK: [answer]
-
-Keep each section concise (2-3 sentences max).
-"""
-
-        # Call Gemini API
-        url = f'https://generativelanguage.googleapis.com/v1beta/models/{self.model}:generateContent?key={self.api_key}'
-
-        data = {
-            'contents': [{
-                'parts': [{'text': prompt}]
-            }]
-        }
+        # Re-asks for missing fields get the title and the start and end of
+        # the paper (abstract, conclusions) rather than the whole text again
+        excerpt = paper_text
+        if estimate_tokens(paper_text) > 2 * FOLLOWUP_EXCERPT_TOKENS:
+            cut = FOLLOWUP_EXCERPT_TOKENS * 4
+            excerpt = paper_text[:cut] + "\n...\n" + paper_text[-cut:]
+        followup_context = f"You summarized this paper.\n\nPaper Title: {paper_title}\n\nExcerpt:\n{excerpt}"
 
         try:
-            response = requests.post(
-                url,
-                headers={'Content-Type': 'application/json'},
-                json=data,
-                timeout=60
+            data, missing, model = generate_json(
+                self.api_key, None, prompt, SUMMARY_SCHEMA, timeout=60,
+                stage='summary', ledger=ledger, reserve_tokens=SUMMARY_OUTPUT_TOKENS,
+                followup_context=followup_context, fallback_parser=self._parse_summary, deadline=deadline,
+                router=self.router, with_model=True
             )
 
-            if response.status_code == 200:
-                result = response.json()
-                summary_text = result['candidates'][0]['content']['parts'][0]['text']
+            # Validated structured output (fields still missing stay empty)
+            summary = {name: field_text(data.get(name)) for name in SUMMARY_SCHEMA['required']}
+            if missing:
+                print(f"⚠️  Summary is missing: {', '.join(missing)}")
+            print("✅ Summary generated successfully\n")
+            return summary, {'model': model}
 
-                # Parse structured output
-                summary = self._parse_summary(summary_text)
-                print("✅ Summary generated successfully\n")
-                return summary
+        except TokenBudgetExceeded as e:
+            ledger.note_skip('summary', str(e))
+            return {}, {}
 
-            else:
-                print(f"❌ Gemini API error: {response.status_code}")
-                return {}
+        except DeadlineExceeded as e:
+            deadline.degrade('summary', 'skipped', f"skipped '{paper_title}' ({e})")
+            return {}, {}
+
+        except GeminiError as e:
+            print(f"❌ {e}")
+            return {}, {}
 
         except Exception as e:
             print(f"❌ Summary generation error: {e}")
-            return {}
+            return {}, {}
 
     def _parse_summary(self, summary_text):
-        """Parse Gemini's response into structured format"""
+        """Parse a line-prefixed (non-JSON) response into structured format"""
         summary = {
             'research_question': '',
             'methodology': '',
@@ -199,7 +507,172 @@ Keep each section concise (2-3 sentences max).
 
         return summary
 
-    def analyze_paper(self, paper_url, paper_title):
+    def summarize_full_paper(self, paper_text, paper_title, ledger=None, budget_share=1, deadline=None,
+                             chunk_tokens=CHUNK_TOKENS, notes=None):
+        """
+        Map-reduce summary over the whole paper
+
+        The text is split into chunks of about chunk_tokens; every chunk is
+        noted on at the same time (the shared Gemini rate limiter caps how
+        many calls actually run at once), then one call merges the notes.
+        Covering the whole paper therefore costs about the latency of one
+        chunk plus the merge.
+
+        Args:
+            paper_text (str): Text of every page
+            paper_title (str): Paper title for context
+            ledger (TokenLedger): Run budget; if the map calls do not fit, one
+                pre-compressed summary call is made instead
+            budget_share (int): Summaries still to run on the remaining budget
+            deadline (Deadline): Run deadline for the Gemini calls
+            chunk_tokens (int): Paper-text tokens per map call
+            notes (dict): As for generate_summary ('shrunk' is also set when the
+                budget forces the compressed single-call summary), plus
+                'partial' set to True when any chunk got no notes
+
+        Returns:
+            dict: Structured summary ({} if every call failed)
+        """
+        chunks = self._chunk_text(paper_text, chunk_tokens)
+        if len(chunks) == 1:
+            return self.generate_summary(paper_text, paper_title, ledger, budget_share=budget_share, deadline=deadline,
+                                         notes=notes)
+
+        needed = (estimate_tokens(paper_text)
+                  + len(chunks) * (estimate_tokens(MAP_PROMPT) + estimate_tokens(paper_title) + 2 * MAP_OUTPUT_TOKENS)
+                  + estimate_tokens(REDUCE_PROMPT) + SUMMARY_OUTPUT_TOKENS)
+        remaining = ledger.remaining() if ledger else None
+        if remaining is not None and needed > remaining // max(1, budget_share):
+            ledger.note_skip('summary', f"whole paper needs ~{needed} tokens, summarizing compressed text instead")
+            if notes is not None:
+                notes['shrunk'] = True
+            # compress() ranks a bounded number of sentences, so compress each chunk
+            # to its share: the end of the paper is covered as well as the start
+            share = max(MIN_CHUNK_COMPRESSED_TOKENS, SUMMARY_INPUT_TOKENS // len(chunks))
+            compressed = '\n'.join(filter(None, (compress_text(chunk, share) for chunk in chunks)))
+            return self.generate_summary(compressed or paper_text, paper_title, ledger, budget_share=budget_share,
+                                         deadline=deadline, notes=notes)
+
+        digest = hashlib.sha256(f"{paper_title}\0{chunk_tokens}\0{paper_text}".encode('utf-8')).hexdigest()
+        ((summary, info), spent), shared = self._inflight.do(
+            ('full_summary', digest), run_metered, ledger, self._map_reduce_summary, chunks, paper_title, ledger,
+            deadline
+        )
+        if shared:
+            print("🔗 Shared an in-flight whole-paper summary")
+            summary = self._join_shared(summary, ledger, 'summary', spent)
+        if notes is not None:
+            notes.update(info)
+        return summary
+
+    def _map_reduce_summary(self, chunks, paper_title, ledger, deadline):
+        """Note on every chunk concurrently, then merge the notes; returns (summary, notes) for summarize_full_paper"""
+        print(f"\n🤖 Summarizing the whole paper in {len(chunks)} chunks concurrently...")
+        start = time.perf_counter()
+
+        # No more threads than Gemini calls the shared limiter lets run at once
+        with ThreadPoolExecutor(max_workers=max(1, min(len(chunks), gemini_limiter.max_concurrent))) as pool:
+            results = list(pool.map(
+                lambda item: self._summarize_chunk(item[1], item[0], len(chunks), paper_title, ledger, deadline),
+                enumerate(chunks, 1)
+            ))
+        notes = [note for note, _ in results]
+        models = {model for note, model in results if note}
+        print(f"✅ Noted {sum(1 for note in notes if note)}/{len(chunks)} chunks in {time.perf_counter() - start:.1f}s")
+
+        notes_text = '\n\n'.join(
+            f"Part {part}:\n" + '\n'.join(f"{field}: {value}" for field, value in note.items() if value)
+            for part, note in enumerate(notes, 1) if note
+        )
+        if not notes_text:
+            return {}, {'partial': True}
+
+        # Merge step (re-asks for missing fields only see the notes)
+        try:
+            data, missing, model = generate_json(
+                self.api_key, None, REDUCE_PROMPT.format(paper_title=paper_title, notes=notes_text), SUMMARY_SCHEMA,
+                timeout=60, stage='summary_reduce', ledger=ledger, reserve_tokens=SUMMARY_OUTPUT_TOKENS,
+                followup_context=f"Paper Title: {paper_title}\n\nNotes per part:\n{notes_text}",
+                fallback_parser=self._parse_summary, deadline=deadline, router=self.router, with_model=True
+            )
+            models.add(model)
+            summary = {name: field_text(data.get(name)) for name in SUMMARY_SCHEMA['required']}
+            if missing:
+                print(f"⚠️  Summary is missing: {', '.join(missing)}")
+        except Exception as e:
+            # Best effort: keep the notes themselves, field by field
+            print(f"⚠️  Merging chunk notes failed, joining them instead: {e}")
+            summary = {
+                name: ' '.join(note[name] for note in notes if note and note.get(name))
+                for name in SUMMARY_SCHEMA['required']
+            }
+
+        # A skipped, failed or empty chunk leaves a hole in the summary
+        empty = sum(1 for note in notes if not any(note.values()))
+        if empty:
+            print(f"⚠️  Whole-paper summary is missing {empty}/{len(chunks)} chunks")
+        print("✅ Whole-paper summary generated\n")
+        # Only a summary written by one model throughout is attributed to it
+        return summary, {'model': models.pop() if len(models) == 1 else None, 'partial': empty > 0}
+
+    def _summarize_chunk(self, chunk, part, parts, paper_title, ledger, deadline):
+        """Map step: (notes on one chunk in the five fields, model), or ({}, None) if the call failed"""
+        try:
+            data, _, model = generate_json(
+                self.api_key, None,
+                MAP_PROMPT.format(part=part, parts=parts, paper_title=paper_title, chunk=chunk), MAP_SCHEMA,
+                timeout=60, stage='summary_map', ledger=ledger, reserve_tokens=MAP_OUTPUT_TOKENS,
+                fallback_parser=self._parse_summary, max_reasks=0, deadline=deadline, router=self.router,
+                with_model=True
+            )
+            return {name: field_text(data.get(name)) for name in SUMMARY_SCHEMA['required']}, model
+        except TokenBudgetExceeded as e:
+            ledger.note_skip('summary', f"chunk {part}/{parts} skipped ({e})")
+        except DeadlineExceeded as e:
+            deadline.degrade('summary', 'partial', f"'{paper_title}': chunk {part}/{parts} skipped ({e})")
+        except Exception as e:
+            print(f"⚠️  Chunk {part}/{parts} failed: {e}")
+        return {}, None
+
+    @staticmethod
+    def _chunk_text(text, max_tokens):
+        """Greedily pack paragraphs (or lines of an over-long paragraph) into chunks of about max_tokens"""
+        max_chars = max_tokens * 4
+        pieces = []
+        for paragraph in text.split('\n\n'):
+            if estimate_tokens(paragraph) <= max_tokens:
+                pieces.append(paragraph)
+                continue
+            for line in paragraph.split('\n'):
+                # A line longer than a chunk is split (at a space where there is one), not cut short
+                while len(line) > max_chars:
+                    cut = line.rfind(' ', max_chars // 2, max_chars)
+                    cut = cut if cut > 0 else max_chars
+                    pieces.append(line[:cut])
+                    line = line[cut:].lstrip()
+                pieces.append(line)
+
+        chunks = ['']
+        for piece in pieces:
+            if chunks[-1] and estimate_tokens(chunks[-1]) + estimate_tokens(piece) > max_tokens:
+                chunks.append('')
+            chunks[-1] = f"{chunks[-1]}\n\n{piece}" if chunks[-1] else piece
+        return chunks
+
+    def extractive_summary(self, paper_text):
+        """
+        Summarize offline with TextRank and cue phrases (no Gemini call)
+
+        Returns:
+            dict: Structured summary in the same five fields as generate_summary
+        """
+        start = time.perf_counter()
+        summary = extractive_summarize(paper_text)
+        print(f"⚡ Extractive summary in {(time.perf_counter() - start) * 1000:.0f} ms")
+        return summary
+
+    def analyze_paper(self, paper_url, paper_title, abstract=None, ledger=None, budget_share=1, deadline=None,
+                      instant=False, full_paper=False):
         """
         Complete paper analysis pipeline
 
@@ -208,33 +681,208 @@ Keep each section concise (2-3 sentences max).
         Args:
             paper_url (str): URL to paper PDF
             paper_title (str): Paper title
+            abstract (str): Search-result abstract, indexed with the summary
+            ledger (TokenLedger): Token budget and usage accounting for the run
+            budget_share (int): Papers still to summarize on the remaining budget
+                (and the remaining time)
+            deadline (Deadline): Run deadline; with little time left fewer
+                pages are read, or only the abstract is summarized
+            instant (bool): Summarize offline with the extractive summarizer
+                instead of Gemini
+            full_paper (bool): Read every page and summarize it chunk by
+                chunk (see summarize_full_paper) instead of the first pages
 
         Returns:
-            dict: Complete analysis
+            dict: Complete analysis ('from_store' is True if it was reused,
+                'degraded' names the step if it was cut back, is 'partial'
+                if chunks of a whole paper went unsummarized, or 'budget' if
+                the token budget shrank the paper text,
+                'summary_source' is 'gemini' or 'extractive'), or None
         """
+        # Reuse an analysis of this exact paper version and prompt, however little time is left
+        stored = self.get_stored_analysis(paper_url, full_paper)
+        if stored:
+            print(f"♻️  Loaded analysis of '{paper_title}' from the knowledge base\n")
+            return stored
+
+        step, max_pages = self.plan_analysis(deadline, budget_share, paper_title, abstract)
+        if step is None:
+            return None
+
+        (analysis, spent), shared = self._inflight.do(
+            ('analysis', paper_url, step, instant, full_paper), run_metered, ledger, self._analyze_paper,
+            paper_url, paper_title, abstract, ledger, budget_share, deadline, step, max_pages, instant, full_paper
+        )
+        if shared:
+            print(f"🔗 Joined an in-flight analysis of: {paper_title}")
+            analysis = self._join_shared(analysis, ledger, 'analysis', spent)
+        return analysis
+
+    @staticmethod
+    def _join_shared(result, ledger, stage, spent):
+        """A follower's copy of a shared result, with the work's tokens charged to its own ledger"""
+        if ledger:
+            ledger.record_shared(stage, spent)
+        return copy.deepcopy(result)
+
+    def plan_analysis(self, deadline, budget_share=1, paper_title='', abstract=None):
+        """
+        Pick the best analysis step that fits this paper's share of the time left
+
+        Returns:
+            tuple: (step, max_pages) from ANALYSIS_STEPS, or (None, 0) if even
+                an abstract-only summary does not fit
+        """
+        seconds = deadline.share(budget_share) if deadline else None
+        if seconds is None:
+            return ANALYSIS_STEPS[0][0], ANALYSIS_STEPS[0][2]
+
+        for step, needed, max_pages in ANALYSIS_STEPS:
+            if max_pages == 0 and not abstract:
+                continue
+            if seconds >= needed:
+                if step != ANALYSIS_STEPS[0][0]:
+                    detail = f"first {max_pages} pages" if max_pages else "abstract only"
+                    deadline.degrade('analysis', step, f"'{paper_title}': {detail} ({seconds:.0f}s per paper left)")
+                return step, max_pages
+
+        deadline.degrade('analysis', 'skipped', f"skipped '{paper_title}' ({seconds:.0f}s per paper left)")
+        return None, 0
+
+    def _analyze_paper(self, paper_url, paper_title, abstract, ledger, budget_share, deadline=None, step='full',
+                       max_pages=5, instant=False, full_paper=False):
+        """Run the analysis pipeline once (see analyze_paper)"""
         print("=" * 70)
         print(f"📊 ANALYZING PAPER: {paper_title}")
         print("=" * 70)
 
-        # Step 1: Download PDF
-        pdf_content = self.download_pdf(paper_url)
-        if not pdf_content:
-            return None
-
-        # Step 2: Extract text
-        paper_text = self.extract_text_from_pdf(pdf_content)
+        # Whole papers are only read when there is time for the full step
+        full_paper = full_paper and step == 'full'
+        if full_paper:
+            max_pages = FULL_PAPER_PAGES
+
+        # Steps 1-2: Download PDF and extract text (or make do with the abstract)
+        if max_pages:
+            paper_text = self.fetch_text(paper_url, max_pages, deadline)
+            if not paper_text and abstract and deadline and deadline.seconds is not None:
+                deadline.degrade('analysis', 'abstract_only', f"'{paper_title}': PDF unavailable, abstract only")
+                step = 'abstract_only'
+                paper_text = abstract
+        else:
+            paper_text = abstract
         if not paper_text:
             return None
 
-        # Step 3: Generate summary
-        summary = self.generate_summary(paper_text, paper_title)
-
-        return {
+        # Step 3: Generate summary (offline in instant mode, or when Gemini gives us nothing)
+        source = 'gemini'
+        notes = {}
+        if instant:
+            summary, source = self.extractive_summary(paper_text), 'extractive'
+        elif full_paper:
+            summary = self.summarize_full_paper(paper_text, paper_title, ledger, budget_share, deadline, notes=notes)
+        else:
+            summary = self.generate_summary(paper_text, paper_title, ledger, budget_share=budget_share,
+                                            deadline=deadline, notes=notes)
+        if not instant:
+            if not any(summary.values() if summary else []):
+                print("🧮 No Gemini summary, falling back to the offline extractive summary")
+                summary, source = self.extractive_summary(paper_text), 'extractive'
+
+        # Step 4: Index the summary so later sessions can find similar work
+        if self.vector_store and summary:
+            self._index_summary(paper_url, paper_title, abstract, summary)
+
+        analysis = {
             'title': paper_title,
             'url': paper_url,
             'summary': summary,
+            'summary_source': source,
+            'full_paper': full_paper,
             'text_length': len(paper_text)
         }
+        if step != 'full':
+            analysis['degraded'] = step
+        elif source == 'gemini' and notes.get('partial'):
+            analysis['degraded'] = 'partial'
+        elif source == 'gemini' and notes.get('shrunk'):
+            analysis['degraded'] = 'budget'
+
+        # Step 5: Share it with every later session (failed, cut-back and extractive summaries are not stored),
+        # keyed on the model that wrote it, which after a failover is not our preferred model
+        model = notes.get('model')
+        if (self.analysis_store and 'degraded' not in analysis and source == 'gemini' and model
+                and any(summary.values() if summary else [])):
+            try:
+                self.analysis_store.put(paper_url, SUMMARY_PROMPT_VERSION, model, analysis)
+            except Exception as e:
+                print(f"⚠️  Could not store analysis: {e}")
+
+        return analysis
+
+    def purge_stale_analyses(self):
+        """Drop knowledge-base rows made with another prompt template (rows of other models are kept)"""
+        if not self.analysis_store:
+            return 0
+        removed = self.analysis_store.purge_stale(SUMMARY_PROMPT_VERSION)
+        if removed:
+            print(f"🧹 Removed {removed} stale stored analyses")
+        return removed
+
+    def get_stored_analysis(self, paper_url, full_paper=False):
+        """
+        Return the knowledge-base analysis for this paper and prompt
+
+        Every model on the summary route is tried in route order, since
+        analyses are stored under the model that wrote them (an alternate
+        after a failover).
+
+        Args:
+            paper_url (str): URL to paper PDF
+            full_paper (bool): Only accept an analysis of the whole paper
+
+        Returns:
+            dict: Analysis with 'from_store': True, or None
+        """
+        if not self.analysis_store:
+            return None
+        for model in self.router.route('summary'):
+            try:
+                stored = self.analysis_store.get(paper_url, SUMMARY_PROMPT_VERSION, model)
+            except Exception as e:
+                print(f"⚠️  Knowledge base lookup failed: {e}")
+                return None
+            if stored and (stored.get('full_paper') or not full_paper):
+                stored['from_store'] = True
+                return stored
+        return None
+
+    def _index_summary(self, paper_url, paper_title, abstract, summary):
+        """Add a paper's title, abstract and summary fields to the vector store"""
+        text = ' '.join([paper_title, abstract or ''] + [value for value in summary.values() if value])
+        try:
+            self.vector_store.add(
+                paper_id({'url': paper_url}),
+                text,
+                {'title': paper_title, 'url': paper_url}
+            )
+        except Exception as e:
+            print(f"⚠️  Could not index summary: {e}")
+
+    def find_similar(self, text, k=5, min_score=0.3):
+        """
+        Find previously analyzed papers similar to a title, abstract or topic
+
+        Args:
+            text (str): Text to compare against stored summaries
+            k (int): Maximum number of matches
+            min_score (float): Minimum cosine similarity to report
+
+        Returns:
+            list: Dicts with 'id', 'score' and 'metadata' (title, url), best first
+        """
+        if not self.vector_store:
+            return []
+        return self.vector_store.search(text, k=k, min_score=min_score)
 
 
 def main():
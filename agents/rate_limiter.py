@@ -0,0 +1,113 @@
+"""
+Rate Limiter
+One process-wide cap on concurrent and per-minute Gemini requests
+
+Every Gemini request takes a slot from the shared `gemini_limiter`
+before it is sent, whichever agent or thread makes it: ranking
+tournaments, chunked full-paper summaries and concurrent sessions all
+draw from the same pool, so fanning work out cannot exceed the API's
+limits. A slot is granted when fewer than `max_concurrent` requests are
+in flight and, if `requests_per_minute` is set, the token bucket has a
+request left.
+
+Limits can be set with SCHOLARSYNC_GEMINI_CONCURRENCY and
+SCHOLARSYNC_GEMINI_RPM.
+"""
+
+import threading
+import time
+
+from agents.token_budget import budget_from_env
+
+
+class RateLimiter:
+    """Concurrency cap plus an optional requests-per-minute token bucket"""
+
+    def __init__(self, max_concurrent=4, requests_per_minute=None):
+        """
+        Args:
+            max_concurrent (int): Requests allowed in flight at once
+            requests_per_minute (int): Sustained request rate (None = no rate cap);
+                up to max_concurrent requests may burst
+        """
+        self.max_concurrent = max_concurrent
+        self.requests_per_minute = requests_per_minute
+
+        self._in_flight = 0
+        self._tokens = float(max_concurrent)
+        self._refilled = time.monotonic()
+        self._condition = threading.Condition()
+
+        self.metrics = {
+            'granted': 0,
+            'waited': 0,
+            'timed_out': 0,
+            'max_in_flight': 0
+        }
+
+    def acquire(self, timeout=None):
+        """
+        Wait for a slot
+
+        Args:
+            timeout (float): Longest wait in seconds (None = wait as long as needed)
+
+        Returns:
+            bool: True if a slot was granted, False if the wait timed out
+        """
+        give_up = None if timeout is None else time.monotonic() + timeout
+        waited = False
+
+        with self._condition:
+            while True:
+                self._refill()
+                if self._in_flight < self.max_concurrent and (self.requests_per_minute is None or self._tokens >= 1):
+                    break
+
+                wait = None if give_up is None else give_up - time.monotonic()
+                if self.requests_per_minute is not None and self._tokens < 1:
+                    # Wake up when the next token is due
+                    due = (1 - self._tokens) * 60.0 / self.requests_per_minute
+                    wait = due if wait is None else min(wait, due)
+                if wait is not None and wait <= 0:
+                    self.metrics['timed_out'] += 1
+                    return False
+
+                waited = True
+                self._condition.wait(wait)
+
+            self._in_flight += 1
+            if self.requests_per_minute is not None:
+                self._tokens -= 1
+            self.metrics['granted'] += 1
+            self.metrics['waited'] += waited
+            self.metrics['max_in_flight'] = max(self.metrics['max_in_flight'], self._in_flight)
+            return True
+
+    def release(self):
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify()
+
+    def stats(self):
+        with self._condition:
+            stats = dict(self.metrics)
+            stats['in_flight'] = self._in_flight
+            return stats
+
+    def _refill(self):
+        if self.requests_per_minute is None:
+            return
+        now = time.monotonic()
+        self._tokens = min(
+            float(self.max_concurrent),
+            self._tokens + (now - self._refilled) * self.requests_per_minute / 60.0
+        )
+        self._refilled = now
+
+
+# Shared by every Gemini call in the process
+gemini_limiter = RateLimiter(
+    max_concurrent=budget_from_env('SCHOLARSYNC_GEMINI_CONCURRENCY') or 4,
+    requests_per_minute=budget_from_env('SCHOLARSYNC_GEMINI_RPM')
+)
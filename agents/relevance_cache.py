@@ -0,0 +1,95 @@
+"""
+Relevance Score Cache
+Keeps per-paper relevance scores for each (normalized query, paper ID)
+
+Lets the Literature Scout re-rank incrementally: when a search widens
+from 5 to 10 papers only the 5 new ones are sent to Gemini, together with
+a few already-scored "anchor" papers. The new papers' scores are then
+interpolated between the anchors they landed next to, which puts them on
+the same scale as the cached scores.
+"""
+
+import threading
+from collections import OrderedDict
+
+from agents.federated_search import paper_identities
+from agents.search_cache import normalize_query
+
+
+def paper_id(paper):
+    """Stable ID for a paper: DOI or version-less arXiv ID, else its URL"""
+    return paper_identities(paper)[0]
+
+
+class RelevanceScoreCache:
+    """In-memory map of normalized query -> {paper ID: relevance score}"""
+
+    def __init__(self, max_queries=256):
+        self.max_queries = max_queries
+        self._scores = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_scores(self, query, papers):
+        """Return {paper ID: score} for the papers already scored for this query"""
+        key = normalize_query(query)
+        with self._lock:
+            known = self._scores.get(key)
+            if known is None:
+                return {}
+            self._scores.move_to_end(key)
+            ids = (paper_id(paper) for paper in papers)
+            return {pid: known[pid] for pid in ids if pid in known}
+
+    def put_scores(self, query, scores):
+        """Merge {paper ID: score} into the cache for this query"""
+        key = normalize_query(query)
+        with self._lock:
+            self._scores.setdefault(key, {}).update(scores)
+            self._scores.move_to_end(key)
+            while len(self._scores) > self.max_queries:
+                self._scores.popitem(last=False)
+
+
+def pick_anchors(cached_scores, count=4):
+    """Pick up to `count` cached paper IDs spread evenly across the score range"""
+    ranked = sorted(cached_scores, key=lambda pid: cached_scores[pid], reverse=True)
+    if len(ranked) <= count:
+        return ranked
+    step = (len(ranked) - 1) / (count - 1)
+    return [ranked[round(i * step)] for i in range(count)]
+
+
+def interpolate_scores(ranked_ids, anchor_scores):
+    """
+    Give non-anchor papers scores on the anchors' scale
+
+    Args:
+        ranked_ids (list): Paper IDs in the order Gemini ranked them,
+            anchors included
+        anchor_scores (dict): Cached score of each anchor ID
+
+    Returns:
+        dict: {paper ID: score} for every non-anchor ID. A run of papers
+        between two anchors is spread evenly between their scores; papers
+        above the best anchor go above it, papers below the worst go
+        towards zero.
+    """
+    top = max(anchor_scores.values()) if anchor_scores else 1.0
+    scores = {}
+    run = []
+    upper = top + 1.0
+
+    def flush(lower):
+        for j, pid in enumerate(run):
+            scores[pid] = lower + (upper - lower) * (len(run) - j) / (len(run) + 1)
+        run.clear()
+
+    for pid in ranked_ids:
+        if pid in anchor_scores:
+            flush(anchor_scores[pid])
+            upper = anchor_scores[pid]
+        else:
+            run.append(pid)
+    flush(0.0)
+
+    return scores
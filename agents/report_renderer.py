@@ -0,0 +1,322 @@
+"""
+Report Renderer
+One report engine for the CLI and the Streamlit app
+
+Renders research results (the dict returned by
+ScholarSyncOrchestrator.research_workflow) to Markdown, JSON, HTML or CSV.
+Every renderer is a generator of text chunks, so a large multi-query
+report can be streamed to a file or socket without being built in memory.
+Rendered output is cached per result ID and format, so re-displaying the
+same results (e.g. a Streamlit rerun feeding the download button) costs
+nothing. The ID ('result_id') is minted once when the results are built,
+so a cache lookup never has to hash the results themselves.
+"""
+
+import csv
+import datetime
+import html
+import io
+import json
+import threading
+import uuid
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+
+FORMATS = {
+    'markdown': ('md', 'text/markdown'),
+    'json': ('json', 'application/json'),
+    'html': ('html', 'text/html'),
+    'csv': ('csv', 'text/csv'),
+}
+
+SUMMARY_FIELDS = [
+    ('research_question', 'Research Question'),
+    ('methodology', 'Methodology'),
+    ('key_findings', 'Key Findings'),
+    ('limitations', 'Limitations'),
+    ('future_work', 'Future Work'),
+]
+
+GAP_FIELDS = [
+    ('common_themes', 'Common Themes'),
+    ('divergent_approaches', 'Divergent Approaches'),
+    ('research_gaps', 'Research Gaps'),
+]
+
+
+def build_results(query, ranked, analyzed, gap, total_found=None, token_usage=None, deadline=None, result_id=None):
+    """Assemble the results dict from the pieces the Streamlit app keeps (with a new ID unless one is given)"""
+    results = {
+        'result_id': result_id or new_result_id(),
+        'query': query,
+        'total_papers_found': total_found if total_found is not None else len(ranked),
+        'ranked_papers': ranked,
+        'detailed_analyses': analyzed,
+        'gap_analysis': gap
+    }
+    if token_usage:
+        results['token_usage'] = token_usage
+    if deadline:
+        results['deadline'] = deadline
+    return results
+
+
+def new_result_id():
+    """ID for a newly created results dict; the report cache is keyed on it"""
+    return uuid.uuid4().hex[:16]
+
+
+def _as_list(results):
+    return results if isinstance(results, list) else [results]
+
+
+def _clean_direction(direction):
+    return _text(direction).lstrip('0123456789.• ').replace('**', '')
+
+
+def _text(value, default='N/A'):
+    """A field as display text; list values (from lenient model replies) are joined with spaces"""
+    if value is None:
+        return default
+    if isinstance(value, (list, tuple)):
+        return ' '.join(str(item) for item in value)
+    return str(value)
+
+
+def _items(value):
+    """A list field as a list; a lone string is one item, not a sequence of characters"""
+    if not value:
+        return []
+    return [value] if isinstance(value, str) else list(value)
+
+
+def safe_url(url):
+    """The URL if it is http(s), else '' (no javascript: or data: links from federated sources)"""
+    url = str(url or '').strip()
+    return url if urlsplit(url).scheme.lower() in ('http', 'https') else ''
+
+
+def iter_markdown(results):
+    """Yield a Markdown report, one section at a time"""
+    generated = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    for r in _as_list(results):
+        yield f"# Research Report: {r['query']}\n\n"
+        yield f"**Generated:** {generated}\n\n"
+        yield f"**Papers Found:** {r['total_papers_found']}\n"
+        yield f"**Papers Analyzed:** {len(r['detailed_analyses'])}\n\n"
+
+        yield "---\n\n## Ranked Papers\n\n"
+        for i, paper in enumerate(r['ranked_papers'], 1):
+            yield (
+                f"### {i}. {paper['title']}\n"
+                f"- **Authors:** {', '.join(paper['authors'])}\n"
+                f"- **Published:** {paper.get('published', 'N/A')}\n"
+                f"- **URL:** {safe_url(paper['url']) or 'N/A'}\n\n"
+            )
+
+        yield "---\n\n## Detailed Analysis\n\n"
+        for i, analysis in enumerate(r['detailed_analyses'], 1):
+            summary = analysis['summary']
+            parts = [f"### Paper {i}: {analysis['title']}\n\n"]
+            if analysis.get('summary_source') == 'extractive':
+                parts.append("*Offline extractive summary (sentences quoted from the paper)*\n\n")
+            for key, label in SUMMARY_FIELDS:
+                parts.append(f"**{label}:**\n{_text(summary.get(key))}\n\n")
+            parts.append("---\n\n")
+            yield ''.join(parts)
+
+        gap = r.get('gap_analysis')
+        if gap:
+            parts = ["## Research Gap Analysis\n\n"]
+            for key, label in GAP_FIELDS:
+                parts.append(f"**{label}:**\n{_text(gap.get(key))}\n\n")
+            parts.append("**Proposed Research Directions:**\n")
+            for direction in _items(gap.get('proposed_directions')):
+                parts.append(f"- {_clean_direction(direction)}\n")
+            parts.append(f"\n**Novel Contribution:**\n{_text(gap.get('novel_contribution'))}\n\n")
+            yield ''.join(parts)
+
+        usage = r.get('token_usage')
+        if usage:
+            parts = ["## Token Usage\n\n| Stage | Calls | Prompt | Output | Total |\n|---|---|---|---|---|\n"]
+            for stage, entry in usage['stages'].items():
+                parts.append(f"| {stage} | {entry['calls']} | {entry['prompt_tokens']} | "
+                             f"{entry['output_tokens']} | {entry['total_tokens']} |\n")
+            parts.append(f"\n**Total:** {usage['total_tokens']} tokens "
+                         f"(~${usage['estimated_cost_usd']:.4f})\n\n")
+            for skip in usage['skipped']:
+                parts.append(f"- {skip['stage']}: {skip['reason']}\n")
+            yield ''.join(parts)
+
+        deadline = r.get('deadline')
+        if deadline and deadline['degradations']:
+            parts = [f"## Time Budget\n\nFinished in {deadline['elapsed_seconds']}s of {deadline['seconds']}s. "
+                     "Cut back to finish in time:\n\n"]
+            for step in deadline['degradations']:
+                parts.append(f"- {step['stage']} ({step['step']}): {step['reason']}\n")
+            yield ''.join(parts) + "\n"
+
+
+def iter_json(results):
+    """Yield a JSON document: an object for one result, an array for several"""
+    many = isinstance(results, list)
+    if many:
+        yield '['
+
+    for n, r in enumerate(_as_list(results)):
+        if n:
+            yield ','
+        yield '{' + f'"query": {json.dumps(r["query"])}, "total_papers_found": {r["total_papers_found"]}'
+        for key in ('ranked_papers', 'detailed_analyses'):
+            yield f', "{key}": ['
+            for i, item in enumerate(r[key]):
+                yield (',' if i else '') + json.dumps(item, default=str)
+            yield ']'
+        yield f', "gap_analysis": {json.dumps(r.get("gap_analysis"))}'
+        if r.get('token_usage'):
+            yield f', "token_usage": {json.dumps(r["token_usage"])}'
+        if r.get('deadline'):
+            yield f', "deadline": {json.dumps(r["deadline"])}'
+        yield '}'
+
+    if many:
+        yield ']'
+
+
+def iter_html(results):
+    """Yield a standalone HTML report"""
+    esc = html.escape
+    yield (
+        '<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>ScholarSync Report</title>'
+        '<style>body{font-family:Inter,sans-serif;max-width:900px;margin:2rem auto;color:#1a1a1a}'
+        'h3{margin-bottom:.25rem}.meta{color:#666}</style></head><body>\n'
+    )
+
+    for r in _as_list(results):
+        yield f"<h1>Research Report: {esc(r['query'])}</h1>\n"
+        yield (f"<p class=\"meta\">Papers found: {r['total_papers_found']} &middot; "
+               f"Papers analyzed: {len(r['detailed_analyses'])}</p>\n")
+
+        yield "<h2>Ranked Papers</h2>\n<ol>\n"
+        for paper in r['ranked_papers']:
+            url = safe_url(paper['url'])
+            title = f"<a href=\"{esc(url)}\">{esc(paper['title'])}</a>" if url else esc(paper['title'])
+            yield f"<li>{title} <span class=\"meta\">{esc(', '.join(paper['authors']))}</span></li>\n"
+        yield "</ol>\n"
+
+        yield "<h2>Detailed Analysis</h2>\n"
+        for i, analysis in enumerate(r['detailed_analyses'], 1):
+            summary = analysis['summary']
+            parts = [f"<h3>{i}. {esc(analysis['title'])}</h3>\n"]
+            for key, label in SUMMARY_FIELDS:
+                parts.append(f"<p><strong>{label}:</strong> {esc(_text(summary.get(key)))}</p>\n")
+            yield ''.join(parts)
+
+        gap = r.get('gap_analysis')
+        if gap:
+            parts = ["<h2>Research Gap Analysis</h2>\n"]
+            for key, label in GAP_FIELDS:
+                parts.append(f"<p><strong>{label}:</strong> {esc(_text(gap.get(key)).replace('**', ''))}</p>\n")
+            parts.append("<p><strong>Proposed Research Directions:</strong></p>\n<ol>\n")
+            for direction in _items(gap.get('proposed_directions')):
+                parts.append(f"<li>{esc(_clean_direction(direction))}</li>\n")
+            parts.append("</ol>\n")
+            parts.append(f"<p><strong>Novel Contribution:</strong> "
+                         f"{esc(_text(gap.get('novel_contribution')).replace('**', ''))}</p>\n")
+            yield ''.join(parts)
+
+    yield "</body></html>\n"
+
+
+def iter_csv(results):
+    """Yield CSV rows: one per ranked paper, with its analysis when there is one"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        value = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return value
+
+    writer.writerow(['query', 'rank', 'title', 'authors', 'published', 'url']
+                    + [key for key, _ in SUMMARY_FIELDS])
+    yield flush()
+
+    for r in _as_list(results):
+        analyses = {a['url']: a['summary'] for a in r['detailed_analyses']}
+        for rank, paper in enumerate(r['ranked_papers'], 1):
+            summary = analyses.get(paper['url'], {})
+            writer.writerow(
+                [r['query'], rank, paper['title'], '; '.join(paper['authors']), paper.get('published', ''),
+                 safe_url(paper['url'])]
+                + [_text(summary.get(key), '') for key, _ in SUMMARY_FIELDS]
+            )
+            yield flush()
+
+
+RENDERERS = {
+    'markdown': iter_markdown,
+    'json': iter_json,
+    'html': iter_html,
+    'csv': iter_csv,
+}
+
+
+def write_report(results, fmt, destination):
+    """
+    Stream a report to a path or a writable text stream
+
+    Args:
+        results (dict | list): One results dict or a list for a multi-query report
+        fmt (str): 'markdown', 'json', 'html' or 'csv'
+        destination (str | file): File path, or an object with write()
+    """
+    if isinstance(destination, str):
+        with open(destination, 'w', encoding='utf-8', newline='') as f:
+            for chunk in RENDERERS[fmt](results):
+                f.write(chunk)
+    else:
+        for chunk in RENDERERS[fmt](results):
+            destination.write(chunk)
+
+
+class ReportCache:
+    """LRU cache of rendered reports keyed by (result ID, format)"""
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def render(self, results, fmt='markdown'):
+        """Return the rendered report, rendering it only on the first request"""
+        ids = tuple(r.get('result_id') for r in _as_list(results))
+        if not all(ids):
+            # Nothing to key the cache on
+            return ''.join(RENDERERS[fmt](results))
+
+        key = (ids, fmt)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        rendered = ''.join(RENDERERS[fmt](results))
+
+        with self._lock:
+            self._entries[key] = rendered
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return rendered
+
+
+# Process-wide cache shared by the CLI and every Streamlit session
+report_cache = ReportCache()
+
+
+def render_report(results, fmt='markdown'):
+    """Render (or fetch from cache) a report as a string"""
+    return report_cache.render(results, fmt)
@@ -8,21 +8,60 @@ Concepts from 5-Day AI Agents Course:
 - Day 3: Context management across multiple papers
 """
 
-import requests
+import copy
 import json
 import os
 from dotenv import load_dotenv
 
+from agents.deadline import DeadlineExceeded
+from agents.gap_prompt import build_gap_prompt, compact_comparison, prompt_reduction
+from agents.gemini import GeminiError, field_text, generate_json
+from agents.model_router import model_router
+from agents.search_cache import normalize_query
+from agents.singleflight import SingleFlight
+from agents.token_budget import TokenBudgetExceeded, estimate_tokens, run_metered
+
+
+# Output tokens reserved for the gap analysis reply in budget checks
+GAP_OUTPUT_TOKENS = 1500
+
+# Per-field caps (tokens) tried in turn when the comparison does not fit the budget
+SHRINK_STEPS = [None, 150, 75, 40]
+
+# Seconds a gap analysis needs; with less left before the deadline it is skipped
+GAP_ANALYSIS_SECONDS = 15
+
+# Gemini is asked for JSON matching this schema; fields that come back
+# empty are re-asked on their own (see gemini.generate_json)
+GAP_SCHEMA = {
+    'type': 'OBJECT',
+    'properties': {
+        'common_themes': {'type': 'STRING'},
+        'divergent_approaches': {'type': 'STRING'},
+        'research_gaps': {'type': 'STRING'},
+        'proposed_directions': {'type': 'ARRAY', 'items': {'type': 'STRING'}},
+        'novel_contribution': {'type': 'STRING'}
+    },
+    'required': ['common_themes', 'divergent_approaches', 'research_gaps', 'proposed_directions',
+                 'novel_contribution']
+}
+
 
 class ResearchGapAnalyzerAgent:
     """Agent that identifies research gaps across multiple papers"""
 
-    def __init__(self, api_key):
-        """Initialize the agent with Gemini API key"""
+    def __init__(self, api_key, router=None):
+        """Initialize the agent with Gemini API key and an optional ModelRouter"""
         self.api_key = api_key
-        self.model = 'gemini-2.0-flash'
 
-    def analyze_gaps(self, analyzed_papers, research_query):
+        # Gap analysis uses the 'gap_analysis' route
+        self.router = router or model_router
+        self.model = self.router.primary('gap_analysis')
+
+        # Identical concurrent gap analyses share one Gemini call
+        self._inflight = SingleFlight()
+
+    def analyze_gaps(self, analyzed_papers, research_query, ledger=None, deadline=None):
         """
         Compare multiple papers and identify research gaps
 
@@ -31,6 +70,10 @@ class ResearchGapAnalyzerAgent:
         Args:
             analyzed_papers (list): List of paper analysis results from Agent 2
             research_query (str): Original research query
+            ledger (TokenLedger): Run budget; summaries are shortened to fit it,
+                and the analysis is skipped (None) if they still do not fit
+            deadline (Deadline): Run deadline; the analysis is skipped (None)
+                if less than GAP_ANALYSIS_SECONDS is left
 
         Returns:
             dict: Gap analysis with research directions
@@ -39,120 +82,97 @@ class ResearchGapAnalyzerAgent:
             print("⚠️  Need at least 2 analyzed papers to find gaps")
             return None
 
+        if deadline and not deadline.fits(GAP_ANALYSIS_SECONDS):
+            deadline.degrade('gap_analysis', 'skipped', f"skipped, only {deadline.remaining():.0f}s left")
+            return None
+
+        key = (normalize_query(research_query), tuple(paper.get('url') or paper['title'] for paper in analyzed_papers))
+        (gap_analysis, spent), shared = self._inflight.do(
+            key, run_metered, ledger, self._analyze_gaps, analyzed_papers, research_query, ledger, deadline
+        )
+        if shared:
+            print("🔗 Joined an in-flight gap analysis for the same papers")
+            # Another user's run may have led: pay for the work and keep a private copy
+            if ledger:
+                ledger.record_shared('gap_analysis', spent)
+            gap_analysis = copy.deepcopy(gap_analysis)
+        return gap_analysis
+
+    def _analyze_gaps(self, analyzed_papers, research_query, ledger, deadline=None):
+        """Run one gap analysis (see analyze_gaps)"""
         print("\n" + "=" * 70)
         print(f"🔬 ANALYZING RESEARCH GAPS")
         print(f"Comparing {len(analyzed_papers)} papers...")
         print("=" * 70)
 
-        # Format papers for comparison
-        papers_comparison = self._format_papers_for_comparison(analyzed_papers)
-
-        # Generate gap analysis
-        gap_analysis = self._generate_gap_analysis(papers_comparison, research_query)
+        # Build the compact comparison prompt, shortening each field until it fits the budget
+        for max_field_tokens in SHRINK_STEPS:
+            prompt = build_gap_prompt(analyzed_papers, research_query, max_field_tokens)
+            if not ledger or ledger.fits(estimate_tokens(prompt) + GAP_OUTPUT_TOKENS):
+                break
+        else:
+            ledger.note_skip('gap_analysis', f"skipped, only {ledger.remaining()} tokens left")
+            return None
 
-        return gap_analysis
+        if max_field_tokens:
+            ledger.note_skip('gap_analysis', f"summary fields shortened to ~{max_field_tokens} tokens to fit the budget")
 
-    def _format_papers_for_comparison(self, analyzed_papers):
-        """Format analyzed papers into comparison structure"""
-        comparison_text = ""
+        stats = prompt_reduction(analyzed_papers, research_query, prompt)
+        print(f"📉 Gap prompt: ~{stats['verbose_tokens']} -> ~{stats['compact_tokens']} tokens "
+              f"({stats['saved_pct']}% smaller)")
 
-        for i, paper in enumerate(analyzed_papers, 1):
-            summary = paper.get('summary', {})
-            comparison_text += f"\n{'=' * 60}\n"
-            comparison_text += f"PAPER {i}: {paper['title']}\n"
-            comparison_text += f"{'=' * 60}\n"
-            comparison_text += f"\nResearch Question:\n{summary.get('research_question', 'N/A')}\n"
-            comparison_text += f"\nMethodology:\n{summary.get('methodology', 'N/A')}\n"
-            comparison_text += f"\nKey Findings:\n{summary.get('key_findings', 'N/A')}\n"
-            comparison_text += f"\nLimitations:\n{summary.get('limitations', 'N/A')}\n"
-            comparison_text += f"\nFuture Work:\n{summary.get('future_work', 'N/A')}\n"
+        # Generate gap analysis (re-asks only see the query and the compact comparison)
+        followup_context = (f"Research gap analysis for the query \"{research_query}\".\n\n"
+                            f"{compact_comparison(analyzed_papers, max_field_tokens)}")
+        gap_analysis = self._generate_gap_analysis(prompt, ledger, followup_context, deadline)
 
-        return comparison_text
+        return gap_analysis
 
-    def _generate_gap_analysis(self, papers_comparison, research_query):
+    def _generate_gap_analysis(self, prompt, ledger=None, followup_context='', deadline=None):
         """Use Gemini to identify research gaps"""
 
         print("\n🤖 Using Gemini to identify research gaps...\n")
 
-        # Create comprehensive analysis prompt
-        prompt = f"""You are a research expert analyzing academic papers to identify research gaps.
-
-Original Research Query: {research_query}
-
-Papers Being Compared:
-{papers_comparison}
-
-Your Task: Perform a comprehensive gap analysis across these papers.
-
-Provide a structured analysis with these sections:
-
-1. COMMON THEMES: What do all these papers agree on or explore together?
-
-2. DIVERGENT APPROACHES: Where do the papers differ in methodology or focus?
-
-3. RESEARCH GAPS: What has NOT been explored yet? What's missing?
-   - Unexplored methodologies
-   - Untested domains/applications
-   - Missing comparisons
-   - Unaddressed limitations
-
-4. PROPOSED RESEARCH DIRECTIONS: Based on the gaps, what are 3-5 specific research questions that could be pursued?
-
-5. NOVEL CONTRIBUTION OPPORTUNITIES: What would be a novel contribution to this field?
-
-Format your response as:
-COMMON THEMES: [answer]
-
-DIVERGENT APPROACHES: [answer]
-
-RESEARCH GAPS: [answer]
-
-PROPOSED RESEARCH DIRECTIONS:
-1. [question 1]
-2. [question 2]
-3. [question 3]
-
-NOVEL CONTRIBUTION: [answer]
-
-Keep each section clear and specific.
-"""
-
-        # Call Gemini API
-        url = f'https://generativelanguage.googleapis.com/v1beta/models/{self.model}:generateContent?key={self.api_key}'
-
-        data = {
-            'contents': [{
-                'parts': [{'text': prompt}]
-            }]
-        }
-
         try:
-            response = requests.post(
-                url,
-                headers={'Content-Type': 'application/json'},
-                json=data,
-                timeout=60
+            data, missing = generate_json(
+                self.api_key, None, prompt, GAP_SCHEMA, timeout=60,
+                stage='gap_analysis', ledger=ledger, reserve_tokens=GAP_OUTPUT_TOKENS,
+                followup_context=followup_context, fallback_parser=self._parse_gap_analysis, deadline=deadline,
+                router=self.router
             )
 
-            if response.status_code == 200:
-                result = response.json()
-                analysis_text = result['candidates'][0]['content']['parts'][0]['text']
+            # Validated structured response, directions numbered as before
+            gap_analysis = {name: field_text(data.get(name)) for name in GAP_SCHEMA['required']}
+            directions = data.get('proposed_directions') or []
+            if isinstance(directions, str):
+                directions = [directions]
+            directions = [str(d).strip() for d in directions if str(d).strip()]
+            gap_analysis['proposed_directions'] = [
+                d if d[0].isdigit() else f"{i}. {d}" for i, d in enumerate(directions, 1)
+            ]
+            if missing:
+                print(f"⚠️  Gap analysis is missing: {', '.join(missing)}")
+            print("✅ Gap analysis complete!\n")
+            return gap_analysis
+
+        except TokenBudgetExceeded as e:
+            ledger.note_skip('gap_analysis', str(e))
+            return None
 
-                # Parse structured response
-                gap_analysis = self._parse_gap_analysis(analysis_text)
-                print("✅ Gap analysis complete!\n")
-                return gap_analysis
+        except DeadlineExceeded as e:
+            deadline.degrade('gap_analysis', 'skipped', str(e))
+            return None
 
-            else:
-                print(f"❌ Gemini API error: {response.status_code}")
-                return None
+        except GeminiError as e:
+            print(f"❌ {e}")
+            return None
 
         except Exception as e:
             print(f"❌ Gap analysis failed: {e}")
             return None
 
     def _parse_gap_analysis(self, analysis_text):
-        """Parse Gemini's gap analysis into structured format"""
+        """Parse a line-prefixed (non-JSON) gap analysis into structured format"""
 
         analysis = {
             'common_themes': '',
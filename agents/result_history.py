@@ -0,0 +1,280 @@
+"""
+Result History
+Durable log of finished research workflows, with full-text search
+
+Every completed run is stored with its full results, indexed by its
+normalized query, its time and the IDs of the papers it ranked, so a
+past result can be reloaded without calling any agent. Each run keeps
+the user who ran it, and every lookup can be limited to one user's runs
+so the web app never shows one user another's history. Paper summaries
+and gap analyses are also indexed in an FTS5 table (BM25-ranked, Porter
+stemming) for full-text search across all past runs. SQLite builds
+without FTS5 fall back to a slower LIKE scan.
+
+Backed by SQLite (standard library) in WAL mode, like the Analysis Store.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from agents.relevance_cache import paper_id
+from agents.search_cache import normalize_query
+
+
+SUMMARY_FIELDS = ['research_question', 'methodology', 'key_findings', 'limitations', 'future_work']
+GAP_FIELDS = ['common_themes', 'divergent_approaches', 'research_gaps', 'novel_contribution']
+
+
+def _document(fields, data):
+    """Join the text fields of a summary or gap analysis into one searchable document"""
+    parts = [str(data.get(name) or '') for name in fields]
+    parts += [str(direction) for direction in data.get('proposed_directions') or []]
+    return '\n'.join(part for part in parts if part)
+
+
+class ResultHistory:
+    """SQLite log of workflow results, searchable by query, time, paper and text"""
+
+    def __init__(self, db_path='.scholarsync_cache/history.db'):
+        self.db_path = db_path
+        self._local = threading.local()
+
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS runs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    query TEXT NOT NULL,
+                    query_key TEXT NOT NULL,
+                    user TEXT,
+                    papers_found INTEGER,
+                    papers_analyzed INTEGER,
+                    results TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS runs_by_query ON runs (query_key, created_at)')
+            conn.execute('CREATE INDEX IF NOT EXISTS runs_by_time ON runs (created_at)')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS run_papers (
+                    run_id INTEGER NOT NULL,
+                    paper_key TEXT NOT NULL,
+                    rank INTEGER NOT NULL,
+                    title TEXT,
+                    analyzed INTEGER NOT NULL,
+                    PRIMARY KEY (run_id, paper_key)
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS run_papers_by_paper ON run_papers (paper_key)')
+
+            try:
+                conn.execute('''
+                    CREATE VIRTUAL TABLE IF NOT EXISTS history_text USING fts5 (
+                        kind, title, body, run_id UNINDEXED, tokenize = 'porter unicode61'
+                    )
+                ''')
+                self.full_text = True
+            except sqlite3.OperationalError:
+                # SQLite built without FTS5: same columns, searched with LIKE
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS history_text_plain (
+                        kind TEXT, title TEXT, body TEXT, run_id INTEGER
+                    )
+                ''')
+                self.full_text = False
+        self._text_table = 'history_text' if self.full_text else 'history_text_plain'
+
+    def _connect(self):
+        """One connection per thread (sqlite3 connections are not thread-safe)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def record(self, results, user=None):
+        """
+        Store a finished workflow
+
+        Args:
+            results (dict): Results as returned by research_workflow
+            user (str): User who ran it
+
+        Returns:
+            int: ID of the stored run
+        """
+        analyses = results.get('detailed_analyses') or []
+        analyzed = {paper_id({'url': analysis.get('url', '')}) for analysis in analyses}
+
+        with self._connect() as conn:
+            run_id = conn.execute(
+                'INSERT INTO runs (query, query_key, user, papers_found, papers_analyzed, results, created_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (results['query'], normalize_query(results['query']), user, results.get('total_papers_found'),
+                 len(analyses), json.dumps(results, default=str), time.time())
+            ).lastrowid
+
+            papers = {}
+            for rank, paper in enumerate(results.get('ranked_papers') or [], 1):
+                papers.setdefault(paper_id(paper), (rank, paper.get('title')))
+            conn.executemany(
+                'INSERT INTO run_papers VALUES (?, ?, ?, ?, ?)',
+                [(run_id, key, rank, title, key in analyzed) for key, (rank, title) in papers.items()]
+            )
+
+            documents = [('summary', analysis.get('title'), _document(SUMMARY_FIELDS, analysis.get('summary') or {}))
+                         for analysis in analyses]
+            if results.get('gap_analysis'):
+                documents.append(('gaps', results['query'], _document(GAP_FIELDS, results['gap_analysis'])))
+            conn.executemany(
+                f'INSERT INTO {self._text_table} (kind, title, body, run_id) VALUES (?, ?, ?, ?)',
+                [(kind, title, body, run_id) for kind, title, body in documents if body]
+            )
+
+        return run_id
+
+    @staticmethod
+    def _for_user(sql, params, user, column='user'):
+        """Limit a query ending in a WHERE clause to one user's runs (user=None: every run)"""
+        if user is None:
+            return sql, params
+        return f'{sql} AND {column} = ?', params + [user]
+
+    def get(self, run_id, user=None):
+        """
+        Reload a stored run
+
+        Args:
+            run_id (int): ID returned by record
+            user (str): Only if this user ran it (None: any user)
+
+        Returns:
+            dict: The results as stored, with 'history_id' and 'created_at', or None
+        """
+        sql, params = self._for_user('SELECT results, created_at FROM runs WHERE id = ?', [run_id], user)
+        row = self._connect().execute(sql, params).fetchone()
+        if not row:
+            return None
+        results = json.loads(row['results'])
+        results['history_id'] = run_id
+        results['created_at'] = row['created_at']
+        return results
+
+    def recent(self, limit=20, query=None, since=None, user=None):
+        """
+        List past runs, newest first
+
+        Args:
+            limit (int): Most runs to return
+            query (str): Only runs whose query normalizes the same
+            since (float): Only runs after this UNIX time
+            user (str): Only this user's runs (None: every user's)
+
+        Returns:
+            list: Dicts with id, query, user, papers_found, papers_analyzed and created_at
+        """
+        sql = 'SELECT id, query, user, papers_found, papers_analyzed, created_at FROM runs WHERE 1 = 1'
+        params = []
+        if query:
+            sql += ' AND query_key = ?'
+            params.append(normalize_query(query))
+        if since is not None:
+            sql += ' AND created_at >= ?'
+            params.append(since)
+        sql, params = self._for_user(sql, params, user)
+        sql += ' ORDER BY created_at DESC, id DESC LIMIT ?'
+        params.append(limit)
+        return [dict(row) for row in self._connect().execute(sql, params)]
+
+    def runs_for_paper(self, paper, limit=20):
+        """
+        List past runs that ranked a paper, newest first
+
+        Args:
+            paper (dict or str): Paper dict or its URL
+
+        Returns:
+            list: Dicts with id, query, created_at, the paper's rank and whether it was analyzed
+        """
+        key = paper_id(paper if isinstance(paper, dict) else {'url': paper})
+        rows = self._connect().execute(
+            'SELECT runs.id, runs.query, runs.created_at, run_papers.rank, run_papers.analyzed '
+            'FROM run_papers JOIN runs ON runs.id = run_papers.run_id '
+            'WHERE run_papers.paper_key = ? ORDER BY runs.created_at DESC LIMIT ?',
+            (key, limit)
+        )
+        return [dict(row, analyzed=bool(row['analyzed'])) for row in rows]
+
+    def search(self, text, limit=20, user=None):
+        """
+        Full-text search over past paper summaries and gap analyses
+
+        Every word must match (stemmed, so "transformers" finds "transformer").
+        With a user, only that user's runs are searched.
+
+        Returns:
+            list: Best matches first, as dicts with run_id, query, created_at,
+                kind ('summary' or 'gaps'), title and a snippet
+        """
+        terms = re.findall(r'\w+', text.lower())
+        if not terms:
+            return []
+
+        if self.full_text:
+            match = ' '.join(f'"{term}"' for term in terms)
+            sql, params = self._for_user(
+                "SELECT history_text.run_id, runs.query, runs.created_at, history_text.kind, history_text.title, "
+                "snippet(history_text, 2, '**', '**', '…', 16) AS snippet "
+                "FROM history_text JOIN runs ON runs.id = history_text.run_id "
+                "WHERE history_text MATCH ?",
+                [match], user, 'runs.user'
+            )
+            rows = self._connect().execute(sql + ' ORDER BY rank LIMIT ?', params + [limit])
+        else:
+            where = ' AND '.join(['(LOWER(body) LIKE ? OR LOWER(title) LIKE ?)'] * len(terms))
+            params = [pattern for term in terms for pattern in (f'%{term}%',) * 2]
+            sql, params = self._for_user(
+                'SELECT text.run_id, runs.query, runs.created_at, text.kind, text.title, '
+                'SUBSTR(text.body, 1, 200) AS snippet '
+                'FROM history_text_plain AS text JOIN runs ON runs.id = text.run_id '
+                f'WHERE ({where})',
+                params, user, 'runs.user'
+            )
+            rows = self._connect().execute(sql + ' ORDER BY runs.created_at DESC LIMIT ?', params + [limit])
+        return [dict(row) for row in rows]
+
+    def count(self, user=None):
+        sql, params = self._for_user('SELECT COUNT(*) FROM runs WHERE 1 = 1', [], user)
+        return self._connect().execute(sql, params).fetchone()[0]
+
+
+def main():
+    """List recent runs, or search them: python -m agents.result_history [words...]"""
+    import datetime
+    import sys
+
+    history = ResultHistory()
+    if len(sys.argv) > 1:
+        hits = history.search(' '.join(sys.argv[1:]))
+        print(f"🔎 {len(hits)} match(es) in {history.count()} stored run(s)\n")
+        for hit in hits:
+            when = datetime.datetime.fromtimestamp(hit['created_at']).strftime('%Y-%m-%d %H:%M')
+            print(f"#{hit['run_id']} {when} [{hit['kind']}] {hit['title']}")
+            print(f"  {hit['snippet']}\n")
+    else:
+        for run in history.recent():
+            when = datetime.datetime.fromtimestamp(run['created_at']).strftime('%Y-%m-%d %H:%M')
+            print(f"#{run['id']} {when}  {run['query']}  "
+                  f"({run['papers_found']} found, {run['papers_analyzed']} analyzed)")
+
+
+if __name__ == "__main__":
+    main()
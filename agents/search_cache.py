@@ -0,0 +1,149 @@
+"""
+Search Result Cache
+Remembers search_papers results for repeated (normalized) queries
+
+"Transformer models in NLP", "transformer  models NLP" and "NLP transformer
+models" all normalize to the same key, so the arxiv round-trip is only paid
+once. Entries are fresh for `ttl` seconds. After that they are served
+stale for up to `stale_ttl` seconds while a background thread refreshes
+them (stale-while-revalidate). Hit-rate counters are kept for monitoring.
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from how in into is it of on or the to using
+via what with within
+""".split())
+
+
+# arXiv field prefixes (ti:, abs:, cat:, ...) and boolean operators; in such
+# queries order and operators carry meaning, so terms are not reordered
+STRUCTURED_QUERY = re.compile(r'\b(?:ti|au|abs|co|jr|cat|rn|id|all):|\b(?:AND|OR|ANDNOT)\b')
+
+
+def normalize_query(query):
+    """
+    Normalize a search query for cache lookups
+
+    Lowercases, strips punctuation and extra whitespace, drops stopwords
+    and sorts the remaining unique terms. Field and boolean queries
+    ("ti:graph AND abs:attention") are only casefolded and have their
+    whitespace collapsed, keeping the tokens in order.
+    """
+    if STRUCTURED_QUERY.search(query):
+        return ' '.join(query.casefold().split())
+
+    terms = re.findall(r'[a-z0-9]+', query.lower())
+    kept = {term for term in terms if term not in STOPWORDS}
+    return ' '.join(sorted(kept or terms))
+
+
+class SearchResultCache:
+    """In-memory TTL cache with stale-while-revalidate refresh"""
+
+    def __init__(self, ttl=3600, stale_ttl=24 * 3600, max_entries=512):
+        """
+        Args:
+            ttl (float): Seconds an entry is served without refreshing
+            stale_ttl (float): Further seconds a stale entry may be served
+                while it is refreshed in the background
+            max_entries (int): Least recently used entries beyond this are evicted
+        """
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+
+        self._entries = OrderedDict()   # key -> (stored_at, papers)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+        self.metrics = {
+            'hits': 0,
+            'stale_hits': 0,
+            'misses': 0,
+            'refreshes': 0,
+            'refresh_errors': 0
+        }
+
+    @staticmethod
+    def make_key(query, max_results, sort_by, **options):
+        """Build a cache key from the normalized query and search parameters"""
+        return (normalize_query(query), max_results, sort_by) + tuple(sorted(options.items()))
+
+    def get_or_fetch(self, key, fetch):
+        """
+        Return cached papers for key, calling fetch() on a miss
+
+        fetch must return a list of papers or raise; failures are never cached.
+        Stale entries are returned immediately and refreshed in the background.
+        """
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                age = now - entry[0]
+                if age <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self.metrics['hits'] += 1
+                    return self._copy(entry[1])
+
+                if age <= self.ttl + self.stale_ttl:
+                    self._entries.move_to_end(key)
+                    self.metrics['stale_hits'] += 1
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        threading.Thread(target=self._refresh, args=(key, fetch), daemon=True).start()
+                    return self._copy(entry[1])
+
+                del self._entries[key]
+
+            self.metrics['misses'] += 1
+
+        papers = fetch()
+        self._store(key, papers)
+        return self._copy(papers)
+
+    def stats(self):
+        """Return counters plus hit rate (fresh and stale hits over all lookups)"""
+        with self._lock:
+            stats = dict(self.metrics)
+            lookups = stats['hits'] + stats['stale_hits'] + stats['misses']
+            stats['hit_rate'] = round((stats['hits'] + stats['stale_hits']) / lookups, 3) if lookups else 0.0
+            stats['entries'] = len(self._entries)
+            return stats
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _refresh(self, key, fetch):
+        try:
+            papers = fetch()
+            self._store(key, papers)
+            with self._lock:
+                self.metrics['refreshes'] += 1
+        except Exception as e:
+            print(f"⚠️  Background search refresh failed: {e}")
+            with self._lock:
+                self.metrics['refresh_errors'] += 1
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _store(self, key, papers):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), self._copy(papers))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    @staticmethod
+    def _copy(papers):
+        """Shallow-copy each paper so callers cannot mutate cached entries"""
+        return [dict(paper) for paper in papers]
@@ -0,0 +1,77 @@
+"""
+Single Flight
+Coalesces concurrent identical calls into one in-flight computation
+
+When several sessions ask for the same thing at the same moment (same
+topic, same PDF, same summary), only the first caller runs the work; the
+others block until it finishes and receive the same result, or the same
+exception. Nothing is remembered once the call completes; the caches
+decide what is reused later.
+"""
+
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Group of keyed calls where at most one call per key is in flight"""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+        self.metrics = {
+            'executed': 0,
+            'coalesced': 0
+        }
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Run fn(*args, **kwargs) unless an identical call is already running
+
+        Args:
+            key (hashable): Identifies identical calls
+            fn (callable): The work to run
+
+        Returns:
+            tuple: (result, shared) where shared is True when this caller
+            attached to another caller's computation
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.metrics['coalesced'] += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                self.metrics['executed'] += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.metrics)
+            stats['in_flight'] = len(self._calls)
+            return stats
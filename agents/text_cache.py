@@ -0,0 +1,143 @@
+"""
+Extracted Text Cache
+Stores PDF text extraction results so each paper is only parsed once
+
+Entries are keyed by the SHA-256 of the PDF bytes, the extraction backend
+and the page range. Text is kept zlib-compressed on disk, with a small
+in-memory LRU in front of it for papers that are analyzed repeatedly.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+import zlib
+from collections import OrderedDict
+
+
+def hash_pdf(pdf_stream, chunk_size=1024 * 1024):
+    """
+    Return the SHA-256 hex digest of a seekable PDF stream
+
+    Reads in chunks so disk-backed (mmap) PDFs are never copied whole.
+    """
+    digest = hashlib.sha256()
+    pdf_stream.seek(0)
+    while True:
+        chunk = pdf_stream.read(chunk_size)
+        if not chunk:
+            break
+        digest.update(chunk)
+    pdf_stream.seek(0)
+    return digest.hexdigest()
+
+
+class ExtractedTextCache:
+    """Two-level (memory LRU + compressed disk) cache of extracted PDF text"""
+
+    def __init__(self, cache_dir='.scholarsync_cache/text', max_memory_items=64, compression_level=6):
+        """
+        Args:
+            cache_dir (str): Directory for compressed entries (None for memory only)
+            max_memory_items (int): Entries kept decompressed in the LRU
+            compression_level (int): zlib level, 1 (fast) to 9 (small)
+        """
+        self.cache_dir = cache_dir
+        self.max_memory_items = max_memory_items
+        self.compression_level = compression_level
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(pdf_hash, backend, page_range):
+        """Build the cache key for a (hash, backend, (first_page, last_page)) triple"""
+        first_page, last_page = page_range
+        return f"{pdf_hash}_{backend}_{first_page}-{last_page}"
+
+    def get(self, pdf_hash, backend, page_range):
+        """
+        Look up extracted text
+
+        Returns:
+            str: Cached text, or None on a miss
+        """
+        key = self.make_key(pdf_hash, backend, page_range)
+
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return self._memory[key]
+
+        text = self._read_disk(key)
+
+        with self._lock:
+            if text is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(key, text)
+        return text
+
+    def put(self, pdf_hash, backend, page_range, text):
+        """Store extracted text in memory and on disk"""
+        key = self.make_key(pdf_hash, backend, page_range)
+
+        with self._lock:
+            self._remember(key, text)
+
+        self._write_disk(key, text)
+
+    def stats(self):
+        """Return hit/miss counters and the current LRU size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+                'memory_items': len(self._memory)
+            }
+
+    def _remember(self, key, text):
+        """Insert into the LRU, evicting the oldest entry (caller holds the lock)"""
+        if self.max_memory_items <= 0:
+            return
+        self._memory[key] = text
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def _path(self, key):
+        """Shard files by the first two hash characters to keep directories small"""
+        return os.path.join(self.cache_dir, key[:2], key + '.txt.z')
+
+    def _read_disk(self, key):
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._path(key), 'rb') as f:
+                return zlib.decompress(f.read()).decode('utf-8')
+        except (OSError, zlib.error, UnicodeDecodeError):
+            return None
+
+    def _write_disk(self, key, text):
+        if not self.cache_dir:
+            return
+
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            data = zlib.compress(text.encode('utf-8'), self.compression_level)
+
+            # Write to a temp file and rename so readers never see half an entry
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️  Could not write text cache entry: {e}")
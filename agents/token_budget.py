@@ -0,0 +1,285 @@
+"""
+Token Budget
+Local token estimates, per-stage usage accounting and budgets
+
+A TokenLedger follows one workflow run. Before each Gemini call the
+prompt is estimated locally (about 4 characters per token) and reserved
+against what is left of the run budget and the user's budget, so calls
+made at the same time cannot all pass the check; after the call the
+reservation is settled with the actual counts from the response's
+usageMetadata, recorded under the calling stage. Stages shrink their
+context or skip themselves when the budget runs short, and the ledger's
+breakdown() goes into the results.
+
+A run that joins another run's in-flight work (the same workflow, paper
+analysis, summary or gap analysis, possibly for another user) gets the
+result without spending tokens; it is charged what the work cost
+(record_shared), so per-user budgets hold however requests coalesce.
+"""
+
+import os
+import threading
+import time
+
+
+# USD per million (input, output) tokens, for the cost estimate in breakdown()
+MODEL_PRICES = {
+    'gemini-2.0-flash': (0.10, 0.40),
+    'gemini-2.0-flash-lite': (0.075, 0.30),
+    'gemini-2.5-flash': (0.30, 2.50),
+}
+
+
+class TokenBudgetExceeded(Exception):
+    """A Gemini call would exceed the run or user token budget"""
+
+
+def estimate_tokens(text):
+    """Rough token estimate (about 4 characters per token for English)"""
+    return len(text) // 4 + 1
+
+
+def truncate_to_tokens(text, max_tokens):
+    """Cut text to roughly max_tokens, marking the cut with '...'"""
+    max_chars = max(0, max_tokens) * 4
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars] + "..."
+
+
+def run_metered(ledger, fn, *args, **kwargs):
+    """
+    Run fn and measure the tokens the ledger was charged meanwhile
+
+    Returns:
+        tuple: (result, tokens); tokens is 0 without a ledger
+    """
+    before = ledger.used() if ledger else 0
+    result = fn(*args, **kwargs)
+    return result, (ledger.used() - before if ledger else 0)
+
+
+def budget_from_env(name):
+    """Read a token budget from an environment variable (unset or empty = None)"""
+    value = os.getenv(name, '').strip()
+    return int(value) if value else None
+
+
+class UserTokenBudgets:
+    """Tokens used per user in a rolling window, shared by all of a user's runs"""
+
+    def __init__(self, limit=None, window=24 * 3600):
+        """
+        Args:
+            limit (int): Tokens each user may spend per window (None = unlimited)
+            window (float): Window length in seconds
+        """
+        self.limit = limit
+        self.window = window
+        self._usage = {}   # user -> (window start, tokens used)
+        self._reserved = {}  # user -> tokens of calls still in flight
+        self._lock = threading.Lock()
+
+    def remaining(self, user):
+        """Tokens the user may still spend, or None when unlimited"""
+        if self.limit is None or user is None:
+            return None
+        with self._lock:
+            return self._left(user)
+
+    def reserve(self, user, tokens):
+        """Set aside tokens for a call if they fit; returns False if they do not"""
+        if user is None:
+            return True
+        with self._lock:
+            if self.limit is not None and tokens > self._left(user):
+                return False
+            self._reserved[user] = self._reserved.get(user, 0) + tokens
+            return True
+
+    def charge(self, user, tokens, reserved=0):
+        """Count tokens spent, releasing a reservation made for them"""
+        if user is None:
+            return
+        with self._lock:
+            start, used = self._current(user)
+            self._usage[user] = (start, used + tokens)
+            self._release(user, reserved)
+
+    def release(self, user, tokens):
+        """Give back a reservation for a call that spent nothing"""
+        if user is None:
+            return
+        with self._lock:
+            self._release(user, tokens)
+
+    def _release(self, user, tokens):
+        left = self._reserved.get(user, 0) - tokens
+        if left > 0:
+            self._reserved[user] = left
+        else:
+            self._reserved.pop(user, None)
+
+    def _left(self, user):
+        return self.limit - self._current(user)[1] - self._reserved.get(user, 0)
+
+    def _current(self, user):
+        now = time.time()
+        start, used = self._usage.get(user, (now, 0))
+        if now - start >= self.window:
+            start, used = now, 0
+        return start, used
+
+
+class TokenLedger:
+    """Per-stage token usage of one workflow run, with budget checks"""
+
+    def __init__(self, run_budget=None, user=None, user_budgets=None, model='gemini-2.0-flash'):
+        """
+        Args:
+            run_budget (int): Tokens this run may spend (None = unlimited)
+            user (str): User charged for the run's tokens
+            user_budgets (UserTokenBudgets): Shared per-user budgets
+            model (str): Model priced for calls recorded without a model name
+        """
+        self.run_budget = run_budget
+        self.user = user
+        self.user_budgets = user_budgets
+        self.model = model
+
+        self._stages = {}
+        self._cost = 0.0
+        self._skipped = []
+        self._reserved = 0   # estimates of calls checked but not yet recorded
+        self._shared = {}    # stage -> tokens of other runs' work this run joined
+        self._lock = threading.Lock()
+
+    def remaining(self):
+        """Tokens left under the tighter of the run and user budgets, or None"""
+        limits = []
+        if self.run_budget is not None:
+            with self._lock:
+                limits.append(self.run_budget - self._used() - self._reserved)
+        if self.user_budgets is not None:
+            user_left = self.user_budgets.remaining(self.user)
+            if user_left is not None:
+                limits.append(user_left)
+        return max(0, min(limits)) if limits else None
+
+    def fits(self, tokens):
+        remaining = self.remaining()
+        return remaining is None or tokens <= remaining
+
+    def check(self, stage, tokens):
+        """
+        Reserve about `tokens` tokens for a call, or raise TokenBudgetExceeded
+
+        The reservation counts against remaining() until record() settles it
+        (or release() gives it back), so concurrent calls cannot overspend.
+        """
+        with self._lock:
+            fits = self.run_budget is None or tokens <= self.run_budget - self._used() - self._reserved
+            if fits and self.user_budgets is not None:
+                fits = self.user_budgets.reserve(self.user, tokens)
+            if fits:
+                self._reserved += tokens
+        if not fits:
+            raise TokenBudgetExceeded(
+                f"{stage} needs ~{tokens} tokens, {self.remaining()} left in the budget"
+            )
+
+    def release(self, tokens):
+        """Give back a reservation from check() for a call that failed"""
+        with self._lock:
+            self._reserved = max(0, self._reserved - tokens)
+        if self.user_budgets is not None:
+            self.user_budgets.release(self.user, tokens)
+
+    def used(self):
+        with self._lock:
+            return self._used()
+
+    def _used(self):
+        return sum(stage['total_tokens'] for stage in self._stages.values()) + sum(self._shared.values())
+
+    def record_shared(self, stage, tokens):
+        """
+        Charge this run for in-flight work it joined instead of doing
+
+        Args:
+            stage (str): Workflow stage, e.g. 'analysis'
+            tokens (int): Tokens the joined work spent (see run_metered)
+        """
+        if tokens <= 0:
+            return
+        with self._lock:
+            self._shared[stage] = self._shared.get(stage, 0) + tokens
+        if self.user_budgets is not None:
+            self.user_budgets.charge(self.user, tokens)
+
+    def record(self, stage, usage, estimated_prompt_tokens, model=None, reserved=0):
+        """
+        Record one call's usage
+
+        Args:
+            stage (str): Workflow stage, e.g. 'summary'
+            usage (dict): Gemini usageMetadata (may be empty)
+            estimated_prompt_tokens (int): Local estimate made before the call
+            model (str): Model that answered (default: the ledger's model)
+            reserved (int): Tokens check() reserved for the call, now settled
+        """
+        model = model or self.model
+        prompt = usage.get('promptTokenCount', estimated_prompt_tokens)
+        output = usage.get('candidatesTokenCount', 0)
+        total = usage.get('totalTokenCount', prompt + output)
+        input_price, output_price = MODEL_PRICES.get(model, (0.0, 0.0))
+
+        with self._lock:
+            entry = self._stages.setdefault(stage, {
+                'calls': 0,
+                'estimated_prompt_tokens': 0,
+                'prompt_tokens': 0,
+                'output_tokens': 0,
+                'total_tokens': 0,
+                'models': {}
+            })
+            entry['calls'] += 1
+            entry['models'][model] = entry['models'].get(model, 0) + 1
+            entry['estimated_prompt_tokens'] += estimated_prompt_tokens
+            entry['prompt_tokens'] += prompt
+            entry['output_tokens'] += output
+            entry['total_tokens'] += total
+            self._cost += (prompt * input_price + output * output_price) / 1e6
+            self._reserved = max(0, self._reserved - reserved)
+
+        if self.user_budgets is not None:
+            self.user_budgets.charge(self.user, total, reserved)
+
+    def note_skip(self, stage, reason):
+        """Remember that a stage was shrunk or skipped to stay within budget"""
+        print(f"💸 {stage}: {reason}")
+        with self._lock:
+            self._skipped.append({'stage': stage, 'reason': reason})
+
+    def breakdown(self):
+        """Return per-stage usage, totals, joined work, remaining budget and estimated cost"""
+        with self._lock:
+            stages = {name: dict(entry, models=dict(entry['models'])) for name, entry in self._stages.items()}
+            shared = dict(self._shared)
+            skipped = list(self._skipped)
+            cost = self._cost
+
+        prompt = sum(entry['prompt_tokens'] for entry in stages.values())
+        output = sum(entry['output_tokens'] for entry in stages.values())
+
+        return {
+            'stages': stages,
+            'prompt_tokens': prompt,
+            'output_tokens': output,
+            'total_tokens': sum(entry['total_tokens'] for entry in stages.values()),
+            'shared_tokens': shared,
+            'estimated_cost_usd': round(cost, 6),
+            'run_budget': self.run_budget,
+            'remaining': self.remaining(),
+            'skipped': skipped
+        }
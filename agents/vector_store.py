@@ -0,0 +1,251 @@
+"""
+Summary Vector Store
+Local similarity index over analyzed papers
+
+Summaries and abstracts are embedded on the CPU with a signed feature-
+hashing vectorizer (words + bigrams, log term frequency, L2-normalized),
+so there is no model to download. Vectors live in a memory-mapped float32
+matrix on disk and an append-only JSON-lines file maps rows to paper IDs.
+Top-k cosine search is one matrix-vector product plus argpartition, which
+answers "have we analyzed something similar?" in milliseconds across
+hundreds of thousands of papers.
+
+Several processes (the Streamlit app, the API, the CLI) may share one
+directory: rows are allocated under an flock on ids.jsonl after reading
+the lines other processes appended since, so every paper gets its own
+row. Without fcntl (Windows) only threads of one process are coordinated.
+"""
+
+import json
+import os
+import re
+import threading
+import zlib
+from contextlib import contextmanager
+
+import numpy as np
+
+
+class HashingEmbedder:
+    """Signed feature hashing of unigrams and bigrams into a fixed-size vector"""
+
+    def __init__(self, dim=384):
+        self.dim = dim
+
+    def embed(self, text):
+        """Return an L2-normalized float32 vector for text"""
+        words = re.findall(r'[a-z0-9]+', text.lower())
+        features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+        vector = np.zeros(self.dim, dtype=np.float32)
+        if not features:
+            return vector
+
+        hashes = np.fromiter((zlib.crc32(f.encode('utf-8')) for f in features), dtype=np.uint32, count=len(features))
+        indices = (hashes % self.dim).astype(np.intp)
+        signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+        np.add.at(vector, indices, signs)
+
+        # Dampen repeated terms, then normalize for cosine similarity
+        vector = np.sign(vector) * np.log1p(np.abs(vector))
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class VectorStore:
+    """Memory-mapped float32 matrix of embeddings with a paper ID map"""
+
+    def __init__(self, path='.scholarsync_cache/vectors', dim=384, initial_capacity=1024):
+        """
+        Args:
+            path (str): Directory holding vectors.f32 and ids.jsonl
+            dim (int): Embedding dimension
+            initial_capacity (int): Rows allocated when the store is created
+        """
+        self.path = path
+        self.embedder = HashingEmbedder(dim)
+        self.dim = dim
+
+        self._lock = threading.Lock()
+        self._matrix_path = os.path.join(path, 'vectors.f32')
+        self._ids_path = os.path.join(path, 'ids.jsonl')
+
+        os.makedirs(path, exist_ok=True)
+
+        # Replay the ID map; later lines for the same ID overwrite earlier ones
+        self._rows = {}
+        self._ids = []       # paper ID per row (None for a row no paper owns)
+        self._metadata = []
+        self._ids_offset = 0  # bytes of ids.jsonl replayed so far
+        with self._file_lock(exclusive=False):
+            self._replay()
+
+        existing_rows = os.path.getsize(self._matrix_path) // (4 * dim) if os.path.exists(self._matrix_path) else 0
+        self._open_matrix(max(existing_rows, initial_capacity, len(self._ids)))
+
+    def __len__(self):
+        return len(self._rows)
+
+    def add(self, paper_id, text, metadata=None):
+        """
+        Embed text and store it under paper_id (replacing any previous vector)
+
+        Args:
+            paper_id (str): Stable paper ID
+            text (str): Summary and/or abstract to embed
+            metadata (dict): Small JSON-serializable extras (title, url, ...)
+        """
+        vector = self.embedder.embed(text)
+        metadata = metadata or {}
+
+        with self._lock, self._file_lock(exclusive=True):
+            # Rows other processes allocated since our last look are taken
+            self._replay()
+            row = self._rows.get(paper_id, len(self._ids))
+            if row >= self._capacity:
+                self._open_matrix(max(self._capacity * 2, row + 1))
+
+            # Vector first, then the line that makes it visible to readers
+            self._matrix[row] = vector
+
+            line = json.dumps({'id': paper_id, 'row': row, 'metadata': metadata}) + '\n'
+            with open(self._ids_path, 'ab') as f:
+                f.write(line.encode('utf-8'))
+            self._ids_offset += len(line.encode('utf-8'))
+            self._set_row(paper_id, row, metadata)
+
+    def search(self, text, k=5, min_score=0.0):
+        """
+        Find the stored papers most similar to text
+
+        Returns:
+            list: Up to k dicts {'id', 'score', 'metadata'}, best first
+        """
+        query = self.embedder.embed(text)
+
+        with self._lock:
+            # Pick up papers other processes added
+            if os.path.exists(self._ids_path) and os.path.getsize(self._ids_path) > self._ids_offset:
+                with self._file_lock(exclusive=False):
+                    self._replay()
+
+            count = len(self._ids)
+            if not self._rows or not query.any():
+                return []
+
+            scores = self._matrix[:count] @ query
+            k = min(k, count)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+
+            return [
+                {'id': self._ids[row], 'score': round(float(scores[row]), 4), 'metadata': self._metadata[row]}
+                for row in top
+                if scores[row] >= min_score and self._ids[row] is not None
+            ]
+
+    def flush(self):
+        """Write dirty matrix pages to disk (the OS also does this on its own)"""
+        with self._lock:
+            self._matrix.flush()
+
+    def _set_row(self, paper_id, row, metadata):
+        previous = self._rows.get(paper_id)
+        if previous is not None and previous != row:
+            self._ids[previous] = None
+            self._metadata[previous] = {}
+
+        # Rows may arrive out of order from other processes; fill the gap until their lines are read
+        while len(self._ids) <= row:
+            self._ids.append(None)
+            self._metadata.append({})
+
+        if self._ids[row] is not None and self._ids[row] != paper_id:
+            self._rows.pop(self._ids[row], None)
+        self._rows[paper_id] = row
+        self._ids[row] = paper_id
+        self._metadata[row] = metadata
+
+    def _replay(self):
+        """Apply ID-map lines appended since the last replay (call under the file lock)"""
+        if not os.path.exists(self._ids_path):
+            return
+        with open(self._ids_path, 'rb') as f:
+            f.seek(self._ids_offset)
+            data = f.read()
+
+        # Only whole lines; a torn tail is read again next time
+        data = data[:data.rfind(b'\n') + 1]
+        for line in data.decode('utf-8').splitlines():
+            if line.strip():
+                entry = json.loads(line)
+                self._set_row(entry['id'], entry['row'], entry.get('metadata', {}))
+        self._ids_offset += len(data)
+
+        if getattr(self, '_capacity', None) is not None and len(self._ids) > self._capacity:
+            self._open_matrix(len(self._ids))
+
+    @contextmanager
+    def _file_lock(self, exclusive):
+        """Hold an flock on ids.jsonl, shared with other processes using this directory"""
+        try:
+            import fcntl
+        except ImportError:
+            yield
+            return
+
+        with open(self._ids_path, 'ab') as f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _open_matrix(self, capacity):
+        """(Re)map the matrix file with room for `capacity` rows, growing it if needed"""
+        needed = capacity * self.dim * 4
+        with open(self._matrix_path, 'ab') as f:
+            if f.tell() < needed:
+                f.truncate(needed)
+
+        self._matrix = np.memmap(self._matrix_path, dtype=np.float32, mode='r+', shape=(capacity, self.dim))
+        self._capacity = capacity
+
+
+def main():
+    """Benchmark top-k search on a synthetic store"""
+    import tempfile
+    import time
+
+    num_papers = 200000
+    rng = np.random.default_rng(0)
+
+    print(f"🚀 Building a synthetic store of {num_papers:,} papers...\n")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store = VectorStore(tmp_dir, initial_capacity=num_papers + 1)
+
+        # Fill the matrix directly with random unit vectors; add() would mostly time JSON writes
+        for start_row in range(0, num_papers, 50000):
+            block = rng.standard_normal((min(50000, num_papers - start_row), store.dim)).astype(np.float32)
+            block /= np.linalg.norm(block, axis=1, keepdims=True)
+            store._matrix[start_row:start_row + len(block)] = block
+        for row in range(num_papers):
+            store._set_row(f"paper-{row}", row, {})
+        store.add('attention', 'transformer self attention sequence model translation', {'title': 'Attention'})
+
+        start = time.perf_counter()
+        runs = 20
+        for _ in range(runs):
+            results = store.search('self attention transformer for translation', k=5)
+        elapsed_ms = (time.perf_counter() - start) / runs * 1000
+
+        print(f"📊 Top hit: {results[0]['id']} (score {results[0]['score']})")
+        print(f"📊 Average top-5 search time: {elapsed_ms:.1f} ms over {len(store):,} papers")
+        assert results[0]['id'] == 'attention'
+
+    print("\n✅ Vector store benchmark complete!")
+
+
+if __name__ == "__main__":
+    main()
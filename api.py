@@ -0,0 +1,475 @@
+"""
+ScholarSync AI - HTTP API
+Asynchronous JSON API around ScholarSyncOrchestrator
+
+Research jobs are accepted over HTTP, queued, and run by a fixed number
+of workers, each running one workflow at a time in a thread pool. The
+event loop itself only parses requests and moves JSON, so one process
+holds thousands of open clients (status polls and progress streams)
+while the worker count bounds the Gemini, arXiv and PDF load.
+
+Endpoints:
+    POST /jobs               Start a job: {"query": ..., "max_papers": 5, "analyze_top": 2,
+                             "token_budget": null, "deadline": null, "instant": false,
+                             "full_paper": false, "user": "api"}; 503 when the queue is full
+    GET  /jobs               Recent jobs and their status
+    GET  /jobs/<id>          Status, current stage and progress events of one job
+    GET  /jobs/<id>/result   Results of a finished job (409 while it is still running)
+    GET  /jobs/<id>/events   Progress as Server-Sent Events until the job ends
+                             (resumes after the Last-Event-ID header)
+    GET  /health             Queue, worker and dependency health
+
+There is no authentication: "user" is whatever the client sends, so the
+per-user daily token budget (SCHOLARSYNC_USER_TOKEN_BUDGET) only holds
+for clients that name themselves honestly. Expose the API to untrusted
+clients only behind a proxy that authenticates them and rewrites "user",
+and rely on the per-job token_budget and deadline as the hard limits.
+
+Built on asyncio streams (standard library). Run with `python api.py`;
+SCHOLARSYNC_API_HOST, SCHOLARSYNC_API_PORT, SCHOLARSYNC_API_WORKERS and
+SCHOLARSYNC_API_QUEUE configure it.
+"""
+
+import asyncio
+import json
+import math
+import os
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import urlsplit
+
+from dotenv import load_dotenv
+
+from agents.circuit_breaker import breakers
+from agents.rate_limiter import gemini_limiter
+from agents.token_budget import budget_from_env
+
+
+MAX_BODY_BYTES = 64 * 1024
+MAX_HEADERS = 100
+
+# Seconds a client may take to send its request
+REQUEST_TIMEOUT = 10
+
+# Seconds between keep-alive comments on an idle event stream
+KEEPALIVE_SECONDS = 15
+
+# Finished jobs kept for status and result requests (oldest dropped first)
+MAX_FINISHED_JOBS = 1000
+
+# Job option: (type, default, lowest, highest); the CLI and web app use the same ranges
+JOB_OPTIONS = {
+    'max_papers': (int, 5, 3, 10),
+    'analyze_top': (int, 2, 1, 3),
+    'token_budget': (int, None, 1, None),
+    'deadline': (float, None, 1, None),
+}
+
+
+class HttpError(Exception):
+    """An error answered with a JSON {"error": message} body"""
+
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+
+
+def parse_job(payload):
+    """
+    Validate a job request body
+
+    Args:
+        payload (dict): Decoded JSON body of POST /jobs
+
+    'user' (default 'api') picks the per-user token budget to charge. It is
+    self-declared, not authenticated: a client can spread its spend over
+    many names, so it only separates cooperating clients.
+
+    Returns:
+        dict: Keyword arguments for research_workflow (besides progress)
+
+    Raises:
+        HttpError: 400 with the first problem found
+    """
+    if not isinstance(payload, dict):
+        raise HttpError(400, "Body must be a JSON object")
+
+    query = payload.get('query')
+    if not isinstance(query, str) or not query.strip():
+        raise HttpError(400, "'query' must be a non-empty string")
+
+    params = {'query': query.strip()}
+    for name, (kind, default, lowest, highest) in JOB_OPTIONS.items():
+        value = payload.get(name, default)
+        if value is not None:
+            # json.loads accepts Infinity and NaN, which int() cannot convert
+            if (isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value)
+                    or value != kind(value)):
+                raise HttpError(400, f"'{name}' must be {'an integer' if kind is int else 'a number'}")
+            value = kind(value)
+            if value < lowest or (highest is not None and value > highest):
+                bounds = f"between {lowest} and {highest}" if highest is not None else f"at least {lowest}"
+                raise HttpError(400, f"'{name}' must be {bounds}")
+        params[name] = value
+
+    # Unset limits fall back to the same environment defaults as the CLI
+    if payload.get('token_budget') is None:
+        params['token_budget'] = budget_from_env('SCHOLARSYNC_RUN_TOKEN_BUDGET')
+    if payload.get('deadline') is None:
+        params['deadline'] = budget_from_env('SCHOLARSYNC_DEADLINE_SECONDS')
+
+    for name in ('instant', 'full_paper'):
+        value = payload.get(name, False)
+        if not isinstance(value, bool):
+            raise HttpError(400, f"'{name}' must be true or false")
+        params[name] = value
+
+    user = payload.get('user', 'api')
+    if not isinstance(user, str) or not user:
+        raise HttpError(400, "'user' must be a non-empty string")
+    params['user'] = user
+
+    return params
+
+
+class Job:
+    """One research job and its progress events; only touched on the event loop"""
+
+    def __init__(self, params):
+        self.id = uuid.uuid4().hex[:12]
+        self.params = params
+        self.status = 'queued'   # queued, running, done or failed
+        self.stage = None
+        self.events = []
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._changed = asyncio.Event()
+
+    @property
+    def finished(self):
+        return self.status in ('done', 'failed')
+
+    def publish(self, event, **data):
+        """Append a progress event and wake every stream waiting on this job"""
+        if event == 'stage':
+            self.stage = data['stage']
+        self.events.append({'event': event, 'at_seconds': round(time.time() - self.created_at, 3), **data})
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait(self, seen, timeout):
+        """
+        Wait until there are more than `seen` events or the job has finished
+
+        Returns:
+            bool: False if `timeout` seconds passed without news
+        """
+        if len(self.events) > seen or self.finished:
+            return True
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def describe(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'stage': self.stage,
+            'params': self.params,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'events': self.events,
+            'links': {
+                'status': f"/jobs/{self.id}",
+                'result': f"/jobs/{self.id}/result",
+                'events': f"/jobs/{self.id}/events"
+            }
+        }
+
+
+class ScholarSyncAPI:
+    """HTTP front end with a bounded job queue in front of the orchestrator"""
+
+    def __init__(self, orchestrator, workers=2, max_queued=32):
+        """
+        Args:
+            orchestrator (ScholarSyncOrchestrator): Runs the workflows; shared by every job
+            workers (int): Workflows run at once
+            max_queued (int): Jobs waiting for a worker before new ones are refused
+        """
+        self.orchestrator = orchestrator
+        self.workers = workers
+        self.max_queued = max_queued
+
+        self.jobs = OrderedDict()
+        self.metrics = {'accepted': 0, 'rejected': 0, 'done': 0, 'failed': 0}
+        self._queue = None
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='scholarsync-job')
+        self._tasks = []
+        self._server = None
+
+    async def start(self, host='127.0.0.1', port=8000):
+        """Start the workers and listen; returns the asyncio server"""
+        self._queue = asyncio.Queue(maxsize=self.max_queued)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._server = await asyncio.start_server(self._handle, host, port, backlog=1024)
+        return self._server
+
+    async def serve(self, host='127.0.0.1', port=8000):
+        """Serve until cancelled"""
+        server = await self.start(host, port)
+        address = server.sockets[0].getsockname()
+        print(f"🌐 ScholarSync API listening on http://{address[0]}:{address[1]} "
+              f"({self.workers} workers, up to {self.max_queued} queued jobs)")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.close()
+
+    async def close(self):
+        """Stop listening and stop the workers (running workflows finish in their threads)"""
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._pool.shutdown(wait=False)
+
+    # ---- Jobs ----
+
+    def submit(self, params):
+        """Queue a job; raises HttpError 503 when the queue is full"""
+        job = Job(params)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.metrics['rejected'] += 1
+            raise HttpError(503, "Too many queued jobs, try again later", {'Retry-After': '30'})
+
+        self.jobs[job.id] = job
+        self.metrics['accepted'] += 1
+        job.publish('queued', position=self._queue.qsize())
+        return job
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self._queue.get()
+            job.status = 'running'
+            job.started_at = time.time()
+            job.publish('started')
+
+            # Called from the workflow thread; events are published on the loop
+            def progress(stage, message, job=job):
+                loop.call_soon_threadsafe(lambda: job.publish('stage', stage=stage, message=message))
+
+            try:
+                job.result = await loop.run_in_executor(
+                    self._pool, lambda: self.orchestrator.research_workflow(progress=progress, **job.params)
+                )
+                job.status = 'done'
+                self.metrics['done'] += 1
+                # Let progress calls still queued on the loop land before the final event
+                await asyncio.sleep(0)
+                job.publish('done', papers_analyzed=len(job.result['detailed_analyses']) if job.result else 0)
+            except Exception as e:
+                job.status = 'failed'
+                job.error = str(e)
+                self.metrics['failed'] += 1
+                await asyncio.sleep(0)
+                job.publish('failed', error=job.error)
+            finally:
+                job.finished_at = time.time()
+                self._queue.task_done()
+                self._prune()
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job_id]
+
+    def _job(self, job_id):
+        job = self.jobs.get(job_id)
+        if not job:
+            raise HttpError(404, f"No job '{job_id}'")
+        return job
+
+    def health(self):
+        return {
+            'status': 'ok',
+            'workers': self.workers,
+            'running': sum(1 for job in self.jobs.values() if job.status == 'running'),
+            'queued': self._queue.qsize(),
+            'max_queued': self.max_queued,
+            'jobs': dict(self.metrics),
+            'gemini_limiter': gemini_limiter.stats(),
+            'service_health': breakers.stats()
+        }
+
+    # ---- HTTP ----
+
+    async def _handle(self, reader, writer):
+        """Answer one request, then close the connection"""
+        try:
+            try:
+                method, path, headers, body = await asyncio.wait_for(self._read_request(reader), REQUEST_TIMEOUT)
+                await self._route(method, path, headers, body, writer)
+            except HttpError as e:
+                await self._send_json(writer, e.status, {'error': e.message}, e.headers)
+            except asyncio.TimeoutError:
+                await self._send_json(writer, 408, {'error': "Request not received in time"})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _read_request(reader):
+        """Parse an HTTP/1.x request: (method, path, {lowercase header: value}, body bytes)"""
+        line = await reader.readline()
+        if not line:
+            raise asyncio.IncompleteReadError(b'', None)
+        try:
+            method, target, _ = line.decode('latin-1').rstrip('\r\n').split(' ', 2)
+        except ValueError:
+            raise HttpError(400, "Malformed request line")
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            if len(headers) >= MAX_HEADERS:
+                raise HttpError(431, "Too many headers")
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get('content-length') or 0)
+        except ValueError:
+            raise HttpError(400, "Invalid Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise HttpError(413, f"Body larger than {MAX_BODY_BYTES} bytes")
+        body = await reader.readexactly(length) if length else b''
+
+        return method.upper(), urlsplit(target).path.rstrip('/') or '/', headers, body
+
+    async def _route(self, method, path, headers, body, writer):
+        parts = path.strip('/').split('/')
+
+        if parts == ['health'] and method == 'GET':
+            return await self._send_json(writer, 200, self.health())
+
+        if parts == ['jobs'] and method == 'POST':
+            try:
+                payload = json.loads(body or b'null')
+            except ValueError:
+                raise HttpError(400, "Body is not valid JSON")
+            job = self.submit(parse_job(payload))
+            return await self._send_json(writer, 202, job.describe(), {'Location': f"/jobs/{job.id}"})
+
+        if parts == ['jobs'] and method == 'GET':
+            jobs = [{key: value for key, value in job.describe().items() if key != 'events'}
+                    for job in reversed(self.jobs.values())]
+            return await self._send_json(writer, 200, {'jobs': jobs[:100]})
+
+        if len(parts) == 2 and parts[0] == 'jobs' and method == 'GET':
+            return await self._send_json(writer, 200, self._job(parts[1]).describe())
+
+        if len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'result' and method == 'GET':
+            job = self._job(parts[1])
+            if job.status == 'failed':
+                raise HttpError(500, f"Job failed: {job.error}")
+            if not job.finished:
+                raise HttpError(409, f"Job is {job.status}", {'Retry-After': '5'})
+            return await self._send_json(writer, 200, {'id': job.id, 'results': job.result})
+
+        if len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'events' and method == 'GET':
+            return await self._stream_events(self._job(parts[1]), headers, writer)
+
+        known = parts in (['health'], ['jobs']) or (parts[0] == 'jobs' and len(parts) in (2, 3))
+        raise HttpError(405 if known else 404, f"{method} {path} is not supported")
+
+    async def _stream_events(self, job, headers, writer):
+        """Send the job's progress as Server-Sent Events until it has finished"""
+        try:
+            seen = max(0, int(headers.get('last-event-id', -1)) + 1)
+        except ValueError:
+            seen = 0
+
+        writer.write(self._head(200, {
+            'Content-Type': 'text/event-stream',
+            'Cache-Control': 'no-cache',
+            'Connection': 'close'
+        }))
+        while True:
+            for index, event in enumerate(job.events[seen:], seen):
+                data = json.dumps(event, default=str)
+                writer.write(f"id: {index}\nevent: {event['event']}\ndata: {data}\n\n".encode('utf-8'))
+            seen = len(job.events)
+            await writer.drain()
+            if job.finished and seen == len(job.events):
+                return
+            if not await job.wait(seen, KEEPALIVE_SECONDS):
+                writer.write(b": keep-alive\n\n")
+
+    @staticmethod
+    def _head(status, headers):
+        lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+    async def _send_json(self, writer, status, payload, headers=None):
+        body = json.dumps(payload, default=str).encode('utf-8')
+        writer.write(self._head(status, {
+            'Content-Type': 'application/json',
+            'Content-Length': len(body),
+            'Connection': 'close',
+            **(headers or {})
+        }) + body)
+        await writer.drain()
+
+
+def main():
+    """Start the API server with settings from the environment"""
+    load_dotenv()
+    api_key = os.getenv('GEMINI_API_KEY')
+    if not api_key:
+        print("❌ Error: GEMINI_API_KEY not found in .env file")
+        return
+
+    from main import ScholarSyncOrchestrator
+
+    orchestrator = ScholarSyncOrchestrator(
+        api_key, user_token_budget=budget_from_env('SCHOLARSYNC_USER_TOKEN_BUDGET')
+    )
+    api = ScholarSyncAPI(
+        orchestrator,
+        workers=budget_from_env('SCHOLARSYNC_API_WORKERS') or 2,
+        max_queued=budget_from_env('SCHOLARSYNC_API_QUEUE') or 32
+    )
+    try:
+        asyncio.run(api.serve(
+            os.getenv('SCHOLARSYNC_API_HOST', '127.0.0.1'),
+            budget_from_env('SCHOLARSYNC_API_PORT') or 8000
+        ))
+    except KeyboardInterrupt:
+        print("\n✅ API stopped. Goodbye!")
+
+
+if __name__ == "__main__":
+    main()
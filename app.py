@@ -1,11 +1,15 @@
 import streamlit as st
 import os
 from dotenv import load_dotenv
-from agents.literature_scout import LiteratureScoutAgent
-from agents.paper_analyzer import PaperAnalyzerAgent
-from agents.research_gap_analyzer import ResearchGapAnalyzerAgent
+from agents.report_renderer import FORMATS, build_results, render_report, safe_url
 import datetime
-from streamlit_autorefresh import st_autorefresh
+import hashlib
+import html
+import uuid
+from agents.circuit_breaker import breakers
+from agents.deadline import MAX_RESERVE_FRACTION, Deadline
+from agents.token_budget import TokenLedger, UserTokenBudgets, budget_from_env
+from ui_styles import page_css
 
 # Page config
 st.set_page_config(
@@ -15,433 +19,21 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
-# Minimal, smooth CSS
-st.markdown("""
-    <style>
-    /* Hide Streamlit branding */
-    /* Modal/Popup Styles */
-    
-    /* --- CUSTOM POPUP STYLES --- */
-    .custom-modal-overlay {
-        position: fixed;
-        top: 0;
-        left: 0;
-        width: 100%;
-        height: 100%;
-        background: rgba(0, 0, 0, 0.65); /* Darker overlay */
-        backdrop-filter: blur(10px); /* Stronger blur */
-        z-index: 9998;
-        display: flex;
-        justify-content: center;
-        align-items: center;
-        opacity: 0;
-        pointer-events: none;
-        transition: opacity 0.3s ease;
-    }
-    
-    .custom-modal-overlay.active {
-        opacity: 1;
-        pointer-events: all;
-    }
-    
-    .custom-modal-content {
-        background: white;
-        padding: 3rem 3rem 2rem; /* Adjusted padding for better fit */
-        border-radius: 16px;
-        max-width: 550px; /* Slimmer max-width for card look */
-        width: 90%;
-        box-shadow: 0 20px 60px rgba(0, 0, 0, 0.35); /* Deeper shadow */
-        max-height: 80vh;
-        overflow-y: auto;
-        position: relative;
-    }
-    
-    .custom-modal-content .stButton>button {
-        background: #1a1a1a;
-        color: white;
-        border-radius: 50px;
-        font-size: 1.1rem;
-        padding: 1rem 3rem;
-        font-weight: 600;
-        box-shadow: 0 8px 25px rgba(0,0,0,0.4); /* Darker shadow */
-        margin-top: 2rem; /* Spacing */
-    }
-    
-    .custom-modal-title {
-        font-size: 1.8rem;
-        font-weight: 700;
-        color: #1a1a1a;
-        margin-bottom: 2rem; /* Separated from content */
-        text-align: center;
-    }
-
-    .modal-step-container {
-        margin-bottom: 1rem;
-    }
-
-    .modal-step-number {
-        font-size: 1.25rem;
-        font-weight: 700;
-        color: #1a1a1a;
-        margin-right: 0.5rem;
-    }
-
-    .modal-step-text {
-        font-size: 1rem;
-        color: #1a1a1a; /* Darker main text */
-        font-weight: 600;
-        margin-bottom: 0.2rem;
-        line-height: 1.5;
-        display: inline-block;
-    }
-
-    .modal-step-example {
-        font-size: 0.9rem;
-        color: #666; /* Lighter example text */
-        margin-left: 2.5rem;
-        margin-top: 0.2rem;
-        margin-bottom: 1.5rem;
-        line-height: 1.5;
-        display: block;
-    }
-    
-    /* Ensure no residual Streamlit dialog styles interfere */
-    [data-testid="stDialog"] {
-        display: none !important;
-    }
-
-    /* --- END CUSTOM POPUP STYLES --- */
-    
-    #MainMenu, footer, header {visibility: hidden;}
-    .stDeployButton {display: none;}
-
-    /* Clean font */
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&display=swap');
-    * {
-        font-family: 'Inter', -apple-system, sans-serif;
-    }
-
-    /* 3D Cube Rotate Animation - ENHANCED */
-    @keyframes rotateCube {
-        0% {
-            opacity: 0;
-            transform: perspective(600px) rotateX(60deg);
-        }
-        50% {
-            opacity: 0.5;
-        }
-        100% {
-            opacity: 1;
-            transform: perspective(600px) rotateX(0deg);
-        }
-    }
-
-    .stTextInput>div>div>input {
-        perspective: 1000px;
-    }
-
-    .stTextInput>div>div>input::placeholder {
-        animation: rotateCube 0.8s ease-out;
-        transform-style: preserve-3d;
-        display: inline-block;
-    }
-
-    /* Smooth background */
-    .stApp {
-        background: #FFFFFF;
-    }
-
-    .block-container {
-        padding: 2rem 1rem;
-        max-width: 1100px;
-    }
-
-    /* Minimal hero */
-    .hero {
-        text-align: center;
-        padding: 3rem 1rem 2rem;
-        margin-bottom: 2rem;
-    }
-
-    .hero-title {
-        font-size: 2.75rem;
-        font-weight: 700;
-        color: #1a1a1a;
-        margin-bottom: 0.75rem;
-        letter-spacing: -0.02em;
-        text-shadow: 1px 1px 3px rgba(0, 0, 0, 0.10);
-    }
-
-    .hero-subtitle {
-        font-size: 1.1rem;
-        color: #666;
-        font-weight: 400;
-        max-width: 0 auto;
-        margin: 0 auto;
-        line-height: 1.6;
-        text-align: center;
-    }
-
-    /* Smooth feature cards */
-    .feature-card {
-        background: #FAFAFA;
-        padding: 1.75rem 1.5rem;
-        border-radius: 10px;
-        border: 1px solid #EAEAEA;
-        min-height: 200px;
-        transition: all 0.2s ease-out;
-        text-align: center;
-    }
-
-    .feature-card:hover {
-        background: #F0F0F0;
-        border-color: #D0D0D0;
-        box-shadow: 0 4px 12px rgba(0, 0, 0, 0.08);
-        transform: translateY(-3px);
-    }
-
-    .feature-emoji {
-        font-size: 2rem;
-        margin-bottom: 0.75rem;
-        opacity: 0.9;
-    }
-
-    .feature-title {
-        font-size: 1.1rem;
-        font-weight: 600;
-        color: #1a1a1a;
-        margin-bottom: 0.5rem;
-    }
-
-    .feature-desc {
-        font-size: 0.95rem;
-        color: #666;
-        line-height: 1.5;
-        text-align: center;
-    }
-
-    /* Smooth minimal button */
-    .stButton>button {
-        background: #1a1a1a;
-        color: white;
-        font-size: 1rem;
-        font-weight: 500;
-        padding: 0.75rem 2rem;
-        border-radius: 50px;
-        border: none;
-        transition: all 0.2s ease;
-        box-shadow: none;
-    }
-
-    .stButton>button:hover {
-        background: #333;
-        transform: translateY(-2px);
-        box-shadow: 0 4px 10px rgba(0, 0, 0, 0.25);
-    }
-
-    /* Clean form */
-    .form-title {
-        font-size: 1.75rem;
-        font-weight: 600;
-        color: #1a1a1a;
-        margin-bottom: 0.5rem;
-        text-align: center;
-    }
-
-    .form-subtitle {
-        font-size: 0.95rem;
-        color: #666;
-        margin-bottom: 2rem;
-        text-align: center;
-    }
-
-    .element-container:has(.stProgress) {
-        margin-bottom: 0px !important;
-        padding-top: 0px !important;
-        margin-top: 0px !important;
-    }
-
-    /* Smooth inputs */
-    .stTextInput>div>div>input {
-        background: #FAFAFA !important;
-        border: 1px solid #E0E0E0 !important;
-        border-radius: 6px !important;
-        padding: 0.75rem 1rem !important;
-        font-size: 0.95rem !important;
-        color: #1a1a1a !important;
-        transition: all 0.15s ease !important;
-        caret-color: #1a1a1a !important;
-    }
-
-    .stTextInput>div>div>input:focus {
-        border-color: #999 !important;
-        background: #FFF !important;
-    }
-
-    .stTextInput>div>div>input::placeholder {
-        color: #999 !important;
-    }
-
-    .stNumberInput>div>div>input {
-        background: #FAFAFA !important;
-        border: 1px solid #E0E0E0 !important;
-        border-radius: 6px !important;
-        padding: 0.75rem 1rem !important;
-        font-size: 0.95rem !important;
-        color: #1a1a1a !important;
-    }
-
-    label {
-        color: #666 !important;
-        font-size: 0.85rem !important;
-        font-weight: 500 !important;
-    }
-
-    /* Smooth progress */
-
-    .stProgress {
-        background: transparent !important;
-    }
-
-    .stProgress>div {
-        background: transparent !important;
-        height: 4px !important; 
-        border-radius: 2px !important;
-        border: none !important;
-    }
-
-    .stProgress>div>div {
-        background: #1a1a1a !important;
-        height: 4px !important;
-        border-radius: 2px !important;
-        transition: width 0.3s ease-out !important;
-    }
-
-    .stProgress [data-testid="stMarkdownContainer"] {
-        display: none !important;
-    }
-
-    /* Clean status */
-    .status-text {
-        text-align: center;
-        color: #666;
-        font-size: 1rem;
-        padding: 0.5rem;
-    }
-
-    /* Minimal expander */
-    .streamlit-expanderHeader {
-        background: #1a1a1a !important;
-        border: 1px solid #1a1a1a !important;
-        border-radius: 6px !important;
-        font-weight: 600 !important;
-        color: #FFFFFF !important;
-        padding: 0.75rem 1rem !important;
-    }
-
-    .streamlit-expanderHeader:hover {
-        background: #333 !important;
-        border-color: #333 !important;
-    }
-
-    .streamlit-expanderContent {
-        background: #FFF !important;
-        border: 1px solid #E0E0E0 !important;
-        border-top: none !important;
-        border-radius: 0 0 6px 6px !important;
-        padding: 1rem !important;
-    }
-
-    /* Smooth download */
-    .stDownloadButton>button {
-        background: #1a1a1a !important;
-        color: white !important;
-        font-size: 1rem !important;
-        font-weight: 500 !important;
-        padding: 0.75rem 0.75rem !important;
-        border-radius: 50px !important;
-        border: none !important;
-        transition: all 0.2s ease !important;
-        box-shadow: none !important;
-    }
-
-    .stDownloadButton>button:hover {
-        background: #333 !important;
-        transform: translateY(-2px) !important;
-        box-shadow: 0 4px 10px rgba(0, 0, 0, 0.25) !important;
-    }
-
-    /* Clean messages */
-    .element-container .stSuccess {
-        background: #F0F9F4 !important;
-        border: 1px solid #D1F2E0 !important;
-        color: #1a7a3e !important;
-        border-radius: 6px !important;
-    }
-
-    /* Paper items */
-    .paper-item {
-        padding: 1rem;
-        border-bottom: 1px solid #F0F0F0;
-    }
-
-    .paper-item:hover {
-        background: #FAFAFA;
-    }
-
-    .paper-number {
-        color: #1a1a1a;
-        font-weight: 600;
-        margin-right: 0.5rem;
-    }
-
-    .paper-title {
-        color: #1a1a1a;
-        font-weight: 500;
-        font-size: 1rem;
-    }
-
-    .paper-meta {
-        color: #666;
-        font-size: 0.875rem;
-    }
-
-    /* Section headers */
-    .section-label {
-        font-size: 0.85rem;
-        font-weight: 700;
-        color: #1a1a1a !important;
-        text-transform: uppercase;
-        letter-spacing: 0.05em;
-        margin: 1rem 0 0.5rem 0;
-        display: block !important;
-        background: #F5F5F5 !important;
-        padding: 0.5rem 0.75rem !important;
-        border-radius: 4px !important;
-    }
-
-    .section-text {
-        color: #333;
-        line-height: 1.6;
-        font-size: 0.95rem;
-    }
-
-    /* Links */
-    a {
-        color: #1a1a1a !important;
-        text-decoration: underline !important;
-    }
-
-    a:hover {
-        color: #666 !important;
-    }
-
-    /* Clean spacing */
-    h1, h2, h3 {
-        color: #1a1a1a !important;
-    }
-    </style>
-""", unsafe_allow_html=True)
+# Minimal, smooth CSS (built once per process in ui_styles)
+st.markdown(page_css(), unsafe_allow_html=True)
+
+
+def client_user_id():
+    """Stable anonymous ID for the browser's client address (a random one if it is unknown)"""
+    context = getattr(st, 'context', None)
+    headers = getattr(context, 'headers', None) or {}
+    # Behind a proxy the last X-Forwarded-For entry is the address the proxy saw;
+    # earlier entries are whatever the client sent
+    forwarded = [part.strip() for part in headers.get('X-Forwarded-For', '').split(',') if part.strip()]
+    address = forwarded[-1] if forwarded else getattr(context, 'ip_address', None)
+    if not address:
+        return uuid.uuid4().hex
+    return 'client-' + hashlib.sha256(address.encode('utf-8')).hexdigest()[:16]
 
 
 class ScholarSyncApp:
@@ -472,18 +64,49 @@ class ScholarSyncApp:
             st.session_state.topic_error = False
         # ----------------------------------------------------
 
-        self.scout, self.analyzer, self.gap_analyzer = self.init_agents()
+        # Anonymous user ID charged against the per-user token budget; it is
+        # derived from the client's address so reloading the page keeps it
+        if 'user_id' not in st.session_state:
+            st.session_state.user_id = client_user_id()
+
+    # Agents (and requests, numpy, PDF backends) load on first use, so the
+    # landing and tutorial pages paint without paying for them
+    @property
+    def scout(self):
+        return self.init_agents()[0]
+
+    @property
+    def analyzer(self):
+        return self.init_agents()[1]
+
+    @property
+    def gap_analyzer(self):
+        return self.init_agents()[2]
 
     @st.cache_resource
     def init_agents(_self):
-        # NOTE: These classes (LiteratureScoutAgent, PaperAnalyzerAgent, etc.) 
-        # are assumed to exist in the 'agents' directory as per the original code.
+        from agents.federated_search import sources_from_env
+        from agents.literature_scout import LiteratureScoutAgent
+        from agents.paper_analyzer import PaperAnalyzerAgent
+        from agents.research_gap_analyzer import ResearchGapAnalyzerAgent
+
         return (
-            LiteratureScoutAgent(_self.api_key),
+            LiteratureScoutAgent(_self.api_key, extra_sources=sources_from_env()),
             PaperAnalyzerAgent(_self.api_key),
             ResearchGapAnalyzerAgent(_self.api_key)
         )
 
+    @st.cache_resource
+    def init_history(_self):
+        # One history database shared by every session in this process
+        from agents.result_history import ResultHistory
+        return ResultHistory()
+
+    @st.cache_resource
+    def init_user_budgets(_self):
+        # One shared per-user token counter for every session in this process
+        return UserTokenBudgets(budget_from_env('SCHOLARSYNC_USER_TOKEN_BUDGET'))
+
     def home_page(self):
         """Minimal landing page"""
 
@@ -745,6 +368,7 @@ class ScholarSyncApp:
         st.markdown("<br>", unsafe_allow_html=True)
         st.markdown('<h2 class="form-title">Research Analysis</h2>', unsafe_allow_html=True)
         st.markdown('<p class="form-subtitle">Enter your research topic to begin</p>', unsafe_allow_html=True)
+        self.show_service_health()
 
         col1, col2, col3 = st.columns([0.5, 1, 0.5])
 
@@ -756,6 +380,7 @@ class ScholarSyncApp:
 
             # Only auto-refresh if user hasn't typed anything AND analysis not started
             if not user_typing and not analysis_done:
+                from streamlit_autorefresh import st_autorefresh
                 st_autorefresh(interval=2000, key="placeholder_refresh")
 
             # --- CONDITIONAL CSS INJECTION ---
@@ -808,6 +433,11 @@ class ScholarSyncApp:
             with c2:
                 num_analyze = st.number_input("Papers to Analyze", 1, 3, 2)
 
+            instant = st.checkbox("Instant summaries (offline, quoted sentences)",
+                                  help="Skip Gemini and summarize each paper locally in milliseconds")
+            full_paper = st.checkbox("Read whole papers",
+                                     help="Summarize every page in parallel chunks instead of the first pages")
+
             st.markdown("<br>", unsafe_allow_html=True)
 
             start = st.button("Run Analysis", use_container_width=True)
@@ -818,8 +448,9 @@ class ScholarSyncApp:
                 # Successful run - mark as started
                 st.session_state.topic_error = False
                 st.session_state.analysis_started = True
+                st.session_state.pop('replay_id', None)
                 st.markdown("<br>", unsafe_allow_html=True)
-                self.run_analysis(query, num_papers, num_analyze)
+                self.run_analysis(query, num_papers, num_analyze, instant, full_paper)
             else:
                 # Empty query, set error state and show warning
                 st.session_state.topic_error = True
@@ -827,7 +458,64 @@ class ScholarSyncApp:
                 st.rerun()
         # ------------------------
 
-    def run_analysis(self, query, max_papers, analyze_top):
+        if not start:
+            self.show_history()
+
+    def show_history(self):
+        """This user's past results: recent runs or full-text matches, reloaded without calling any agent"""
+        history = self.init_history()
+        user = st.session_state.user_id
+        if not history.count(user):
+            return
+
+        st.markdown("<br>", unsafe_allow_html=True)
+        with st.expander("🗂️ Past Results", expanded=False):
+            search = st.text_input("Search past summaries and gaps", key="history_search",
+                                   placeholder="e.g., sparse attention memory")
+            if search:
+                rows = [(hit['run_id'], hit['query'], hit['created_at'], f"{hit['title']}: {hit['snippet']}")
+                        for hit in history.search(search, limit=10, user=user)]
+                if not rows:
+                    st.caption("No past summary or gap analysis matches.")
+            else:
+                rows = [(run['id'], run['query'], run['created_at'],
+                         f"{run['papers_found']} papers found, {run['papers_analyzed']} analyzed")
+                        for run in history.recent(limit=10, user=user)]
+
+            for i, (run_id, query, created_at, detail) in enumerate(rows):
+                when = datetime.datetime.fromtimestamp(created_at).strftime('%Y-%m-%d %H:%M')
+                c1, c2 = st.columns([5, 1])
+                with c1:
+                    # Stored text came from users and papers: escape it before rendering as HTML
+                    st.markdown(f'<p class="section-text"><strong>{html.escape(query)}</strong> · {when}<br>'
+                                f'{html.escape(detail)}</p>', unsafe_allow_html=True)
+                with c2:
+                    if st.button("Open", key=f"history_open_{i}_{run_id}"):
+                        st.session_state.replay_id = run_id
+                        # Keep the replayed result on screen
+                        st.session_state.analysis_started = True
+
+        # Instant replay of a stored run
+        replay_id = st.session_state.get('replay_id')
+        results = history.get(replay_id, user=user) if replay_id else None
+        if results:
+            when = datetime.datetime.fromtimestamp(results['created_at']).strftime('%Y-%m-%d %H:%M')
+            st.markdown(f'<p class="section-text">🗂️ Stored result from {when} for '
+                        f'<strong>{html.escape(results["query"])}</strong></p>', unsafe_allow_html=True)
+            self.show_results(results['query'], results['ranked_papers'], results['detailed_analyses'],
+                              results['gap_analysis'], results.get('token_usage'), results.get('deadline'),
+                              results.get('result_id') or f"history-{results['history_id']}")
+
+    def show_service_health(self):
+        """Warn about dependencies whose circuit breaker is open or half-open"""
+        for name, stats in breakers.unhealthy().items():
+            label = 'arXiv' if name == 'arxiv' else name.replace('gemini:', 'Gemini model ').replace('pdf:', 'PDF host ')
+            if stats['state'] == 'open':
+                st.warning(f"⚡ {label} is failing, requests fail fast for ~{stats['retry_after']:.0f}s")
+            else:
+                st.info(f"⚡ {label} is recovering, trial requests are being let through")
+
+    def run_analysis(self, query, max_papers, analyze_top, instant=False, full_paper=False):
         """Run analysis"""
 
         # Stop auto-refresh during analysis
@@ -837,6 +525,22 @@ class ScholarSyncApp:
             progress = st.progress(0)
             status = st.empty()
 
+            # Token budget and per-stage usage for this run
+            ledger = TokenLedger(
+                budget_from_env('SCHOLARSYNC_RUN_TOKEN_BUDGET'),
+                st.session_state.user_id,
+                self.init_user_budgets(),
+                model=self.analyzer.model
+            )
+
+            # Interactive users wait about a minute; later stages are cut back to fit
+            from agents.paper_analyzer import ANALYSIS_STEPS
+            from agents.research_gap_analyzer import GAP_ANALYSIS_SECONDS
+            deadline = Deadline(budget_from_env('SCHOLARSYNC_DEADLINE_SECONDS') or 60)
+            gap_seconds = GAP_ANALYSIS_SECONDS if analyze_top >= 2 else 0
+            early_deadline = deadline.reserve(ANALYSIS_STEPS[-1][1] * analyze_top + gap_seconds,
+                                              max_fraction=MAX_RESERVE_FRACTION)
+
             # Helper function to update both the bar and the status text with the percentage
             def update_status(message, percent):
                 progress.progress(percent)
@@ -848,7 +552,7 @@ class ScholarSyncApp:
                 st.markdown('<p class="status-text">Searching papers...</p>', unsafe_allow_html=True)
             progress.progress(25)
 
-            papers = self.scout.search_papers(query, max_results=max_papers)
+            papers = self.scout.search_papers(query, max_results=max_papers, deadline=early_deadline)
 
             # DEBUG LINE
             #st.write(f"🔍 DEBUG: Found {len(papers) if papers else 0} papers")
@@ -862,7 +566,7 @@ class ScholarSyncApp:
                 st.markdown('<p class="status-text">Ranking...</p>', unsafe_allow_html=True)
             progress.progress(40)
 
-            ranked = self.scout.rank_papers_with_gemini(papers, query)
+            ranked = self.scout.rank_papers_with_gemini(papers, query, ledger=ledger, deadline=early_deadline)
 
             # Analyze
             with status:
@@ -871,7 +575,15 @@ class ScholarSyncApp:
 
             analyzed = []
             for i, p in enumerate(ranked[:analyze_top], 1):
-                analysis = self.analyzer.analyze_paper(p['url'], p['title'])
+                # Papers already summarized for anyone are loaded instantly by the analyzer
+                analysis = self.analyzer.analyze_paper(
+                    p['url'], p['title'], p.get('summary'), ledger, budget_share=analyze_top - i + 1,
+                    deadline=deadline.reserve(gap_seconds, MAX_RESERVE_FRACTION), instant=instant, full_paper=full_paper
+                )
+                if analysis and analysis.get('from_store'):
+                    with status:
+                        st.markdown(f'<p class="status-text">Loaded paper {i} from knowledge base...</p>',
+                                    unsafe_allow_html=True)
                 if analysis:
                     analyzed.append(analysis)
                 progress.progress(60 + (i * 15))
@@ -882,7 +594,7 @@ class ScholarSyncApp:
                 with status:
                     st.markdown('<p class="status-text">Finding gaps...</p>', unsafe_allow_html=True)
                 progress.progress(90)
-                gap = self.gap_analyzer.analyze_gaps(analyzed, query)
+                gap = self.gap_analyzer.analyze_gaps(analyzed, query, ledger, deadline)
 
             progress.progress(100)
             status.empty()
@@ -890,7 +602,14 @@ class ScholarSyncApp:
             # DEBUG: Check if we reach here
             # st.write("✅ Analysis complete, showing results...")
 
-            self.show_results(query, ranked, analyzed, gap)
+            usage, timing = ledger.breakdown(), deadline.summary()
+            results = build_results(query, ranked, analyzed, gap, len(papers), token_usage=usage, deadline=timing)
+            # History is a convenience; failing to save must not hide the results
+            try:
+                self.init_history().record(results, st.session_state.user_id)
+            except Exception as e:
+                st.warning(f"⚠️ Could not save this run to history: {e}")
+            self.show_results(query, ranked, analyzed, gap, usage, timing, results['result_id'])
 
             # Keep results visible, don't auto-refresh anymore
             st.session_state.running_analysis = True
@@ -900,20 +619,29 @@ class ScholarSyncApp:
             import traceback
             st.code(traceback.format_exc())
 
-    def show_results(self, query, ranked, analyzed, gap):
-        """Show results"""
+    def show_results(self, query, ranked, analyzed, gap, usage=None, deadline=None, result_id=None):
+        """Show results (result_id keys the rendered-report cache)"""
 
         st.markdown("<br>", unsafe_allow_html=True)
         # st.success("✓ Complete")
 
+        # Best-effort results: say what was cut back to finish in time
+        if deadline and deadline['degradations']:
+            notes = ''.join(f"<br>• {step['reason']}" for step in deadline['degradations'])
+            st.markdown(f'<p class="section-text">⏱️ Finished in {deadline["elapsed_seconds"]}s of '
+                        f'{deadline["seconds"]}s with shortcuts:{notes}</p>', unsafe_allow_html=True)
+
         # Papers
         with st.expander("📚 Ranked Papers", expanded=True):
             for i, p in enumerate(ranked, 1):
+                # Only http(s) links; federated sources could hand back javascript: URLs
+                url = safe_url(p['url'])
+                link = f' • <a href="{html.escape(url)}">PDF</a>' if url else ''
                 st.markdown(f"""
                     <div class="paper-item">
                         <span class="paper-number">{i}.</span>
                         <span class="paper-title">{p['title']}</span><br>
-                        <span class="paper-meta">{', '.join(p['authors'][:2])} • <a href="{p['url']}">PDF</a></span>
+                        <span class="paper-meta">{', '.join(p['authors'][:2])}{link}</span>
                     </div>
                 """, unsafe_allow_html=True)
 
@@ -929,6 +657,8 @@ class ScholarSyncApp:
                                        {i}. {a['title']}
                                    </div>
                                """, unsafe_allow_html=True)
+                if a.get('summary_source') == 'extractive':
+                    st.caption("⚡ Offline extractive summary (sentences quoted from the paper)")
 
                 st.markdown('<p class="section-label">Research Question</p>', unsafe_allow_html=True)
                 st.markdown(f'<p class="section-text">{s.get("research_question", "N/A")}</p>', unsafe_allow_html=True)
@@ -988,44 +718,37 @@ class ScholarSyncApp:
                 st.markdown(f'<p class="section-text">{gap.get("novel_contribution", "N/A").replace("**", "")}</p>',
                             unsafe_allow_html=True)
 
+        # Token usage
+        if usage and usage['stages']:
+            st.markdown("<br>", unsafe_allow_html=True)
+            with st.expander(f"🧮 Token Usage ({usage['total_tokens']:,} tokens, ~${usage['estimated_cost_usd']:.4f})"):
+                for stage, entry in usage['stages'].items():
+                    st.markdown(
+                        f'<p class="section-text"><strong>{stage}:</strong> {entry["total_tokens"]:,} tokens '
+                        f'in {entry["calls"]} call(s), prompt {entry["prompt_tokens"]:,} '
+                        f'(estimated {entry["estimated_prompt_tokens"]:,}) on {", ".join(entry["models"])}</p>',
+                        unsafe_allow_html=True)
+                for skip in usage['skipped']:
+                    st.markdown(f'<p class="section-text">💸 {skip["stage"]}: {skip["reason"]}</p>',
+                                unsafe_allow_html=True)
+
         # Download
         st.markdown("<br><br>", unsafe_allow_html=True)
         col1, col2, col3 = st.columns([1.25, 0.5, 1.25])
         with col2:
-            report = self.gen_report(query, ranked, analyzed, gap)
+            fmt = st.selectbox("Report format", list(FORMATS), label_visibility="collapsed")
+            extension, mime = FORMATS[fmt]
+            # Rendered once per result ID and format; reruns hit the cache
+            report = render_report(build_results(query, ranked, analyzed, gap, token_usage=usage, deadline=deadline,
+                                                 result_id=result_id), fmt)
             st.download_button(
                 "Download Report",
                 report,
-                f"report_{datetime.datetime.now().strftime('%Y%m%d')}.md",
-                "text/markdown",
+                f"report_{datetime.datetime.now().strftime('%Y%m%d')}.{extension}",
+                mime,
                 use_container_width=True
             )
 
-    def gen_report(self, query, ranked, analyzed, gap):
-        """Generate report"""
-        r = f"# {query}\n\n**Date:** {datetime.datetime.now().strftime('%Y-%m-%d')}\n\n## Papers\n\n"
-        for i, p in enumerate(ranked, 1):
-            r += f"{i}. {p['title']} - {', '.join(p['authors'][:2])}\n   {p['url']}\n\n"
-        r += "\n## Analysis\n\n"
-        for a in analyzed:
-            s = a['summary']
-            r += f"### {a['title']}\n\n"
-            r += f"**Question:** {s.get('research_question', 'N/A')}\n\n"
-            r += f"**Method:** {s.get('methodology', 'N/A')}\n\n"
-            r += f"**Findings:** {s.get('key_findings', 'N/A')}\n\n"
-            r += f"**Limits:** {s.get('limitations', 'N/A')}\n\n"
-            r += f"**Future:** {s.get('future_work', 'N/A')}\n\n"
-        if gap:
-            r += "\n## Gaps\n\n"
-            r += f"**Themes:** {gap.get('common_themes', 'N/A')}\n\n"
-            r += f"**Approaches:** {gap.get('divergent_approaches', 'N/A')}\n\n"
-            r += f"**Gaps:** {gap.get('research_gaps', 'N/A')}\n\n"
-            r += "**Directions:**\n"
-            for idx, d in enumerate(gap.get('proposed_directions', []), 1):
-                r += f"{idx}. {d.lstrip('0123456789.• ')}\n"
-            r += f"\n**Contribution:** {gap.get('novel_contribution', 'N/A')}\n"
-        return r
-
     def run(self):
         if st.session_state.page == 'home':
             self.home_page()
@@ -8,11 +8,15 @@ Concepts from 5-Day AI Agents Course:
 - Day 3: Session management
 """
 
+import copy
 import os
 from dotenv import load_dotenv
-from agents.literature_scout import LiteratureScoutAgent
-from agents.paper_analyzer import PaperAnalyzerAgent
-from agents.research_gap_analyzer import ResearchGapAnalyzerAgent
+
+from agents.circuit_breaker import breakers
+from agents.deadline import MAX_RESERVE_FRACTION, Deadline
+from agents.search_cache import normalize_query
+from agents.singleflight import SingleFlight
+from agents.token_budget import TokenLedger, UserTokenBudgets, budget_from_env
 
 
 class ScholarSyncOrchestrator:
@@ -22,18 +26,43 @@ class ScholarSyncOrchestrator:
     Sequential Multi-Agent System (Day 1 concept)
     """
 
-    def __init__(self, api_key):
-        """Initialize all agents"""
+    def __init__(self, api_key, user_token_budget=None):
+        """
+        Initialize all agents
+
+        Args:
+            api_key (str): Gemini API key
+            user_token_budget (int): Gemini tokens each user may spend per day
+                across all of their runs (None = unlimited)
+        """
+        # Imported here so the CLI banner and prompts appear before
+        # requests, numpy and the PDF backends are loaded
+        from agents.federated_search import sources_from_env
+        from agents.literature_scout import LiteratureScoutAgent
+        from agents.paper_analyzer import PaperAnalyzerAgent
+        from agents.research_gap_analyzer import ResearchGapAnalyzerAgent
+        from agents.result_history import ResultHistory
+
         self.api_key = api_key
 
         # Initialize agents
         print("🔧 Initializing agents...")
-        self.scout = LiteratureScoutAgent(api_key)
+        self.scout = LiteratureScoutAgent(api_key, extra_sources=sources_from_env())
         self.analyzer = PaperAnalyzerAgent(api_key)
         self.gap_analyzer = ResearchGapAnalyzerAgent(api_key)
+
+        # Every finished run is kept for replay and full-text search
+        self.history = ResultHistory()
         print("✅ All 3 agents initialized\n")
 
-    def research_workflow(self, query, max_papers=3, analyze_top=1):
+        # Identical workflows submitted at the same time run once
+        self._inflight = SingleFlight()
+
+        # Token spend per user, shared by every run of this orchestrator
+        self.user_budgets = UserTokenBudgets(user_token_budget)
+
+    def research_workflow(self, query, max_papers=3, analyze_top=1, token_budget=None, user=None, deadline=None,
+                          instant=False, full_paper=False, progress=None):
         """
         Complete research workflow
 
@@ -41,10 +70,56 @@ class ScholarSyncOrchestrator:
             query (str): Research query
             max_papers (int): Number of papers to find
             analyze_top (int): Number of top papers to analyze in detail
+            token_budget (int): Gemini tokens this run may spend (None = unlimited)
+            user (str): User whose daily token budget is charged
+            deadline (float): Seconds the whole run may take (None = unlimited);
+                as time runs short fewer pages are read, summaries fall back
+                to abstracts and gap analysis is skipped
+            instant (bool): Summarize papers offline (extractive) instead of with Gemini
+            full_paper (bool): Summarize every page of each paper, chunk by chunk
+            progress (callable): Called as progress(stage, message) as each step
+                starts ('search', 'rank', 'analyze', 'gaps'); a caller that joins
+                an identical in-flight run (same options, any user) gets no
+                progress calls and a copy of its results, and its user is
+                charged the tokens that run spent
 
         Returns:
-            dict: Complete research results
+            dict: Complete research results, including a per-stage 'token_usage'
+                and the 'deadline' degradations taken
         """
+        # Users asking the same question share one run; each follower pays what it cost
+        key = (normalize_query(query), max_papers, analyze_top, token_budget, deadline, instant, full_paper)
+        results, shared = self._inflight.do(
+            key, self._run_workflow, query, max_papers, analyze_top, token_budget, user, deadline, instant,
+            full_paper, progress
+        )
+        if shared:
+            print(f"🔗 Joined an in-flight workflow for: {query}")
+            # Followers get their own copy so one caller's edits don't leak into another's
+            results = copy.deepcopy(results)
+            if results:
+                usage = results.get('token_usage', {})
+                spent = usage.get('total_tokens', 0) + sum(usage.get('shared_tokens', {}).values())
+                self.user_budgets.charge(user, spent)
+        return results
+
+    def _run_workflow(self, query, max_papers, analyze_top, token_budget, user, deadline_seconds, instant=False,
+                      full_paper=False, progress=None):
+        """Run the four workflow steps once (see research_workflow)"""
+        report = progress or (lambda stage, message: None)
+        from agents.paper_analyzer import ANALYSIS_STEPS
+        from agents.research_gap_analyzer import GAP_ANALYSIS_SECONDS
+
+        ledger = TokenLedger(token_budget, user, self.user_budgets, model=self.analyzer.model)
+
+        # Search and ranking leave time for at least abstract-only summaries
+        # and the gap analysis (at most half the run, so a short deadline
+        # still finds papers); analysis leaves time for the gap analysis
+        deadline = Deadline(deadline_seconds)
+        gap_seconds = GAP_ANALYSIS_SECONDS if analyze_top >= 2 else 0
+        early_deadline = deadline.reserve(ANALYSIS_STEPS[-1][1] * analyze_top + gap_seconds,
+                                          max_fraction=MAX_RESERVE_FRACTION)
+
         print("=" * 70)
         print(f"🔬 STARTING RESEARCH WORKFLOW")
         print(f"Query: {query}")
@@ -52,7 +127,8 @@ class ScholarSyncOrchestrator:
 
         # STEP 1: Find papers (Agent 1)
         print("\n📍 STEP 1: Finding relevant papers...")
-        papers = self.scout.search_papers(query, max_results=max_papers)
+        report('search', "Finding relevant papers")
+        papers = self.scout.search_papers(query, max_results=max_papers, deadline=early_deadline)
 
         if not papers:
             print("❌ No papers found. Exiting.")
@@ -60,22 +136,29 @@ class ScholarSyncOrchestrator:
 
         # STEP 2: Rank papers (Agent 1)
         print("\n📍 STEP 2: Ranking papers by relevance...")
-        ranked_papers = self.scout.rank_papers_with_gemini(papers, query)
+        report('rank', f"Ranking {len(papers)} papers by relevance")
+        ranked_papers = self.scout.rank_papers_with_gemini(papers, query, ledger=ledger, deadline=early_deadline)
 
         # STEP 3: Analyze top papers (Agent 2)
         print(f"\n📍 STEP 3: Analyzing top {analyze_top} paper(s) in detail...")
 
         analyzed_papers = []
         for i, paper in enumerate(ranked_papers[:analyze_top], 1):
+            report('analyze', f"Paper {i}/{analyze_top}: {paper['title']}")
+            # The analyzer checks the shared knowledge base before downloading anything
             print(f"\n--- Analyzing Paper {i}/{analyze_top} ---")
-            analysis = self.analyzer.analyze_paper(paper['url'], paper['title'])
+            analysis = self.analyzer.analyze_paper(
+                paper['url'], paper['title'], paper.get('summary'), ledger, budget_share=analyze_top - i + 1,
+                deadline=deadline.reserve(gap_seconds, MAX_RESERVE_FRACTION), instant=instant, full_paper=full_paper
+            )
             if analysis:
                 analyzed_papers.append(analysis)
 
         # STEP 4: Analyze research gaps (Agent 3)
         if len(analyzed_papers) >= 2:
             print(f"\n📍 STEP 4: Identifying research gaps across papers...")
-            gap_analysis = self.gap_analyzer.analyze_gaps(analyzed_papers, query)
+            report('gaps', f"Identifying research gaps across {len(analyzed_papers)} papers")
+            gap_analysis = self.gap_analyzer.analyze_gaps(analyzed_papers, query, ledger, deadline)
         else:
             print(f"\n⚠️  STEP 4 SKIPPED: Need at least 2 analyzed papers for gap analysis")
             gap_analysis = None
@@ -86,8 +169,19 @@ class ScholarSyncOrchestrator:
             'total_papers_found': len(papers),
             'ranked_papers': ranked_papers,
             'detailed_analyses': analyzed_papers,
-            'gap_analysis': gap_analysis
+            'gap_analysis': gap_analysis,
+            'token_usage': ledger.breakdown(),
+            'service_health': breakers.stats(),
+            'model_health': self.analyzer.router.stats(),
+            'deadline': deadline.summary()
         }
+        # History is a convenience; a full disk or locked database must not lose the run
+        results['history_id'] = None
+        try:
+            results['history_id'] = self.history.record(results, user)
+            print(f"\n🗂️  Saved to history as run #{results['history_id']}")
+        except Exception as e:
+            print(f"\n⚠️  Could not save to history: {e}")
 
         return results
 
@@ -124,6 +218,8 @@ class ScholarSyncOrchestrator:
                 print(f"\n{'=' * 70}")
                 print(f"PAPER #{i}: {analysis['title']}")
                 print('=' * 70)
+                if analysis.get('summary_source') == 'extractive':
+                    print("⚡ Offline extractive summary (sentences quoted from the paper)")
 
                 summary = analysis['summary']
 
@@ -166,6 +262,52 @@ class ScholarSyncOrchestrator:
             print("\n🌟 Novel Contribution Opportunity:")
             print(f"  {gap.get('novel_contribution', 'N/A')}")
 
+        # Show token usage per stage
+        usage = results.get('token_usage')
+        if usage:
+            print("\n" + "-" * 70)
+            print("🧮 TOKEN USAGE:")
+            print("-" * 70)
+            for stage, entry in usage['stages'].items():
+                models = ', '.join(f"{model} x{calls}" for model, calls in entry['models'].items())
+                print(f"  {stage}: {entry['total_tokens']:,} tokens in {entry['calls']} call(s) on {models} "
+                      f"(prompt {entry['prompt_tokens']:,}, estimated {entry['estimated_prompt_tokens']:,})")
+            print(f"  Total: {usage['total_tokens']:,} tokens (~${usage['estimated_cost_usd']:.4f})")
+            for stage, tokens in usage.get('shared_tokens', {}).items():
+                print(f"  🔗 {stage}: {tokens:,} tokens charged for joined in-flight work")
+            for skip in usage['skipped']:
+                print(f"  💸 {skip['stage']}: {skip['reason']}")
+
+        # Show what was cut back to finish before the deadline
+        deadline = results.get('deadline')
+        if deadline and deadline['degradations']:
+            print("\n" + "-" * 70)
+            print(f"⏱️  TIME BUDGET: finished in {deadline['elapsed_seconds']}s of {deadline['seconds']}s")
+            print("-" * 70)
+            for step in deadline['degradations']:
+                print(f"  {step['stage']} ({step['step']}): {step['reason']}")
+
+        # Show dependencies that failed during the run
+        health = {name: stats for name, stats in results.get('service_health', {}).items()
+                  if stats['failures'] or stats['state'] != 'closed'}
+        if health:
+            print("\n" + "-" * 70)
+            print("🩺 SERVICE HEALTH:")
+            print("-" * 70)
+            for name, stats in health.items():
+                print(f"  {name}: {stats['state']}, {stats['failures']} failure(s), "
+                      f"{stats['rejected']} call(s) failed fast")
+
+        # Show models that were slow or failing (calls were routed around them)
+        degraded = {model: stats for model, stats in results.get('model_health', {}).items() if stats['degraded']}
+        if degraded:
+            print("\n" + "-" * 70)
+            print("🔀 DEGRADED MODELS:")
+            print("-" * 70)
+            for model, stats in degraded.items():
+                print(f"  {model}: {stats['error_rate']:.0%} errors, avg latency {stats['avg_latency_s']}s, "
+                      f"{stats['state']}")
+
         print("\n" + "=" * 70)
         print("✅ END OF REPORT")
         print("=" * 70)
@@ -190,8 +332,10 @@ def main():
         print("Searches, ranks, and analyzes academic papers in minutes.")
         print("\n💡 Tip: Press Ctrl+C at any time to exit safely\n")
 
-        # Create orchestrator
-        orchestrator = ScholarSyncOrchestrator(API_KEY)
+        # Create orchestrator (token budgets are optional; unset means unlimited)
+        orchestrator = ScholarSyncOrchestrator(
+            API_KEY, user_token_budget=budget_from_env('SCHOLARSYNC_USER_TOKEN_BUDGET')
+        )
 
         # Interactive mode
         print("-" * 70)
@@ -209,6 +353,11 @@ def main():
             num_papers = 5
             num_analyze = 2
 
+        instant = input("⚡ Instant offline summaries instead of Gemini? (y/n, default=n): ").strip().lower() == 'y'
+        full_paper = not instant and input(
+            "📖 Read whole papers instead of the first pages? (y/n, default=n): "
+        ).strip().lower() == 'y'
+
         print("\n⏳ Starting research workflow...")
         print("(This may take 2-4 minutes depending on number of papers)\n")
 
@@ -216,7 +365,12 @@ def main():
         results = orchestrator.research_workflow(
             query=research_query,
             max_papers=num_papers,
-            analyze_top=num_analyze
+            analyze_top=num_analyze,
+            token_budget=budget_from_env('SCHOLARSYNC_RUN_TOKEN_BUDGET'),
+            user=os.getenv('USER', 'cli'),
+            deadline=budget_from_env('SCHOLARSYNC_DEADLINE_SECONDS'),
+            instant=instant,
+            full_paper=full_paper
         )
 
         if not results:
@@ -230,7 +384,11 @@ def main():
         print("\n" + "-" * 70)
         save = input("💾 Save results to file? (y/n, default=n): ").strip().lower()
         if save == 'y':
-            save_results_to_file(results)
+            fmt = input("📄 Format (markdown/json/html/csv, default=markdown): ").strip().lower() or 'markdown'
+            if fmt not in ('markdown', 'json', 'html', 'csv'):
+                print(f"⚠️  Unknown format '{fmt}', using markdown")
+                fmt = 'markdown'
+            save_results_to_file(results, fmt)
             print("\n✅ Session complete! Exiting.")
         else:
             print("\n✅ Session complete! Results not saved. Exiting.")
@@ -246,9 +404,10 @@ def main():
         return
 
 
-def save_results_to_file(results):
-    """Save results to a markdown file"""
+def save_results_to_file(results, fmt='markdown'):
+    """Save results to a report file (markdown, json, html or csv)"""
     import datetime
+    from agents.report_renderer import FORMATS, write_report
 
     if not results:
         return
@@ -256,46 +415,10 @@ def save_results_to_file(results):
     try:
         # Create filename
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"research_report_{timestamp}.md"
-
-        # Write to file
-        with open(filename, 'w', encoding='utf-8') as f:
-            f.write(f"# Research Report: {results['query']}\n\n")
-            f.write(f"**Generated:** {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-            f.write(f"**Papers Found:** {results['total_papers_found']}\n")
-            f.write(f"**Papers Analyzed:** {len(results['detailed_analyses'])}\n\n")
-
-            f.write("---\n\n")
-            f.write("## Ranked Papers\n\n")
-            for i, paper in enumerate(results['ranked_papers'], 1):
-                f.write(f"### {i}. {paper['title']}\n")
-                f.write(f"- **Authors:** {', '.join(paper['authors'])}\n")
-                f.write(f"- **Published:** {paper['published']}\n")
-                f.write(f"- **URL:** {paper['url']}\n\n")
-
-            f.write("---\n\n")
-            f.write("## Detailed Analysis\n\n")
-            for i, analysis in enumerate(results['detailed_analyses'], 1):
-                f.write(f"### Paper {i}: {analysis['title']}\n\n")
-                summary = analysis['summary']
-                f.write(f"**Research Question:**\n{summary.get('research_question', 'N/A')}\n\n")
-                f.write(f"**Methodology:**\n{summary.get('methodology', 'N/A')}\n\n")
-                f.write(f"**Key Findings:**\n{summary.get('key_findings', 'N/A')}\n\n")
-                f.write(f"**Limitations:**\n{summary.get('limitations', 'N/A')}\n\n")
-                f.write(f"**Future Work:**\n{summary.get('future_work', 'N/A')}\n\n")
-                f.write("---\n\n")
-
-            # Add gap analysis to file
-            if results.get('gap_analysis'):
-                f.write("## Research Gap Analysis\n\n")
-                gap = results['gap_analysis']
-                f.write(f"**Common Themes:**\n{gap.get('common_themes', 'N/A')}\n\n")
-                f.write(f"**Divergent Approaches:**\n{gap.get('divergent_approaches', 'N/A')}\n\n")
-                f.write(f"**Research Gaps:**\n{gap.get('research_gaps', 'N/A')}\n\n")
-                f.write(f"**Proposed Research Directions:**\n")
-                for direction in gap.get('proposed_directions', []):
-                    f.write(f"- {direction}\n")
-                f.write(f"\n**Novel Contribution:**\n{gap.get('novel_contribution', 'N/A')}\n\n")
+        filename = f"research_report_{timestamp}.{FORMATS[fmt][0]}"
+
+        # Stream the report to disk section by section
+        write_report(results, fmt, filename)
 
         print(f"✅ Results saved to: {filename}")
 
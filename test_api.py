@@ -0,0 +1,120 @@
+"""
+Offline test for the HTTP API
+Runs api.py against a scripted orchestrator, no network or API key
+
+Checks request validation, that jobs run on the bounded worker pool and
+a full queue is refused, that progress streams as Server-Sent Events in
+order, and that many concurrent clients are answered while jobs run.
+"""
+
+import asyncio
+import json
+import time
+
+from api import ScholarSyncAPI
+
+
+class ScriptedOrchestrator:
+    """Stands in for ScholarSyncOrchestrator: reports each stage and sleeps"""
+
+    def __init__(self, seconds=0.2):
+        self.seconds = seconds
+
+    def research_workflow(self, query, progress=None, **options):
+        for stage in ('search', 'rank', 'analyze', 'gaps'):
+            progress(stage, f"{stage} for {query}")
+            time.sleep(self.seconds / 4)
+        if query == 'fail':
+            raise RuntimeError("scripted failure")
+        return {'query': query, 'ranked_papers': [], 'detailed_analyses': [{'title': 'A'}], 'gap_analysis': None}
+
+
+async def request(port, method, path, payload=None, headers=None):
+    """One HTTP request; returns (status, headers, body text)"""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    body = json.dumps(payload).encode() if payload is not None else b''
+    head = [f"{method} {path} HTTP/1.1", "Host: test", f"Content-Length: {len(body)}"]
+    head += [f"{name}: {value}" for name, value in (headers or {}).items()]
+    writer.write(('\r\n'.join(head) + '\r\n\r\n').encode() + body)
+    await writer.drain()
+
+    response = (await reader.read()).decode()
+    writer.close()
+    head, _, text = response.partition('\r\n\r\n')
+    lines = head.split('\r\n')
+    fields = dict(line.split(': ', 1) for line in lines[1:])
+    return int(lines[0].split()[1]), fields, text
+
+
+async def run():
+    api = ScholarSyncAPI(ScriptedOrchestrator(), workers=2, max_queued=4)
+    server = await api.start('127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+
+    # 1. Invalid jobs are refused with a reason
+    for payload in ({}, {'query': ' '}, {'query': 'x', 'max_papers': 50}, {'query': 'x', 'instant': 'yes'},
+                    {'query': 'x', 'token_budget': float('inf')}, {'query': 'x', 'deadline': float('nan')}):
+        status, _, text = await request(port, 'POST', '/jobs', payload)
+        assert status == 400, (payload, status, text)
+    assert (await request(port, 'GET', '/nope'))[0] == 404
+    print("✅ Invalid requests rejected")
+
+    # 2. Eight jobs on two workers: two run, four queue, the rest are refused
+    start = time.perf_counter()
+    answers = [await request(port, 'POST', '/jobs', {'query': f"q{i}"}) for i in range(8)]
+    statuses = [status for status, _, _ in answers]
+    accepted = [json.loads(text)['id'] for status, _, text in answers if status == 202]
+    assert statuses.count(503) >= 1 and 4 <= len(accepted) <= 6, statuses
+    assert answers[statuses.index(503)][1]['Retry-After'] == '30'
+
+    status, _, text = await request(port, 'GET', f"/jobs/{accepted[-1]}/result")
+    assert status == 409, (status, text)
+
+    # 3. Progress streams in order and ends with 'done'
+    status, fields, text = await request(port, 'GET', f"/jobs/{accepted[-1]}/events")
+    assert status == 200 and fields['Content-Type'] == 'text/event-stream'
+    events = [line[len('event: '):] for line in text.splitlines() if line.startswith('event: ')]
+    assert events == ['queued', 'started', 'stage', 'stage', 'stage', 'stage', 'done'], events
+    elapsed = time.perf_counter() - start
+    print(f"✅ {len(accepted)} jobs on 2 workers in {elapsed:.2f}s, streamed {events}")
+
+    # Resuming after the last seen event only sends what came after it
+    _, _, text = await request(port, 'GET', f"/jobs/{accepted[-1]}/events", headers={'Last-Event-ID': '5'})
+    assert text.count('event: ') == 1 and 'event: done' in text, text
+
+    # A negative Last-Event-ID replays everything instead of slicing from the end
+    _, _, text = await request(port, 'GET', f"/jobs/{accepted[-1]}/events", headers={'Last-Event-ID': '-3'})
+    assert text.count('event: ') == 7, text
+
+    status, _, text = await request(port, 'GET', f"/jobs/{accepted[0]}/result")
+    assert status == 200 and json.loads(text)['results']['query'] == 'q0'
+
+    # 4. A failing workflow is reported, not lost
+    _, _, text = await request(port, 'POST', '/jobs', {'query': 'fail'})
+    failed = json.loads(text)['id']
+    _, _, text = await request(port, 'GET', f"/jobs/{failed}/events")
+    assert 'event: failed' in text and 'scripted failure' in text, text
+    assert (await request(port, 'GET', f"/jobs/{failed}/result"))[0] == 500
+    print("✅ Failed job reported with its error")
+
+    # 5. Many clients at once while a job is running
+    await request(port, 'POST', '/jobs', {'query': 'busy'})
+    start = time.perf_counter()
+    answers = await asyncio.gather(*(request(port, 'GET', '/health') for _ in range(300)))
+    assert all(status == 200 for status, _, _ in answers)
+    health = json.loads(answers[0][2])
+    print(f"✅ 300 concurrent clients answered in {time.perf_counter() - start:.2f}s "
+          f"(jobs: {health['jobs']})")
+
+    await api.close()
+
+
+def main():
+    """Run the API test"""
+    print("🚀 Testing the HTTP API offline...\n")
+    asyncio.run(run())
+    print("\n✅ API test passed!")
+
+
+if __name__ == "__main__":
+    main()
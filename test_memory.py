@@ -0,0 +1,124 @@
+"""
+Memory test for PDF handling in the Paper Analyzer Agent
+Checks that peak Python heap per concurrent analysis stays bounded
+
+Builds synthetic PDFs locally (no network, no API key) that are much
+larger than the spool threshold, pushes them through the same
+download -> spool -> extract path used by analyze_paper, and measures
+the peak with tracemalloc.
+"""
+
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from agents.paper_analyzer import PaperAnalyzerAgent
+
+
+PDF_SIZE = 16 * 1024 * 1024       # size of each synthetic PDF (bytes)
+SPOOL_THRESHOLD = 1024 * 1024
+CONCURRENT_ANALYSES = 4
+PEAK_BUDGET_PER_ANALYSIS = 2 * SPOOL_THRESHOLD
+
+
+def build_pdf(num_pages=6, padding_bytes=PDF_SIZE):
+    """Build a minimal valid PDF with text pages and one large unused stream"""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in below
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+
+    page_ids = []
+    for i in range(num_pages):
+        content = f"BT /F1 12 Tf 72 720 Td (Synthetic page {i + 1} about transformers) Tj ET".encode()
+        objects.append(b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+
+    kids = b" ".join(b"%d 0 R" % pid for pid in page_ids)
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, num_pages)
+
+    # Unreferenced padding so the file is large, like a figure-heavy paper
+    objects.append(b"<< /Length %d >>\nstream\n" % padding_bytes + b"0" * padding_bytes + b"\nendstream")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+
+    xref_offset = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset)
+    return bytes(out)
+
+
+class FakeResponse:
+    """Streams a PDF from a file on disk, like requests with stream=True"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def iter_content(self, chunk_size=1):
+        with open(self.path, 'rb') as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+
+def run_one(agent, path):
+    """Spool and extract one PDF, returning the number of characters extracted"""
+    pdf_file = agent._spool_response(FakeResponse(path))
+    try:
+        return len(agent.extract_text_from_pdf(pdf_file))
+    finally:
+        pdf_file.close()
+
+
+def main():
+    """Run the tracemalloc memory test"""
+    import os
+    import tempfile
+
+    print("🚀 Testing memory-bounded PDF handling...\n")
+
+    agent = PaperAnalyzerAgent(api_key=None, spool_threshold=SPOOL_THRESHOLD, text_cache=False,
+                               vector_store=False, analysis_store=False)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'synthetic.pdf')
+        with open(path, 'wb') as f:
+            f.write(build_pdf())
+        print(f"📄 Synthetic PDF: {os.path.getsize(path) / 1024 / 1024:.1f} MB")
+
+        tracemalloc.start()
+        with ThreadPoolExecutor(max_workers=CONCURRENT_ANALYSES) as pool:
+            lengths = list(pool.map(lambda _: run_one(agent, path), range(CONCURRENT_ANALYSES)))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    per_analysis = peak / CONCURRENT_ANALYSES
+
+    print(f"\n📊 Concurrent analyses: {CONCURRENT_ANALYSES}")
+    print(f"📊 Characters extracted: {lengths}")
+    print(f"📊 Peak traced memory: {peak / 1024:.0f} KB total, {per_analysis / 1024:.0f} KB per analysis")
+
+    assert all(length > 0 for length in lengths), "Text extraction failed"
+    assert per_analysis < PEAK_BUDGET_PER_ANALYSIS, (
+        f"Peak memory per analysis {per_analysis / 1024:.0f} KB exceeds "
+        f"{PEAK_BUDGET_PER_ANALYSIS / 1024:.0f} KB budget"
+    )
+
+    print("\n✅ Memory test passed!")
+
+
+if __name__ == "__main__":
+    main()
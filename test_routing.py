@@ -0,0 +1,109 @@
+"""
+Offline test for per-stage model routing and failover
+Runs the agents' Gemini calls against StubGemini, no network or API key
+
+Checks that each stage starts on its configured model, that an outage
+on one model fails over to the alternate (and its breaker then routes
+around it), that a slow model is moved behind a faster one, and that
+demoted models are probed and win their place back once they recover.
+"""
+
+import time
+
+from agents import gemini
+from agents.circuit_breaker import breakers
+from agents.gemini_stub import StubGemini
+from agents.model_router import ModelRouter
+from agents.paper_analyzer import SUMMARY_SCHEMA
+from agents.token_budget import TokenLedger
+
+
+ROUTES = {
+    'ranking': ['gemini-2.0-flash-lite', 'gemini-2.0-flash'],
+    'summary': ['gemini-2.0-flash', 'gemini-2.0-flash-lite'],
+}
+
+
+def call(router, stage, ledger=None):
+    """One routed call for a stage, like the agents make"""
+    if stage == 'ranking':
+        prompt = "Papers to rank:\nPaper 1:\nTitle: A\nPaper 2:\nTitle: B\n"
+        return gemini.generate_content('offline', None, prompt, timeout=5, stage=stage, ledger=ledger, router=router)
+    data, missing = gemini.generate_json(
+        'offline', None, "Summarize the paper.", SUMMARY_SCHEMA, timeout=5, stage=stage, ledger=ledger, router=router
+    )
+    assert not missing, missing
+    return data
+
+
+def main():
+    """Run the routing test"""
+    print("🚀 Testing model routing offline...\n")
+
+    # 1. Each stage starts on its preferred model
+    stub = StubGemini()
+    gemini.set_transport(stub)
+    router = ModelRouter(ROUTES)
+    ledger = TokenLedger()
+    assert call(router, 'ranking', ledger) == '1,2'
+    call(router, 'summary', ledger)
+    assert stub.calls == ['gemini-2.0-flash-lite', 'gemini-2.0-flash'], stub.calls
+    usage = ledger.breakdown()
+    assert usage['stages']['ranking']['models'] == {'gemini-2.0-flash-lite': 1}
+    print(f"✅ Routed ranking and summary to {stub.calls} (~${usage['estimated_cost_usd']:.6f})")
+
+    # 2. An outage on the summary model fails over, then the breaker routes around it
+    stub = StubGemini(failures={'gemini-2.0-flash': 503})
+    gemini.set_transport(stub)
+    for _ in range(5):
+        data = call(router, 'summary')
+        assert data['methodology'].endswith('(gemini-2.0-flash-lite)'), data
+    assert router.degraded('gemini-2.0-flash')
+    assert router.candidates('summary')[0] == 'gemini-2.0-flash-lite'
+    # Its breaker opens at 4 calls in the window (1 ok from step 1 + 3 failures)
+    assert stub.calls.count('gemini-2.0-flash') == 3, stub.calls
+    print(f"✅ Failed over to gemini-2.0-flash-lite; calls: {stub.calls}")
+
+    # 3. A slow model moves behind a fast one
+    router = ModelRouter({'ranking': ['slow-model', 'fast-model']}, slow_seconds=0.05)
+    stub = StubGemini(latency={'slow-model': 0.1})
+    gemini.set_transport(stub)
+    call(router, 'ranking')
+    call(router, 'ranking')
+    assert stub.calls == ['slow-model', 'fast-model'], stub.calls
+    print(f"✅ Latency-aware routing: {router.stats()['slow-model']['avg_latency_s']}s model demoted")
+
+    # 4. Once it is fast again, a probe after the cooldown puts it back in front
+    router.probe_seconds = 0.2
+    stub.latency = {}
+    call(router, 'ranking')
+    assert stub.calls[-1] == 'fast-model', stub.calls
+    time.sleep(0.2)
+    call(router, 'ranking')
+    call(router, 'ranking')
+    assert stub.calls[-2:] == ['slow-model', 'slow-model'], stub.calls
+    assert not router.degraded('slow-model') and router.stats()['slow-model']['probes'] == 1
+    print(f"✅ Recovered model probed and restored: calls {stub.calls}")
+
+    # 5. A model whose breaker opened is probed when it goes half-open, and closes it
+    router = ModelRouter({'ranking': ['flaky-model', 'fast-model']}, probe_seconds=0)
+    breakers.get('gemini:flaky-model').open_seconds = 0.2
+    stub = StubGemini(failures={'flaky-model': 503})
+    gemini.set_transport(stub)
+    for _ in range(4):
+        call(router, 'ranking')
+    assert breakers.get('gemini:flaky-model').state() == 'open'
+    call(router, 'ranking')
+    assert stub.calls[-1] == 'fast-model', stub.calls
+    stub.failures = {}
+    time.sleep(0.2)
+    call(router, 'ranking')
+    assert stub.calls[-1] == 'flaky-model' and not router.degraded('flaky-model'), stub.calls
+    print(f"✅ Half-open breaker probed and closed: calls {stub.calls}")
+
+    gemini.set_transport(None)
+    print("\n✅ Routing test passed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Offline test for search query normalization
+Checks which queries share a search cache entry, no network
+
+Plain keyword queries that differ only in word order, case, punctuation
+or stopwords share a key. Field-prefixed and boolean arXiv queries keep
+their token order, so queries that select different papers never do.
+"""
+
+from agents.search_cache import SearchResultCache, normalize_query
+
+
+SAME = [
+    ("Transformer models in NLP", "transformer  models NLP"),
+    ("NLP transformer models", "transformer models, NLP"),
+    ("ti:Graph  AND abs:attention", "ti:graph AND abs:attention"),
+]
+
+DIFFERENT = [
+    ("cat:cs.AI AND NOT cat:cs.LG", "cat:cs.LG AND NOT cat:cs.AI"),
+    ("ti:graph AND abs:attention", "ti:attention AND abs:graph"),
+    ("au:hinton ANDNOT ti:boltzmann", "au:boltzmann ANDNOT ti:hinton"),
+    ("ti:graph AND abs:attention", "ti:graph OR abs:attention"),
+]
+
+
+def main():
+    """Run the normalization test"""
+    print("🚀 Testing search query normalization...\n")
+
+    for a, b in SAME:
+        assert normalize_query(a) == normalize_query(b), (a, b, normalize_query(a), normalize_query(b))
+        print(f"✅ Same key: '{a}' / '{b}'")
+
+    for a, b in DIFFERENT:
+        assert normalize_query(a) != normalize_query(b), (a, b, normalize_query(a))
+        assert SearchResultCache.make_key(a, 5, 'relevance') != SearchResultCache.make_key(b, 5, 'relevance')
+        print(f"✅ Different keys: '{a}' / '{b}'")
+
+    print("\n✅ Search normalization test passed!")
+
+
+if __name__ == "__main__":
+    main()
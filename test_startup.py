@@ -0,0 +1,89 @@
+"""
+Cold-start test for the CLI and the Streamlit app
+Guards import time and first paint against regressions
+
+Each measurement runs in a fresh interpreter so nothing is already in
+sys.modules. main.py and the app's landing page must come up without
+loading the heavy dependencies (requests, numpy, arxiv, PyPDF2); those
+are only paid for when the agents are first used.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+
+HEAVY_MODULES = ['requests', 'numpy', 'arxiv', 'PyPDF2']
+IMPORT_BUDGET_MS = 100        # import main (CLI); eager agent imports take ~250
+FIRST_PAINT_BUDGET_MS = 4000  # app.py landing page via streamlit's AppTest
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def measure(code):
+    """Run code in a fresh interpreter; it must print one JSON object"""
+    result = subprocess.run(
+        [sys.executable, '-c', code],
+        cwd=ROOT, capture_output=True, text=True,
+        env={**os.environ, 'GEMINI_API_KEY': os.getenv('GEMINI_API_KEY', 'startup-test')}
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip())
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def probe(statement):
+    """Code that times `statement` and reports which heavy modules it loaded"""
+    return (
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        f"{statement}\n"
+        "elapsed = (time.perf_counter() - start) * 1000\n"
+        f"heavy = [m for m in {HEAVY_MODULES!r} if m in sys.modules]\n"
+        "print(json.dumps({'ms': elapsed, 'heavy': heavy}))"
+    )
+
+
+def main():
+    """Run the cold-start test"""
+    print("🚀 Testing cold-start time...\n")
+
+    # Best of three, to keep disk-cache noise out of the budget check
+    cli = min((measure(probe('import main')) for _ in range(3)), key=lambda r: r['ms'])
+    print(f"📊 import main: {cli['ms']:.0f} ms (heavy modules loaded: {cli['heavy'] or 'none'})")
+
+    agents = measure(probe(
+        'import agents.literature_scout, agents.paper_analyzer, agents.research_gap_analyzer'
+    ))
+    print(f"📊 Deferred agent imports: {agents['ms']:.0f} ms (paid on first use)")
+
+    css = measure(probe('from ui_styles import page_css; page_css(); page_css()'))
+    print(f"📊 Stylesheet build: {css['ms']:.1f} ms (once per process)")
+
+    assert not cli['heavy'], f"import main loaded {cli['heavy']}"
+    assert cli['ms'] < IMPORT_BUDGET_MS, (
+        f"import main took {cli['ms']:.0f} ms, budget is {IMPORT_BUDGET_MS} ms"
+    )
+
+    try:
+        import streamlit  # noqa: F401
+    except ImportError:
+        print("⚠️  streamlit not installed, skipping first-paint check")
+    else:
+        paint = measure(probe(
+            "from streamlit.testing.v1 import AppTest\n"
+            "AppTest.from_file('app.py', default_timeout=30).run()"
+        ))
+        print(f"📊 First paint (landing page): {paint['ms']:.0f} ms "
+              f"(heavy modules loaded: {paint['heavy'] or 'none'})")
+
+        assert not set(paint['heavy']) & {'arxiv', 'PyPDF2'}, f"Landing page loaded {paint['heavy']}"
+        assert paint['ms'] < FIRST_PAINT_BUDGET_MS, (
+            f"First paint took {paint['ms']:.0f} ms, budget is {FIRST_PAINT_BUDGET_MS} ms"
+        )
+
+    print("\n✅ Cold-start test passed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Streaming test for the paged arXiv search
+Feeds stream_arxiv synthetic Atom pages, no network
+
+Checks that iter_atom_entries yields the first paper after reading only
+the start of a large feed, that its memory stays flat as the feed grows,
+and that stream_arxiv pages through results, hands out the first page
+before later pages are requested and skips version duplicates.
+"""
+
+import io
+import tracemalloc
+
+from agents import literature_scout
+from agents.literature_scout import LiteratureScoutAgent, iter_atom_entries
+
+
+ENTRY = """<entry>
+<id>http://arxiv.org/abs/{id}v{version}</id>
+<published>2024-01-01T00:00:00Z</published>
+<title>Synthetic paper {id}</title>
+<summary>{summary}</summary>
+<author><name>Author {id}</name></author>
+<link title="pdf" href="http://arxiv.org/pdf/{id}v{version}"/>
+</entry>
+"""
+
+
+def atom_feed(ids, version=1):
+    """Atom XML for papers with the given IDs"""
+    entries = ''.join(ENTRY.format(id=f'2401.{i:05d}', version=version, summary='word ' * 200) for i in ids)
+    return f'<feed xmlns="http://www.w3.org/2005/Atom">{entries}</feed>'.encode()
+
+
+class CountingStream(io.BytesIO):
+    """BytesIO that remembers how many bytes have been read"""
+
+    bytes_read = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+def peak_memory(entries):
+    """Peak traced memory while streaming a feed of `entries` papers"""
+    stream = io.BytesIO(atom_feed(range(entries)))
+    tracemalloc.start()
+    count = sum(1 for _ in iter_atom_entries(stream))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert count == entries
+    return peak
+
+
+class FakeResponse:
+    """The parts of a streamed requests.Response that stream_arxiv reads"""
+
+    status_code = 200
+
+    def __init__(self, body):
+        self.raw = io.BytesIO(body)
+
+    def raise_for_status(self):
+        pass
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def main():
+    """Run the streaming test"""
+    print("🚀 Testing streamed arXiv search offline...\n")
+
+    # 1. The first paper arrives after reading a small part of a large feed
+    stream = CountingStream(atom_feed(range(5000)))
+    first = next(iter_atom_entries(stream))
+    total = len(stream.getvalue())
+    assert first['arxiv_id'] == '2401.00000v1', first
+    assert stream.bytes_read < total / 20, (stream.bytes_read, total)
+    print(f"✅ First paper after reading {stream.bytes_read:,} of {total:,} bytes")
+
+    # 2. Memory does not grow with the feed
+    small, large = peak_memory(1000), peak_memory(20000)
+    assert large < 2 * small + 64 * 1024, (small, large)
+    print(f"✅ Peak memory {small / 1024:.0f} KB for 1k entries, {large / 1024:.0f} KB for 20k")
+
+    # 3. Pages are requested one at a time, as they are consumed
+    pages = [atom_feed(range(0, 100)), atom_feed(list(range(100, 150)) + [5], version=2)]
+    requests_made = []
+
+    def fake_get(url, params=None, stream=False, timeout=None):
+        requests_made.append(params['start'])
+        return FakeResponse(pages[len(requests_made) - 1])
+
+    original_get = literature_scout.requests.get
+    literature_scout.requests.get = fake_get
+    try:
+        scout = LiteratureScoutAgent('offline', search_cache=False, relevance_cache=False)
+        papers = scout.stream_arxiv('synthetic', max_results=500, page_size=100, page_delay=0)
+
+        first_page = [next(papers) for _ in range(100)]
+        assert requests_made == [0], requests_made
+        rest = list(papers)
+    finally:
+        literature_scout.requests.get = original_get
+
+    assert requests_made == [0, 100], requests_made
+    assert len(first_page) + len(rest) == 150, len(rest)   # 151 entries, one version duplicate
+    print(f"✅ Streamed {len(first_page) + len(rest)} papers over {len(requests_made)} pages, "
+          f"first page before the second was requested")
+
+    print("\n✅ Streaming test passed!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Concurrency test for the summary vector store
+Two processes add papers to one store directory at the same time
+
+Every paper must end up on its own row with its own vector, and a store
+opened afterwards (or one that was open all along) must find each of
+them, so the Streamlit app, the API and the CLI can share one index.
+"""
+
+import multiprocessing
+import tempfile
+
+from agents.vector_store import VectorStore
+
+
+PAPERS_PER_PROCESS = 150
+
+
+def text_for(paper_id):
+    return f"unique topic {paper_id} about {paper_id} methods"
+
+
+def add_papers(path, prefix, ready):
+    store = VectorStore(path, initial_capacity=8)
+    ready.wait()
+    for i in range(PAPERS_PER_PROCESS):
+        store.add(f"{prefix}-{i}", text_for(f"{prefix}-{i}"), {'writer': prefix})
+
+
+def main():
+    """Run the concurrency test"""
+    print("🚀 Testing two writers on one vector store...\n")
+
+    with tempfile.TemporaryDirectory() as path:
+        # Open before the writers start: it must see their papers later
+        early = VectorStore(path, initial_capacity=8)
+
+        ready = multiprocessing.Event()
+        writers = [multiprocessing.Process(target=add_papers, args=(path, prefix, ready)) for prefix in ('a', 'b')]
+        for writer in writers:
+            writer.start()
+        ready.set()
+        for writer in writers:
+            writer.join()
+            assert writer.exitcode == 0
+
+        late = VectorStore(path)
+        expected = {f"{prefix}-{i}" for prefix in ('a', 'b') for i in range(PAPERS_PER_PROCESS)}
+        assert set(late._rows) == expected, len(late._rows)
+        assert len(set(late._rows.values())) == len(expected), "two papers share a row"
+        assert len(late) == len(expected)
+
+        for store in (late, early):
+            for paper_id in ('a-0', 'b-0', f"a-{PAPERS_PER_PROCESS - 1}", f"b-{PAPERS_PER_PROCESS - 1}"):
+                hit = store.search(text_for(paper_id), k=1)[0]
+                assert hit['id'] == paper_id and hit['score'] > 0.99, (paper_id, hit)
+
+        print(f"✅ {len(expected)} papers from 2 processes on {len(expected)} distinct rows")
+        print("✅ Each vector found under its own ID, by a new store and one opened before the writes")
+
+    print("\n✅ Vector store concurrency test passed!")
+
+
+if __name__ == "__main__":
+    main()
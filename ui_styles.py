@@ -0,0 +1,449 @@
+"""
+UI Styles
+Static CSS for the Streamlit app
+
+Streamlit re-executes app.py on every rerun, but imported modules stay in
+sys.modules, so the stylesheet lives here and is minified exactly once
+per process. app.py still has to emit it on each rerun (the page is
+rebuilt from scratch), but only as a ready-made string.
+"""
+
+import re
+from functools import lru_cache
+
+
+APP_CSS = """
+    <style>
+    /* Hide Streamlit branding */
+    /* Modal/Popup Styles */
+    
+    /* --- CUSTOM POPUP STYLES --- */
+    .custom-modal-overlay {
+        position: fixed;
+        top: 0;
+        left: 0;
+        width: 100%;
+        height: 100%;
+        background: rgba(0, 0, 0, 0.65); /* Darker overlay */
+        backdrop-filter: blur(10px); /* Stronger blur */
+        z-index: 9998;
+        display: flex;
+        justify-content: center;
+        align-items: center;
+        opacity: 0;
+        pointer-events: none;
+        transition: opacity 0.3s ease;
+    }
+    
+    .custom-modal-overlay.active {
+        opacity: 1;
+        pointer-events: all;
+    }
+    
+    .custom-modal-content {
+        background: white;
+        padding: 3rem 3rem 2rem; /* Adjusted padding for better fit */
+        border-radius: 16px;
+        max-width: 550px; /* Slimmer max-width for card look */
+        width: 90%;
+        box-shadow: 0 20px 60px rgba(0, 0, 0, 0.35); /* Deeper shadow */
+        max-height: 80vh;
+        overflow-y: auto;
+        position: relative;
+    }
+    
+    .custom-modal-content .stButton>button {
+        background: #1a1a1a;
+        color: white;
+        border-radius: 50px;
+        font-size: 1.1rem;
+        padding: 1rem 3rem;
+        font-weight: 600;
+        box-shadow: 0 8px 25px rgba(0,0,0,0.4); /* Darker shadow */
+        margin-top: 2rem; /* Spacing */
+    }
+    
+    .custom-modal-title {
+        font-size: 1.8rem;
+        font-weight: 700;
+        color: #1a1a1a;
+        margin-bottom: 2rem; /* Separated from content */
+        text-align: center;
+    }
+
+    .modal-step-container {
+        margin-bottom: 1rem;
+    }
+
+    .modal-step-number {
+        font-size: 1.25rem;
+        font-weight: 700;
+        color: #1a1a1a;
+        margin-right: 0.5rem;
+    }
+
+    .modal-step-text {
+        font-size: 1rem;
+        color: #1a1a1a; /* Darker main text */
+        font-weight: 600;
+        margin-bottom: 0.2rem;
+        line-height: 1.5;
+        display: inline-block;
+    }
+
+    .modal-step-example {
+        font-size: 0.9rem;
+        color: #666; /* Lighter example text */
+        margin-left: 2.5rem;
+        margin-top: 0.2rem;
+        margin-bottom: 1.5rem;
+        line-height: 1.5;
+        display: block;
+    }
+    
+    /* Ensure no residual Streamlit dialog styles interfere */
+    [data-testid="stDialog"] {
+        display: none !important;
+    }
+
+    /* --- END CUSTOM POPUP STYLES --- */
+    
+    #MainMenu, footer, header {visibility: hidden;}
+    .stDeployButton {display: none;}
+
+    /* Clean font */
+    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&display=swap');
+    * {
+        font-family: 'Inter', -apple-system, sans-serif;
+    }
+
+    /* 3D Cube Rotate Animation - ENHANCED */
+    @keyframes rotateCube {
+        0% {
+            opacity: 0;
+            transform: perspective(600px) rotateX(60deg);
+        }
+        50% {
+            opacity: 0.5;
+        }
+        100% {
+            opacity: 1;
+            transform: perspective(600px) rotateX(0deg);
+        }
+    }
+
+    .stTextInput>div>div>input {
+        perspective: 1000px;
+    }
+
+    .stTextInput>div>div>input::placeholder {
+        animation: rotateCube 0.8s ease-out;
+        transform-style: preserve-3d;
+        display: inline-block;
+    }
+
+    /* Smooth background */
+    .stApp {
+        background: #FFFFFF;
+    }
+
+    .block-container {
+        padding: 2rem 1rem;
+        max-width: 1100px;
+    }
+
+    /* Minimal hero */
+    .hero {
+        text-align: center;
+        padding: 3rem 1rem 2rem;
+        margin-bottom: 2rem;
+    }
+
+    .hero-title {
+        font-size: 2.75rem;
+        font-weight: 700;
+        color: #1a1a1a;
+        margin-bottom: 0.75rem;
+        letter-spacing: -0.02em;
+        text-shadow: 1px 1px 3px rgba(0, 0, 0, 0.10);
+    }
+
+    .hero-subtitle {
+        font-size: 1.1rem;
+        color: #666;
+        font-weight: 400;
+        max-width: 0 auto;
+        margin: 0 auto;
+        line-height: 1.6;
+        text-align: center;
+    }
+
+    /* Smooth feature cards */
+    .feature-card {
+        background: #FAFAFA;
+        padding: 1.75rem 1.5rem;
+        border-radius: 10px;
+        border: 1px solid #EAEAEA;
+        min-height: 200px;
+        transition: all 0.2s ease-out;
+        text-align: center;
+    }
+
+    .feature-card:hover {
+        background: #F0F0F0;
+        border-color: #D0D0D0;
+        box-shadow: 0 4px 12px rgba(0, 0, 0, 0.08);
+        transform: translateY(-3px);
+    }
+
+    .feature-emoji {
+        font-size: 2rem;
+        margin-bottom: 0.75rem;
+        opacity: 0.9;
+    }
+
+    .feature-title {
+        font-size: 1.1rem;
+        font-weight: 600;
+        color: #1a1a1a;
+        margin-bottom: 0.5rem;
+    }
+
+    .feature-desc {
+        font-size: 0.95rem;
+        color: #666;
+        line-height: 1.5;
+        text-align: center;
+    }
+
+    /* Smooth minimal button */
+    .stButton>button {
+        background: #1a1a1a;
+        color: white;
+        font-size: 1rem;
+        font-weight: 500;
+        padding: 0.75rem 2rem;
+        border-radius: 50px;
+        border: none;
+        transition: all 0.2s ease;
+        box-shadow: none;
+    }
+
+    .stButton>button:hover {
+        background: #333;
+        transform: translateY(-2px);
+        box-shadow: 0 4px 10px rgba(0, 0, 0, 0.25);
+    }
+
+    /* Clean form */
+    .form-title {
+        font-size: 1.75rem;
+        font-weight: 600;
+        color: #1a1a1a;
+        margin-bottom: 0.5rem;
+        text-align: center;
+    }
+
+    .form-subtitle {
+        font-size: 0.95rem;
+        color: #666;
+        margin-bottom: 2rem;
+        text-align: center;
+    }
+
+    .element-container:has(.stProgress) {
+        margin-bottom: 0px !important;
+        padding-top: 0px !important;
+        margin-top: 0px !important;
+    }
+
+    /* Smooth inputs */
+    .stTextInput>div>div>input {
+        background: #FAFAFA !important;
+        border: 1px solid #E0E0E0 !important;
+        border-radius: 6px !important;
+        padding: 0.75rem 1rem !important;
+        font-size: 0.95rem !important;
+        color: #1a1a1a !important;
+        transition: all 0.15s ease !important;
+        caret-color: #1a1a1a !important;
+    }
+
+    .stTextInput>div>div>input:focus {
+        border-color: #999 !important;
+        background: #FFF !important;
+    }
+
+    .stTextInput>div>div>input::placeholder {
+        color: #999 !important;
+    }
+
+    .stNumberInput>div>div>input {
+        background: #FAFAFA !important;
+        border: 1px solid #E0E0E0 !important;
+        border-radius: 6px !important;
+        padding: 0.75rem 1rem !important;
+        font-size: 0.95rem !important;
+        color: #1a1a1a !important;
+    }
+
+    label {
+        color: #666 !important;
+        font-size: 0.85rem !important;
+        font-weight: 500 !important;
+    }
+
+    /* Smooth progress */
+
+    .stProgress {
+        background: transparent !important;
+    }
+
+    .stProgress>div {
+        background: transparent !important;
+        height: 4px !important; 
+        border-radius: 2px !important;
+        border: none !important;
+    }
+
+    .stProgress>div>div {
+        background: #1a1a1a !important;
+        height: 4px !important;
+        border-radius: 2px !important;
+        transition: width 0.3s ease-out !important;
+    }
+
+    .stProgress [data-testid="stMarkdownContainer"] {
+        display: none !important;
+    }
+
+    /* Clean status */
+    .status-text {
+        text-align: center;
+        color: #666;
+        font-size: 1rem;
+        padding: 0.5rem;
+    }
+
+    /* Minimal expander */
+    .streamlit-expanderHeader {
+        background: #1a1a1a !important;
+        border: 1px solid #1a1a1a !important;
+        border-radius: 6px !important;
+        font-weight: 600 !important;
+        color: #FFFFFF !important;
+        padding: 0.75rem 1rem !important;
+    }
+
+    .streamlit-expanderHeader:hover {
+        background: #333 !important;
+        border-color: #333 !important;
+    }
+
+    .streamlit-expanderContent {
+        background: #FFF !important;
+        border: 1px solid #E0E0E0 !important;
+        border-top: none !important;
+        border-radius: 0 0 6px 6px !important;
+        padding: 1rem !important;
+    }
+
+    /* Smooth download */
+    .stDownloadButton>button {
+        background: #1a1a1a !important;
+        color: white !important;
+        font-size: 1rem !important;
+        font-weight: 500 !important;
+        padding: 0.75rem 0.75rem !important;
+        border-radius: 50px !important;
+        border: none !important;
+        transition: all 0.2s ease !important;
+        box-shadow: none !important;
+    }
+
+    .stDownloadButton>button:hover {
+        background: #333 !important;
+        transform: translateY(-2px) !important;
+        box-shadow: 0 4px 10px rgba(0, 0, 0, 0.25) !important;
+    }
+
+    /* Clean messages */
+    .element-container .stSuccess {
+        background: #F0F9F4 !important;
+        border: 1px solid #D1F2E0 !important;
+        color: #1a7a3e !important;
+        border-radius: 6px !important;
+    }
+
+    /* Paper items */
+    .paper-item {
+        padding: 1rem;
+        border-bottom: 1px solid #F0F0F0;
+    }
+
+    .paper-item:hover {
+        background: #FAFAFA;
+    }
+
+    .paper-number {
+        color: #1a1a1a;
+        font-weight: 600;
+        margin-right: 0.5rem;
+    }
+
+    .paper-title {
+        color: #1a1a1a;
+        font-weight: 500;
+        font-size: 1rem;
+    }
+
+    .paper-meta {
+        color: #666;
+        font-size: 0.875rem;
+    }
+
+    /* Section headers */
+    .section-label {
+        font-size: 0.85rem;
+        font-weight: 700;
+        color: #1a1a1a !important;
+        text-transform: uppercase;
+        letter-spacing: 0.05em;
+        margin: 1rem 0 0.5rem 0;
+        display: block !important;
+        background: #F5F5F5 !important;
+        padding: 0.5rem 0.75rem !important;
+        border-radius: 4px !important;
+    }
+
+    .section-text {
+        color: #333;
+        line-height: 1.6;
+        font-size: 0.95rem;
+    }
+
+    /* Links */
+    a {
+        color: #1a1a1a !important;
+        text-decoration: underline !important;
+    }
+
+    a:hover {
+        color: #666 !important;
+    }
+
+    /* Clean spacing */
+    h1, h2, h3 {
+        color: #1a1a1a !important;
+    }
+    </style>
+"""
+
+
+@lru_cache(maxsize=1)
+def page_css():
+    """Return the stylesheet with comments and redundant whitespace stripped"""
+    css = re.sub(r'/\*.*?\*/', '', APP_CSS, flags=re.DOTALL)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{}:;,>])\s*', r'\1', css)
+    return css.replace('<style>', '<style>\n').strip()